@@ -0,0 +1,110 @@
+# Generated by Django 5.2.8 on 2026-10-19 03:05
+
+import json
+
+from django.db import migrations, models
+
+
+def medical_conditions_to_json(apps, schema_editor):
+    """The text column becomes a JSON list; existing notes are kept as its only item"""
+    UserProfile = apps.get_model('authentication', 'UserProfile')
+    for pk, conditions in UserProfile.objects.values_list('pk', 'medical_conditions'):
+        UserProfile.objects.filter(pk=pk).update(
+            medical_conditions=json.dumps([conditions.strip()] if conditions and conditions.strip() else []),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0002_emailotp_registrationsession_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='age',
+            field=models.CharField(blank=True, help_text='Age in years', max_length=3, null=True),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='custom_goals',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='dietary_preferences',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='emergency_contact_relationship',
+            field=models.CharField(blank=True, max_length=50),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='energy_level',
+            field=models.IntegerField(blank=True, help_text='Energy level (0-100)', null=True),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='health_concerns',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='health_goals',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='intake_completed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='occupation',
+            field=models.CharField(blank=True, choices=[('student', 'Student'), ('executive', 'Executive'), ('professional', 'Professional'), ('entrepreneur', 'Entrepreneur'), ('freelancer', 'Freelancer'), ('retired', 'Retired'), ('other', 'Other')], max_length=20, null=True),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='sleep_hours',
+            field=models.IntegerField(blank=True, help_text='Average sleep hours per night', null=True),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='sleep_quality',
+            field=models.IntegerField(blank=True, help_text='Sleep quality (0-100)', null=True),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='travel_frequency',
+            field=models.CharField(blank=True, help_text='e.g., 1-2 times per month', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='user_data_complete',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='wearables',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='work_hours',
+            field=models.CharField(blank=True, help_text='e.g., 8-10 hours', max_length=10),
+        ),
+        migrations.RunPython(medical_conditions_to_json, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='userprofile',
+            name='medical_conditions',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AlterField(
+            model_name='userprofile',
+            name='primary_goal',
+            field=models.CharField(blank=True, choices=[('lose_weight', 'Lose Weight'), ('gain_weight', 'Gain Weight'), ('maintain_weight', 'Maintain Weight'), ('build_muscle', 'Build Muscle'), ('improve_endurance', 'Improve Endurance'), ('stress_relief', 'Stress Relief'), ('general_fitness', 'General Fitness'), ('improve_fitness_endurance', 'Improve fitness & endurance'), ('weight_fat_loss', 'Weight/fat loss')], max_length=30, null=True),
+        ),
+    ]
@@ -0,0 +1,336 @@
+import heapq
+import logging
+import time as timer
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Avg, Count, DurationField, ExpressionWrapper, F
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from specialists.availability import get_zone
+from .models import ConciergeAgent, ConciergeRequest, ConciergeService
+
+
+logger = logging.getLogger(__name__)
+
+# Queue order: most urgent first, oldest first within a priority
+PRIORITY_ORDER = ['emergency', 'urgent', 'high', 'normal', 'low']
+# Queue order within a priority, matching concierge_queue_idx
+QUEUE_ORDER = (F('deadline').asc(nulls_last=True), 'created_at', 'pk')
+# Request statuses that count towards an agent's load
+OPEN_STATUSES = ['assigned', 'in_progress', 'pending_approval', 'on_hold']
+WEEKDAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+# Heap key part matching any category (generalist agents) or any language (requests without one)
+ANY = '*'
+
+
+def parse_minutes(text):
+    hours, minutes = str(text).split(':')
+    return int(hours) * 60 + int(minutes)
+
+
+def normalized(values):
+    """Lower-cased names from a JSON list of strings, e.g. specializations or languages"""
+    if not isinstance(values, list):
+        return set()
+    return {value.strip().lower() for value in values if isinstance(value, str) and value.strip()}
+
+
+def on_shift(working_hours, zone, now):
+    """
+    Whether ``now`` falls in one of the agent's windows for that local weekday.
+    An empty schedule means always available; malformed windows never match.
+    """
+    if not working_hours:
+        return True
+    local = now.astimezone(zone)
+    minute = local.hour * 60 + local.minute
+    for window in working_hours.get(WEEKDAYS[local.weekday()]) or []:
+        try:
+            start, end = (parse_minutes(value) for value in window)
+        except (TypeError, ValueError):
+            continue
+        if start <= minute < end:
+            return True
+    return False
+
+
+class AgentPool:
+    """
+    Agents that can take work right now, with a min-heap of (open requests,
+    agent id) per (service category, language). An agent sits in one heap
+    per combination of its specializations (or ANY for generalists) and
+    languages (and ANY, for requests without a language). Heaps are updated
+    lazily: taking work pushes a fresh entry and outdated ones are dropped
+    when they reach the top.
+    """
+
+    def __init__(self, agents=()):
+        self.load = {}
+        self.capacity = {}
+        self.keys = {}
+        self.heaps = defaultdict(list)
+        for agent_id, specializations, languages, capacity, load in agents:
+            self.add(agent_id, specializations, languages, capacity, load)
+
+    def add(self, agent_id, specializations, languages, capacity, load):
+        categories = normalized(specializations) or {ANY}
+        languages = normalized(languages) | {ANY}
+        self.keys[agent_id] = [(category, language) for category in categories for language in languages]
+        self.capacity[agent_id] = capacity
+        self.load[agent_id] = load
+        self._push(agent_id)
+
+    def _push(self, agent_id):
+        load = self.load[agent_id]
+        if load < self.capacity[agent_id]:
+            for key in self.keys[agent_id]:
+                heapq.heappush(self.heaps[key], (load, agent_id))
+
+    def _top(self, key):
+        heap = self.heaps.get(key)
+        while heap:
+            load, agent_id = heap[0]
+            if load == self.load[agent_id] and load < self.capacity[agent_id]:
+                return heap[0]
+            heapq.heappop(heap)
+        return None
+
+    def best(self, category, language=''):
+        """
+        Least-loaded agent for a request, specialists and generalists alike, or None
+        """
+        language = (language or '').strip().lower() or ANY
+        candidates = [entry for entry in (self._top((category, language)), self._top((ANY, language))) if entry]
+        return min(candidates)[1] if candidates else None
+
+    def take(self, agent_id, count=1):
+        self.load[agent_id] += count
+        self._push(agent_id)
+
+    def release(self, agent_id, count=1):
+        self.load[agent_id] -= count
+        self._push(agent_id)
+
+    def drop(self, agent_id):
+        """Stop offering an agent, e.g. after the database refused more work for it"""
+        self.capacity[agent_id] = 0
+
+
+class ConciergeAssignmentService:
+    """
+    Service class to assign queued concierge requests to agents by priority,
+    service category, language and working hours, keeping each agent below
+    max_concurrent_clients even with several schedulers running at once
+    """
+
+    BATCH_SIZE = 10000
+
+    @staticmethod
+    def load_pool(now):
+        """
+        Active agents with spare capacity that are on shift at ``now`` (one query)
+        """
+        agents = ConciergeAgent.objects.filter(
+            is_active=True, open_requests__lt=F('max_concurrent_clients'),
+        ).values_list('pk', 'specializations', 'languages', 'max_concurrent_clients', 'open_requests', 'working_hours', 'timezone')
+        return AgentPool(
+            (pk, specializations, languages, capacity, load)
+            for pk, specializations, languages, capacity, load, working_hours, zone in agents.iterator(chunk_size=2000)
+            if on_shift(working_hours, get_zone(zone), now)
+        )
+
+    @staticmethod
+    def queued(limit=None):
+        """
+        (request id, service category, language) of unassigned requests in
+        queue order, one index range scan per priority
+        """
+        categories = dict(ConciergeService.objects.values_list('pk', 'category'))
+        remaining = limit
+        for priority in PRIORITY_ORDER:
+            rows = ConciergeRequest.objects.filter(
+                status='submitted', agent__isnull=True, priority=priority,
+            ).order_by(*QUEUE_ORDER).values_list('pk', 'service_id', 'language')
+            if remaining is not None:
+                rows = rows[:remaining]
+            for request_id, service_id, language in rows.iterator(chunk_size=2000):
+                yield request_id, categories.get(service_id, ANY), language
+                if remaining is not None:
+                    remaining -= 1
+            if remaining == 0:
+                return
+
+    @staticmethod
+    def match(pool, requests):
+        """
+        (request id, agent id) pairs for the requests an agent is free for, in memory only
+        """
+        for request_id, category, language in requests:
+            agent_id = pool.best(category, language)
+            if agent_id is not None:
+                pool.take(agent_id)
+                yield request_id, agent_id
+
+    @staticmethod
+    def commit(pool, assignments, now):
+        """
+        Write matched assignments with conditional UPDATEs, per agent: reserve
+        capacity only if it is still free, then claim only requests that are
+        still unassigned, handing back any reservation that was not used.
+        Requests that lose either race stay queued for the next run.
+        """
+        by_agent = defaultdict(list)
+        for request_id, agent_id in assignments:
+            by_agent[agent_id].append(request_id)
+
+        assigned = 0
+        for agent_id, request_ids in by_agent.items():
+            count = len(request_ids)
+            with transaction.atomic():
+                if not ConciergeAgent.objects.filter(
+                    pk=agent_id, is_active=True, open_requests__lte=F('max_concurrent_clients') - count,
+                ).update(open_requests=F('open_requests') + count):
+                    pool.drop(agent_id)
+                    continue
+                claimed = ConciergeRequest.objects.filter(
+                    pk__in=request_ids, status='submitted', agent__isnull=True,
+                ).update(agent_id=agent_id, status='assigned', assigned_at=now, updated_at=now)
+                if claimed < count:
+                    ConciergeAgent.objects.filter(pk=agent_id).update(open_requests=F('open_requests') - (count - claimed))
+                    pool.release(agent_id, count - claimed)
+            assigned += claimed
+        return assigned
+
+    @classmethod
+    def run(cls, limit=None, batch_size=None, now=None):
+        """
+        One scheduler pass over the queue; returns counts and throughput
+        """
+        batch_size = batch_size or cls.BATCH_SIZE
+        now = now or timezone.now()
+        started = timer.perf_counter()
+        pool = cls.load_pool(now)
+
+        stats = {'agents': len(pool.load), 'matched': 0, 'assigned': 0}
+        batch = []
+        for assignment in cls.match(pool, cls.queued(limit)):
+            batch.append(assignment)
+            if len(batch) >= batch_size:
+                stats['assigned'] += cls.commit(pool, batch, now)
+                stats['matched'] += len(batch)
+                batch = []
+        stats['assigned'] += cls.commit(pool, batch, now)
+        stats['matched'] += len(batch)
+
+        elapsed = timer.perf_counter() - started
+        stats['seconds'] = round(elapsed, 3)
+        stats['assignments_per_second'] = round(stats['assigned'] / elapsed, 1) if elapsed else None
+        logger.info(f"Assigned {stats['assigned']} concierge requests to {stats['agents']} agents in {elapsed:.2f} s")
+        return stats
+
+    @staticmethod
+    def adjust_load(agent_id, delta):
+        # Never below zero, even if the counter drifted; reconcile() repairs drift
+        if agent_id and delta:
+            ConciergeAgent.objects.filter(pk=agent_id, open_requests__gte=-delta).update(open_requests=F('open_requests') + delta)
+
+    @staticmethod
+    def reconcile():
+        """
+        Recount open requests per agent from the requests themselves, for backfill and repair
+        """
+        counts = dict(
+            ConciergeRequest.objects.filter(status__in=OPEN_STATUSES, agent__isnull=False).values('agent').annotate(
+                total=Count('id'),
+            ).order_by().values_list('agent', 'total')
+        )
+        agents = []
+        for agent in ConciergeAgent.objects.only('pk', 'open_requests'):
+            if agent.open_requests != counts.get(agent.pk, 0):
+                agent.open_requests = counts.get(agent.pk, 0)
+                agents.append(agent)
+        ConciergeAgent.objects.bulk_update(agents, ['open_requests'], batch_size=1000)
+        return len(agents)
+
+
+class ConciergeQueueService:
+    """
+    Service class for agents pulling their next request from the queue.
+    The chosen row is locked with SKIP LOCKED, so agents claiming at the
+    same time each get a different request instead of waiting on one another.
+    """
+
+    @staticmethod
+    def eligible(agent):
+        """Unassigned requests in the agent's categories (any for generalists) and languages"""
+        requests = ConciergeRequest.objects.filter(status='submitted', agent__isnull=True)
+        categories = normalized(agent.specializations)
+        if categories:
+            requests = requests.filter(service__category__in=categories)
+        return requests.alias(language_code=Lower('language')).filter(
+            language_code__in=[*normalized(agent.languages), ''],
+        )
+
+    @classmethod
+    def claim_next(cls, agent, now=None):
+        """
+        Assign the agent the most urgent request it can handle: by priority,
+        then deadline (none last), then age. Capacity is reserved with a
+        conditional UPDATE first and given back if the queue is empty.
+        """
+        now = now or timezone.now()
+        with transaction.atomic():
+            if not ConciergeAgent.objects.filter(
+                pk=agent.pk, is_active=True, open_requests__lt=F('max_concurrent_clients'),
+            ).update(open_requests=F('open_requests') + 1):
+                return {
+                    'success': False,
+                    'message': 'Agent is inactive or at capacity',
+                    'error_code': 'AT_CAPACITY',
+                    'request': None,
+                }
+
+            request = None
+            for priority in PRIORITY_ORDER:
+                request = cls.eligible(agent).filter(priority=priority).order_by(*QUEUE_ORDER).select_for_update(
+                    skip_locked=True, of=('self',),
+                ).first()
+                if request is not None:
+                    break
+            if request is None:
+                transaction.set_rollback(True)
+                return {
+                    'success': False,
+                    'message': 'No queued requests for this agent',
+                    'error_code': 'QUEUE_EMPTY',
+                    'request': None,
+                }
+
+            ConciergeRequest.objects.filter(pk=request.pk).update(
+                agent=agent, status='assigned', assigned_at=now, updated_at=now,
+            )
+
+        request.agent, request.status, request.assigned_at, request.updated_at = agent, 'assigned', now, now
+        # Already counted in open_requests above
+        request._open_agent = agent.pk
+        logger.info(f"Agent {agent.pk} claimed concierge request {request.pk}")
+        return {'success': True, 'message': 'Request claimed', 'error_code': None, 'request': request}
+
+    @staticmethod
+    def refresh_response_times():
+        """
+        Each agent's average_response_time, from submission to assignment or
+        claim, with one grouped query
+        """
+        averages = dict(
+            ConciergeRequest.objects.filter(agent__isnull=False, assigned_at__isnull=False).values('agent').annotate(
+                average=Avg(ExpressionWrapper(F('assigned_at') - F('created_at'), output_field=DurationField())),
+            ).order_by().values_list('agent', 'average')
+        )
+        agents = list(ConciergeAgent.objects.filter(pk__in=averages).only('pk'))
+        for agent in agents:
+            agent.average_response_time = averages[agent.pk]
+        ConciergeAgent.objects.bulk_update(agents, ['average_response_time'], batch_size=1000)
+        return len(agents)
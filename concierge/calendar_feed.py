@@ -0,0 +1,153 @@
+import heapq
+import json
+from datetime import timedelta, timezone as dt_timezone
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from specialists.availability import get_zone
+from wellness_plans.models import PlanSession
+from .models import ConciergeAppointment
+
+
+# Statuses that no longer belong on a calendar
+HIDDEN_SESSION_STATUSES = ['cancelled']
+HIDDEN_APPOINTMENT_STATUSES = ['cancelled', 'rescheduled']
+CHUNK_SIZE = 500
+UID_DOMAIN = 'wellness-hub'
+ICS_LINE_OCTETS = 75
+
+
+def plan_session_events(user, start, end):
+    """
+    The user's plan sessions starting in [start, end), in time order, read in chunks
+    """
+    rows = PlanSession.objects.filter(
+        plan__user=user, scheduled_date__gte=start, scheduled_date__lt=end,
+    ).exclude(status__in=HIDDEN_SESSION_STATUSES).order_by('scheduled_date', 'pk').values_list(
+        'pk', 'scheduled_date', 'duration_minutes', 'title', 'status', 'plan_id', 'instructions',
+    )
+    for pk, starts_at, minutes, title, status, plan_id, instructions in rows.iterator(chunk_size=CHUNK_SIZE):
+        yield {
+            'kind': 'plan_session',
+            'id': pk,
+            'start': starts_at,
+            'end': starts_at + timedelta(minutes=minutes),
+            'title': title,
+            'status': status,
+            'plan_id': plan_id,
+            'description': instructions,
+            'location': '',
+        }
+
+
+def appointment_events(user, start, end):
+    """
+    The user's concierge appointments starting in [start, end), in time order, read in chunks
+    """
+    rows = ConciergeAppointment.objects.filter(
+        client=user, scheduled_datetime__gte=start, scheduled_datetime__lt=end,
+    ).exclude(status__in=HIDDEN_APPOINTMENT_STATUSES).order_by('scheduled_datetime', 'pk').values_list(
+        'pk', 'scheduled_datetime', 'duration_minutes', 'title', 'status', 'appointment_type',
+        'description', 'is_virtual', 'meeting_link', 'location',
+    )
+    for (pk, starts_at, minutes, title, status, appointment_type, description, is_virtual, meeting_link,
+         location) in rows.iterator(chunk_size=CHUNK_SIZE):
+        yield {
+            'kind': 'concierge_appointment',
+            'id': pk,
+            'start': starts_at,
+            'end': starts_at + timedelta(minutes=minutes),
+            'title': title,
+            'status': status,
+            'appointment_type': appointment_type,
+            'description': description,
+            'location': meeting_link if is_virtual else location,
+        }
+
+
+def calendar_events(user, start, end):
+    """
+    Plan sessions and concierge appointments merged by start time, converted
+    to the user's timezone. Both sources are already sorted, so the merge
+    holds one pending event per source rather than the whole range.
+    """
+    zone = get_zone(user.timezone)
+    merged = heapq.merge(
+        plan_session_events(user, start, end),
+        appointment_events(user, start, end),
+        key=lambda event: (event['start'], event['kind'], event['id']),
+    )
+    for event in merged:
+        event['start'] = event['start'].astimezone(zone)
+        event['end'] = event['end'].astimezone(zone)
+        yield event
+
+
+def json_stream(events, start, end, zone_name):
+    """
+    Chunks of a JSON document listing ``events``, for StreamingHttpResponse
+    """
+    yield json.dumps({'success': True, 'timezone': zone_name, 'start': start, 'end': end}, cls=DjangoJSONEncoder)[:-1]
+    yield ', "events": ['
+    for index, event in enumerate(events):
+        yield (', ' if index else '') + json.dumps(event, cls=DjangoJSONEncoder)
+    yield ']}'
+
+
+def ics_escape(text):
+    return (
+        str(text).replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+        .replace('\r\n', '\\n').replace('\n', '\\n')
+    )
+
+
+def ics_line(name, value):
+    """
+    One content line, folded at 75 octets as RFC 5545 requires
+    """
+    line = f'{name}:{value}'.encode()
+    parts = []
+    while len(line) > ICS_LINE_OCTETS:
+        cut = ICS_LINE_OCTETS if not parts else ICS_LINE_OCTETS - 1
+        # Never split a multi-byte UTF-8 sequence
+        while cut and (line[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(line[:cut])
+        line = line[cut:]
+    parts.append(line)
+    return b'\r\n '.join(parts).decode() + '\r\n'
+
+
+def ics_time(value):
+    return value.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def ics_stream(events, zone_name, now):
+    """
+    iCalendar document for ``events``, one VEVENT at a time. Times are
+    written in UTC, which needs no VTIMEZONE definitions; X-WR-TIMEZONE tells
+    clients which zone to show them in.
+    """
+    yield (
+        'BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//Wellness Hub//Calendar//EN\r\nCALSCALE:GREGORIAN\r\n'
+        + ics_line('X-WR-CALNAME', 'Wellness Hub') + ics_line('X-WR-TIMEZONE', zone_name)
+    )
+    stamp = ics_time(now)
+    for event in events:
+        lines = [
+            'BEGIN:VEVENT\r\n',
+            ics_line('UID', f"{event['kind'].replace('_', '-')}-{event['id']}@{UID_DOMAIN}"),
+            ics_line('DTSTAMP', stamp),
+            ics_line('DTSTART', ics_time(event['start'])),
+            ics_line('DTEND', ics_time(event['end'])),
+            ics_line('SUMMARY', ics_escape(event['title'])),
+        ]
+        if event['description']:
+            lines.append(ics_line('DESCRIPTION', ics_escape(event['description'])))
+        if event['location']:
+            lines.append(ics_line('LOCATION', ics_escape(event['location'])))
+        if event['status'] in ('confirmed', 'completed'):
+            lines.append('STATUS:CONFIRMED\r\n')
+        lines.append('END:VEVENT\r\n')
+        yield ''.join(lines)
+    yield 'END:VCALENDAR\r\n'
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from concierge.assignment import ConciergeAssignmentService
+
+
+class Command(BaseCommand):
+    help = 'Assign queued concierge requests to available agents; safe to run from several workers at once'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=None, help='Assign at most this many requests')
+        parser.add_argument('--batch-size', type=int, default=ConciergeAssignmentService.BATCH_SIZE)
+        parser.add_argument('--reconcile', action='store_true', help='Recount agent loads before assigning')
+
+    def handle(self, *args, **options):
+        if options['reconcile']:
+            repaired = ConciergeAssignmentService.reconcile()
+            self.stdout.write(f'Corrected open request counts of {repaired} agents')
+        stats = ConciergeAssignmentService.run(limit=options['limit'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Assigned {stats['assigned']} of {stats['matched']} matched requests to {stats['agents']} available agents "
+            f"in {stats['seconds']} s ({stats['assignments_per_second']} per second)"
+        ))
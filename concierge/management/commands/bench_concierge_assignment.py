@@ -0,0 +1,97 @@
+import random
+import time as timer
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from authentication.models import CustomUser
+from concierge.assignment import PRIORITY_ORDER, AgentPool, ConciergeAssignmentService
+from concierge.models import ConciergeAgent, ConciergeRequest, ConciergeService
+
+
+CATEGORIES = [category for category, _ in ConciergeService.SERVICE_CATEGORIES]
+LANGUAGES = ['en', 'fr', 'de', 'es', 'it', 'ja']
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark concierge request assignment: in-memory matching over synthetic agents and queued '
+        'requests, and optionally the database path (rolled back afterwards)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--agents', type=int, default=10000)
+        parser.add_argument('--requests', type=int, default=1000000)
+        parser.add_argument('--capacity', type=int, default=20)
+        parser.add_argument('--commit', type=int, default=0, help='Also assign this many requests through the database')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def agent_rows(self, count, capacity, rng):
+        for agent_id in range(1, count + 1):
+            specializations = rng.sample(CATEGORIES, rng.randint(0, 3))
+            languages = ['en'] + rng.sample(LANGUAGES[1:], rng.randint(0, 2))
+            yield agent_id, specializations, languages, capacity, rng.randint(0, capacity // 2)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        pool = AgentPool(self.agent_rows(options['agents'], options['capacity'], rng))
+        requests = [
+            (request_id, rng.choice(CATEGORIES), rng.choice(LANGUAGES + [''] * 6))
+            for request_id in range(options['requests'])
+        ]
+
+        started = timer.perf_counter()
+        matched = sum(1 for _ in ConciergeAssignmentService.match(pool, requests))
+        elapsed = timer.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"In memory: {matched} of {len(requests)} requests matched to {options['agents']} agents in {elapsed:.2f} s "
+            f"({len(requests) / elapsed:.0f} requests/s, {matched / elapsed:.0f} assignments/s)"
+        ))
+
+        if options['commit']:
+            self.bench_database(options, rng)
+
+    def bench_database(self, options, rng):
+        agent_count = min(options['agents'], max(options['commit'] // options['capacity'] + 1, 1))
+        with transaction.atomic():
+            users = CustomUser.objects.bulk_create([
+                CustomUser(username=f'bench-assign-{index}', email=f'bench-assign-{index}@example.com')
+                for index in range(agent_count + 1)
+            ])
+            if not all(user.pk for user in users):
+                # Backends without RETURNING from bulk inserts
+                users = list(CustomUser.objects.filter(username__startswith='bench-assign-').order_by('pk'))
+            client = users.pop()
+            ConciergeAgent.objects.bulk_create([
+                ConciergeAgent(
+                    user=user, employee_id=f'BENCH{index}', department='Concierge', specializations=specializations,
+                    languages=languages, max_concurrent_clients=capacity,
+                )
+                for index, (user, (_, specializations, languages, capacity, _)) in enumerate(
+                    zip(users, self.agent_rows(agent_count, options['capacity'], rng))
+                )
+            ])
+            services = ConciergeService.objects.bulk_create([
+                ConciergeService(name=label, description=label, category=category)
+                for category, label in ConciergeService.SERVICE_CATEGORIES
+            ])
+            if not all(service.pk for service in services):
+                services = list(ConciergeService.objects.filter(category__in=CATEGORIES))
+            created = datetime(2030, 1, 1, tzinfo=dt_timezone.utc)
+            ConciergeRequest.objects.bulk_create([
+                ConciergeRequest(
+                    client=client, service=rng.choice(services), title='Request', description='Request',
+                    priority=rng.choice(PRIORITY_ORDER), language=rng.choice(LANGUAGES + [''] * 6),
+                    created_at=created + timedelta(seconds=index),
+                )
+                for index in range(options['commit'])
+            ], batch_size=2000)
+
+            stats = ConciergeAssignmentService.run()
+            transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Database: {stats['assigned']} of {options['commit']} requests assigned to {agent_count} agents "
+            f"in {stats['seconds']} s ({stats['assignments_per_second']} assignments/s)"
+        ))
@@ -0,0 +1,81 @@
+import time as timer
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from authentication.models import CustomUser
+from concierge.assignment import PRIORITY_ORDER, ConciergeQueueService
+from concierge.models import ConciergeAgent, ConciergeRequest, ConciergeService
+
+
+PREFIX = 'bench-claim-'
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark agents claiming queued concierge requests concurrently, one thread and connection per '
+        'agent. Writes real rows (threads cannot share a transaction) and deletes them afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', default='1,2,4,8', help='Comma-separated numbers of concurrently claiming agents')
+        parser.add_argument('--claims', type=int, default=200, help='Claims per agent')
+
+    def handle(self, *args, **options):
+        counts = [int(value) for value in options['threads'].split(',')]
+        agents = max(counts)
+        CustomUser.objects.bulk_create([
+            CustomUser(username=f'{PREFIX}{index}', email=f'{PREFIX}{index}@example.com') for index in range(agents + 1)
+        ])
+        users = list(CustomUser.objects.filter(username__startswith=PREFIX).order_by('pk'))
+        client = users.pop()
+        service = ConciergeService.objects.create(name='Benchmark', description='Benchmark', category='wellness')
+        ConciergeAgent.objects.bulk_create([
+            ConciergeAgent(
+                user=user, employee_id=f'BENCHCLAIM{index}', department='Concierge',
+                max_concurrent_clients=options['claims'] * len(counts),
+            )
+            for index, user in enumerate(users)
+        ])
+        agents = list(ConciergeAgent.objects.filter(user__in=users))
+
+        try:
+            for threads in counts:
+                created = datetime(2030, 1, 1, tzinfo=dt_timezone.utc)
+                total = threads * options['claims']
+                ConciergeRequest.objects.bulk_create([
+                    ConciergeRequest(
+                        client=client, service=service, title='Request', description='Request',
+                        priority=PRIORITY_ORDER[index % len(PRIORITY_ORDER)],
+                        created_at=created + timedelta(seconds=index),
+                    )
+                    for index in range(total)
+                ], batch_size=2000)
+
+                started = timer.perf_counter()
+                with ThreadPoolExecutor(max_workers=threads) as executor:
+                    claimed = sum(executor.map(lambda agent: self.claim(agent, options['claims']), agents[:threads]))
+                elapsed = timer.perf_counter() - started
+
+                # A request claimed twice would be counted twice but assigned once
+                assigned = ConciergeRequest.objects.filter(client=client, agent__isnull=False).count()
+                self.stdout.write(self.style.SUCCESS(
+                    f'{threads} agents: {claimed} of {total} requests claimed in {elapsed:.2f} s '
+                    f'({claimed / elapsed:.0f} claims/s){"" if assigned == claimed else f", {claimed - assigned} DOUBLE CLAIMS"}'
+                ))
+                ConciergeRequest.objects.filter(client=client).delete()
+                ConciergeAgent.objects.filter(pk__in=[agent.pk for agent in agents]).update(open_requests=0)
+        finally:
+            ConciergeRequest.objects.filter(client=client).delete()
+            ConciergeAgent.objects.filter(pk__in=[agent.pk for agent in agents]).delete()
+            service.delete()
+            CustomUser.objects.filter(username__startswith=PREFIX).delete()
+
+    @staticmethod
+    def claim(agent, count):
+        try:
+            return sum(1 for _ in range(count) if ConciergeQueueService.claim_next(agent)['success'])
+        finally:
+            connection.close()
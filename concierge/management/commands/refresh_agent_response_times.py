@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from concierge.assignment import ConciergeQueueService
+
+
+class Command(BaseCommand):
+    help = "Recompute each concierge agent's average response time from request assignment times"
+
+    def handle(self, *args, **options):
+        updated = ConciergeQueueService.refresh_response_times()
+        self.stdout.write(self.style.SUCCESS(f'Updated average response time of {updated} agents'))
@@ -0,0 +1,28 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from concierge.reminders import BATCH_SIZE, MESSAGE_KINDS, REMINDER_LEAD, AppointmentReminderService
+
+
+class Command(BaseCommand):
+    help = 'Send due appointment confirmations and reminders in batches; safe to re-run after a crash'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--kind', choices=sorted(MESSAGE_KINDS), help='Only send this kind of message')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument(
+            '--lead-hours', type=float, default=REMINDER_LEAD.total_seconds() / 3600,
+            help='Remind about appointments starting within this many hours',
+        )
+
+    def handle(self, *args, **options):
+        kinds = [options['kind']] if options['kind'] else list(MESSAGE_KINDS)
+        stats = AppointmentReminderService.run(
+            kinds=kinds, lead=timedelta(hours=options['lead_hours']), batch_size=options['batch_size'],
+        )
+        summary = ', '.join(f"{stats[kind]['sent']} {kind}s" for kind in kinds)
+        if stats['error']:
+            self.stderr.write(self.style.ERROR(f"Sent {summary} before stopping: {stats['error']}"))
+            return
+        self.stdout.write(self.style.SUCCESS(f"Sent {summary} in {stats['seconds']} s"))
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.8 on 2026-10-19 02:13
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('concierge', '0001_initial'),
+        ('specialists', '0003_specialistratingaggregate'),
+        ('wellness_plans', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='conciergeappointment',
+            index=models.Index(fields=['specialist', 'scheduled_datetime'], name='appt_specialist_time_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.8 on 2026-10-19 02:43
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('concierge', '0002_appointment_specialist_time_index'),
+        ('specialists', '0008_schedule_projections'),
+        ('wellness_plans', '0008_plan_session_time_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='conciergeappointment',
+            index=models.Index(fields=['client', 'scheduled_datetime'], name='appt_client_time_idx'),
+        ),
+    ]
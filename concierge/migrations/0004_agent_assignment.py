@@ -0,0 +1,51 @@
+# Generated by Django 5.2.8 on 2026-10-19 02:45
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_open_requests(apps, schema_editor):
+    ConciergeAgent = apps.get_model('concierge', 'ConciergeAgent')
+    ConciergeRequest = apps.get_model('concierge', 'ConciergeRequest')
+    counts = ConciergeRequest.objects.filter(
+        status__in=['assigned', 'in_progress', 'pending_approval', 'on_hold'], agent__isnull=False,
+    ).values('agent').annotate(total=Count('id')).order_by().values_list('agent', 'total')
+    for agent_id, total in counts:
+        ConciergeAgent.objects.filter(pk=agent_id).update(open_requests=total)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('concierge', '0003_appointment_client_time_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conciergeagent',
+            name='open_requests',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='conciergerequest',
+            name='assigned_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='conciergerequest',
+            name='language',
+            field=models.CharField(blank=True, help_text='Preferred language code; empty for any', max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='conciergeagent',
+            name='working_hours',
+            field=models.JSONField(default=dict, help_text='Weekly working schedule, e.g. {"monday": [["09:00", "17:00"]]}; empty means always available'),
+        ),
+        migrations.AddIndex(
+            model_name='conciergerequest',
+            index=models.Index(condition=models.Q(('agent__isnull', True), ('status', 'submitted')), fields=['priority', 'created_at'], name='concierge_queue_idx'),
+        ),
+        migrations.RunPython(count_open_requests, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-19 02:49
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('concierge', '0004_agent_assignment'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='conciergerequest',
+            name='concierge_queue_idx',
+        ),
+        migrations.AddIndex(
+            model_name='conciergerequest',
+            index=models.Index(condition=models.Q(('agent__isnull', True), ('status', 'submitted')), fields=['priority', 'deadline', 'created_at'], name='concierge_queue_idx'),
+        ),
+    ]
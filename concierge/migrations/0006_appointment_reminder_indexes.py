@@ -0,0 +1,25 @@
+# Generated by Django 5.2.8 on 2026-10-19 02:51
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('concierge', '0005_request_queue_deadline'),
+        ('specialists', '0008_schedule_projections'),
+        ('wellness_plans', '0008_plan_session_time_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='conciergeappointment',
+            index=models.Index(condition=models.Q(('reminder_sent', False), ('status__in', ['scheduled', 'confirmed'])), fields=['scheduled_datetime'], name='appt_reminder_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='conciergeappointment',
+            index=models.Index(condition=models.Q(('confirmation_sent', False), ('status__in', ['scheduled', 'confirmed'])), fields=['scheduled_datetime'], name='appt_confirmation_due_idx'),
+        ),
+    ]
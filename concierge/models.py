@@ -24,8 +24,13 @@ class ConciergeAgent(models.Model):
     # Availability
     is_active = models.BooleanField(default=True)
     max_concurrent_clients = models.PositiveIntegerField(default=20)
-    working_hours = models.JSONField(default=dict, help_text="Weekly working schedule")
+    working_hours = models.JSONField(
+        default=dict,
+        help_text='Weekly working schedule, e.g. {"monday": [["09:00", "17:00"]]}; empty means always available',
+    )
     timezone = models.CharField(max_length=50, default='UTC')
+    # Requests currently assigned and not finished, maintained by ConciergeAssignmentService
+    open_requests = models.PositiveIntegerField(default=0)
     
     created_at = models.DateTimeField(default=django_timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
@@ -106,6 +111,8 @@ class ConciergeRequest(models.Model):
     description = models.TextField()
     priority = models.CharField(max_length=15, choices=PRIORITY_LEVELS, default='normal')
     status = models.CharField(max_length=20, choices=REQUEST_STATUS, default='submitted')
+    language = models.CharField(max_length=10, blank=True, help_text="Preferred language code; empty for any")
+    assigned_at = models.DateTimeField(blank=True, null=True)
     
     # Scheduling
     preferred_date = models.DateTimeField(blank=True, null=True)
@@ -132,6 +139,13 @@ class ConciergeRequest(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # The assignment queue: unassigned submitted requests by deadline, then age, within a priority
+            models.Index(
+                fields=['priority', 'deadline', 'created_at'], name='concierge_queue_idx',
+                condition=models.Q(status='submitted', agent__isnull=True),
+            ),
+        ]
     
     def __str__(self):
         return f"{self.title} - {self.client.get_full_name()}"
@@ -194,6 +208,23 @@ class ConciergeAppointment(models.Model):
     created_at = models.DateTimeField(default=django_timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
     
+    class Meta:
+        indexes = [
+            # Range scans of a specialist's bookings for availability computation
+            models.Index(fields=['specialist', 'scheduled_datetime'], name='appt_specialist_time_idx'),
+            # Range scans of a client's calendar
+            models.Index(fields=['client', 'scheduled_datetime'], name='appt_client_time_idx'),
+            # Due reminders and pending confirmations, see concierge.reminders
+            models.Index(
+                fields=['scheduled_datetime'], name='appt_reminder_due_idx',
+                condition=models.Q(reminder_sent=False, status__in=['scheduled', 'confirmed']),
+            ),
+            models.Index(
+                fields=['scheduled_datetime'], name='appt_confirmation_due_idx',
+                condition=models.Q(confirmation_sent=False, status__in=['scheduled', 'confirmed']),
+            ),
+        ]
+    
     def __str__(self):
         return f"{self.title} - {self.client.get_full_name()} on {self.scheduled_datetime.date()}"
 
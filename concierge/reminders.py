@@ -0,0 +1,172 @@
+import logging
+import smtplib
+import time as timer
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.template.loader import get_template
+from django.utils import timezone
+
+from specialists.availability import get_zone
+from .models import ConciergeAppointment
+
+
+logger = logging.getLogger(__name__)
+
+# Appointments still owed messages; matches the partial indexes on ConciergeAppointment
+DUE_STATUSES = ['scheduled', 'confirmed']
+REMINDER_LEAD = timedelta(hours=24)
+BATCH_SIZE = 200
+COMPANY_NAME = 'VELORA'
+
+MESSAGE_KINDS = {
+    'confirmation': {
+        'flag': 'confirmation_sent',
+        'template': 'concierge/emails/appointment_confirmation.txt',
+        'subject': '{company}: your appointment "{title}" is booked',
+    },
+    'reminder': {
+        'flag': 'reminder_sent',
+        'template': 'concierge/emails/appointment_reminder.txt',
+        'subject': '{company} reminder: "{title}" is coming up',
+    },
+}
+
+ROW_FIELDS = (
+    'pk', 'title', 'appointment_type', 'scheduled_datetime', 'duration_minutes', 'timezone', 'is_virtual',
+    'meeting_link', 'location', 'preparation_instructions', 'client__email', 'client__first_name',
+    'client__last_name', 'client__username',
+)
+
+
+class AppointmentReminderService:
+    """
+    Service class to send appointment confirmations and reminders in
+    batches. Due appointments are read through partial indexes, messages
+    go out over one SMTP connection for the whole run, and each batch's
+    flags are set with a single UPDATE in the transaction holding its row
+    locks. A crash before that UPDATE commits leaves the batch unflagged,
+    so nothing is lost on restart; at worst that one batch is sent again.
+    """
+
+    @staticmethod
+    def due(kind, now, lead=REMINDER_LEAD):
+        """Future appointments owed a message of ``kind``"""
+        appointments = ConciergeAppointment.objects.filter(status__in=DUE_STATUSES, scheduled_datetime__gte=now)
+        if kind == 'reminder':
+            return appointments.filter(reminder_sent=False, scheduled_datetime__lte=now + lead)
+        return appointments.filter(confirmation_sent=False)
+
+    @staticmethod
+    def render(kind, rows):
+        """
+        (appointment id, EmailMessage) pairs for ``rows``, rendering one template for the batch
+        """
+        template = get_template(MESSAGE_KINDS[kind]['template'])
+        labels = dict(ConciergeAppointment.APPOINTMENT_TYPES)
+        from_email = getattr(settings, 'DEFAULT_FROM_EMAIL', 'noreply@velora.com')
+        messages = []
+        for (pk, title, appointment_type, starts_at, minutes, zone_name, is_virtual, meeting_link, location,
+             preparation, email, first_name, last_name, username) in rows:
+            if not email:
+                continue
+            zone = get_zone(zone_name)
+            # Templates show datetimes in the current timezone
+            with timezone.override(zone):
+                body = template.render({
+                    'name': f'{first_name} {last_name}'.strip() or username,
+                    'title': title,
+                    'appointment_type': labels.get(appointment_type, appointment_type).lower(),
+                    'starts_at': starts_at,
+                    'timezone': zone.key,
+                    'duration_minutes': minutes,
+                    'location': meeting_link if is_virtual else location,
+                    'preparation': preparation,
+                    'company_name': COMPANY_NAME,
+                })
+            subject = MESSAGE_KINDS[kind]['subject'].format(company=COMPANY_NAME, title=title)
+            messages.append((pk, EmailMessage(subject, body.strip() + '\n', from_email, [email])))
+        return messages
+
+    @staticmethod
+    def deliver(connection, messages):
+        """
+        Send over the open connection, reconnecting once if the server hung
+        up. Returns the ids of accepted messages, the ids of refused
+        recipients (a retry would not help them either) and the error that
+        stopped the batch early, if any.
+        """
+        sent, refused = [], []
+        for appointment_id, message in messages:
+            try:
+                try:
+                    connection.send_messages([message])
+                except smtplib.SMTPServerDisconnected:
+                    connection.close()
+                    connection.open()
+                    connection.send_messages([message])
+            except smtplib.SMTPRecipientsRefused:
+                logger.warning(f"Recipient refused for appointment {appointment_id}: {message.to}")
+                refused.append(appointment_id)
+                continue
+            except (smtplib.SMTPException, OSError) as e:
+                return sent, refused, e
+            sent.append(appointment_id)
+        return sent, refused, None
+
+    @classmethod
+    def send_batch(cls, kind, connection, now, lead=REMINDER_LEAD, batch_size=BATCH_SIZE):
+        """
+        Claim, send and flag one batch. Rows are locked with SKIP LOCKED, so
+        concurrent dispatchers work on different batches. Returns (claimed,
+        sent, error); after an error the unsent rest stays due.
+        """
+        with transaction.atomic():
+            rows = list(
+                cls.due(kind, now, lead).order_by('scheduled_datetime', 'pk')
+                .select_for_update(skip_locked=True, of=('self',)).values_list(*ROW_FIELDS)[:batch_size]
+            )
+            if not rows:
+                return 0, 0, None
+            messages = cls.render(kind, rows)
+            sent, refused, error = cls.deliver(connection, messages)
+            settled = sent + refused
+            if error is None:
+                # Appointments whose client has no address are settled as well
+                addressed = {pk for pk, _ in messages}
+                settled += [row[0] for row in rows if row[0] not in addressed]
+            if settled:
+                ConciergeAppointment.objects.filter(pk__in=settled).update(
+                    **{MESSAGE_KINDS[kind]['flag']: True}, updated_at=now,
+                )
+        return len(rows), len(sent), error
+
+    @classmethod
+    def run(cls, kinds=('confirmation', 'reminder'), now=None, lead=REMINDER_LEAD, batch_size=BATCH_SIZE):
+        """
+        Send everything due, batch by batch over one SMTP connection
+        """
+        now = now or timezone.now()
+        started = timer.perf_counter()
+        stats = {kind: {'claimed': 0, 'sent': 0} for kind in kinds}
+        stats['error'] = None
+        connection = get_connection(fail_silently=False)
+        connection.open()
+        try:
+            for kind in kinds:
+                while stats['error'] is None:
+                    claimed, sent, error = cls.send_batch(kind, connection, now, lead, batch_size)
+                    stats[kind]['claimed'] += claimed
+                    stats[kind]['sent'] += sent
+                    if error is not None:
+                        logger.error(f"Sending appointment {kind}s stopped: {str(error)}")
+                        stats['error'] = str(error)
+                    if claimed < batch_size:
+                        break
+        finally:
+            connection.close()
+        stats['seconds'] = round(timer.perf_counter() - started, 3)
+        logger.info(f"Appointment messages sent: {stats}")
+        return stats
@@ -0,0 +1,44 @@
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .assignment import OPEN_STATUSES, ConciergeAssignmentService
+from .models import ConciergeRequest
+
+
+def open_agent(instance):
+    """The agent a request counts against, or None once it is finished or unassigned"""
+    return instance.agent_id if instance.status in OPEN_STATUSES else None
+
+
+@receiver(post_init, sender=ConciergeRequest)
+def remember_open_agent(sender, instance, **kwargs):
+    # Reading a deferred field here would load it through another instance, and recurse
+    if not {'status', 'agent_id'} & instance.get_deferred_fields():
+        instance._open_agent = open_agent(instance)
+
+
+@receiver(pre_save, sender=ConciergeRequest)
+@receiver(pre_delete, sender=ConciergeRequest)
+def load_open_agent(sender, instance, raw=False, **kwargs):
+    """Requests loaded without status or agent take the stored values as their starting point"""
+    if raw or instance._state.adding or hasattr(instance, '_open_agent'):
+        return
+    row = ConciergeRequest.objects.filter(pk=instance.pk).values_list('status', 'agent_id').first()
+    instance._open_agent = row[1] if row and row[0] in OPEN_STATUSES else None
+
+
+@receiver(post_save, sender=ConciergeRequest)
+def update_agent_load(sender, instance, created=False, raw=False, **kwargs):
+    """Keep ConciergeAgent.open_requests current as requests are assigned, moved and finished"""
+    if raw:
+        return
+    previous, current = None if created else instance._open_agent, open_agent(instance)
+    if previous != current:
+        ConciergeAssignmentService.adjust_load(previous, -1)
+        ConciergeAssignmentService.adjust_load(current, 1)
+    instance._open_agent = current
+
+
+@receiver(post_delete, sender=ConciergeRequest)
+def release_agent_load(sender, instance, **kwargs):
+    ConciergeAssignmentService.adjust_load(instance._open_agent, -1)
@@ -1,3 +1,386 @@
-from django.test import TestCase
+import json
+import socketserver
+import threading
+from datetime import datetime, timedelta, timezone as dt_timezone
+from email import message_from_bytes
+from zoneinfo import ZoneInfo
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+
+from authentication.models import CustomUser
+from wellness_plans.services import PlanScheduleService
+from wellness_plans.tests import create_plan
+from .assignment import AgentPool, ConciergeAssignmentService, ConciergeQueueService, on_shift
+from .calendar_feed import calendar_events, ics_line
+from .models import ConciergeAgent, ConciergeAppointment, ConciergeRequest, ConciergeService
+from .reminders import AppointmentReminderService
+
+
+class CalendarFeedTests(TestCase):
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username='member', email='member@example.com', password='password', timezone='Europe/Paris',
+        )
+        agent_user = CustomUser.objects.create_user(username='agent', email='agent@example.com', password='password')
+        self.agent = ConciergeAgent.objects.create(user=agent_user, employee_id='A1', department='Concierge')
+        # Sessions on Jan 7, 9 and 11 at 09:00 UTC (the test timezone)
+        PlanScheduleService.generate(create_plan(self.user, modules=(('Strength', True),), duration_weeks=1))
+
+    def book(self, day, hour, **fields):
+        return ConciergeAppointment.objects.create(
+            client=self.user, agent=self.agent, title='Massage, then sauna', description='Bring a towel\nand water',
+            appointment_type='wellness_session', duration_minutes=90,
+            scheduled_datetime=datetime(2030, 1, day, hour, tzinfo=dt_timezone.utc), **fields,
+        )
+
+    def test_events_are_merged_in_time_order_and_local_time(self):
+        first = self.book(8, 7)
+        self.book(9, 9, status='cancelled')
+        last = self.book(9, 12, is_virtual=True, meeting_link='https://meet.example.com/x')
+        start = datetime(2030, 1, 1, tzinfo=dt_timezone.utc)
+        with self.assertNumQueries(2):
+            events = list(calendar_events(self.user, start, start + timedelta(days=10)))
+
+        self.assertEqual(
+            [(event['kind'], event['start'].date().day) for event in events],
+            [('plan_session', 7), ('concierge_appointment', 8), ('plan_session', 9), ('concierge_appointment', 9)],
+        )
+        self.assertEqual(events[1]['id'], first.pk)
+        self.assertEqual(events[1]['start'].isoformat(), '2030-01-08T08:00:00+01:00')
+        self.assertEqual(events[3]['location'], 'https://meet.example.com/x')
+        self.assertEqual(events[3]['id'], last.pk)
+
+    def test_json_and_ics_endpoints_stream(self):
+        self.book(8, 7)
+        self.client.force_login(self.user)
+        response = self.client.get('/api/concierge/calendar/', {'start': '2030-01-07', 'end': '2030-01-08'}, HTTP_HOST='localhost')
+        self.assertTrue(response.streaming)
+        payload = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(payload['timezone'], 'Europe/Paris')
+        self.assertEqual([event['start'] for event in payload['events']], ['2030-01-07T10:00:00+01:00', '2030-01-08T08:00:00+01:00'])
+
+        response = self.client.get('/api/concierge/calendar.ics', {'start': '2030-01-01', 'end': '2030-12-31'}, HTTP_HOST='localhost')
+        body = b''.join(response.streaming_content).decode()
+        self.assertEqual(response['Content-Type'], 'text/calendar; charset=utf-8')
+        self.assertEqual(body.count('BEGIN:VEVENT'), 4)
+        self.assertIn('DTSTART:20300108T070000Z\r\nDTEND:20300108T083000Z\r\n', body)
+        self.assertIn('SUMMARY:Massage\\, then sauna\r\n', body)
+        self.assertIn('DESCRIPTION:Bring a towel\\nand water\r\n', body)
+        self.assertTrue(body.endswith('END:VCALENDAR\r\n'))
+
+        too_long = self.client.get('/api/concierge/calendar/', {'start': '2030-01-01', 'end': '2031-12-31'}, HTTP_HOST='localhost')
+        self.assertEqual(too_long.status_code, 400)
+
+    def test_long_lines_are_folded_on_character_boundaries(self):
+        line = ics_line('SUMMARY', 'é' * 100)
+        parts = line[:-2].split('\r\n ')
+        self.assertTrue(all(len(part.encode()) <= 75 for part in parts))
+        self.assertEqual(''.join(parts), 'SUMMARY:' + 'é' * 100)
+
+
+class ConciergeAssignmentTests(TestCase):
+
+    def setUp(self):
+        self.client_user = CustomUser.objects.create_user(username='member', email='member@example.com', password='password')
+        self.services = {
+            category: ConciergeService.objects.create(name=category, description=category, category=category)
+            for category in ('travel', 'nutrition')
+        }
+        self.now = datetime(2030, 1, 7, 10, tzinfo=dt_timezone.utc)  # a Monday
+
+    def agent(self, name, **fields):
+        user = CustomUser.objects.create_user(username=name, email=f'{name}@example.com', password='password')
+        return ConciergeAgent.objects.create(user=user, employee_id=name, department='Concierge', **fields)
+
+    def request(self, category='travel', priority='normal', minutes=0, **fields):
+        return ConciergeRequest.objects.create(
+            client=self.client_user, service=self.services[category], title='Request', description='Request',
+            priority=priority, created_at=self.now - timedelta(minutes=60 - minutes), **fields,
+        )
+
+    def test_pool_prefers_least_loaded_eligible_agent(self):
+        pool = AgentPool([
+            (1, ['travel'], ['en'], 2, 1),
+            (2, [], ['en', 'fr'], 2, 0),
+            (3, ['nutrition'], ['fr'], 5, 0),
+        ])
+        self.assertEqual(pool.best('travel', 'en'), 2)
+        pool.take(2)
+        self.assertEqual(pool.best('travel', ''), 1)
+        self.assertEqual(pool.best('nutrition', 'fr'), 3)
+        self.assertIsNone(pool.best('travel', 'de'))
+        pool.take(1)
+        pool.take(2)
+        self.assertIsNone(pool.best('travel', 'en'))
+
+    def test_working_hours_follow_agent_timezone(self):
+        hours = {'monday': [['09:00', '12:00']]}
+        self.assertTrue(on_shift(hours, ZoneInfo('UTC'), self.now))
+        self.assertFalse(on_shift(hours, ZoneInfo('America/New_York'), self.now))
+        self.assertFalse(on_shift({'monday': [['bad']]}, ZoneInfo('UTC'), self.now))
+        self.assertTrue(on_shift({}, ZoneInfo('UTC'), self.now))
+
+    def test_run_assigns_by_priority_within_capacity(self):
+        specialist = self.agent('travel-agent', specializations=['travel'], languages=['en'], max_concurrent_clients=2)
+        self.agent('off-shift', working_hours={'monday': [['18:00', '20:00']]})
+        self.agent('inactive', is_active=False)
+        low = self.request(priority='low', minutes=0)
+        urgent = self.request(priority='urgent', minutes=30)
+        normal = self.request(priority='normal', minutes=10, language='en')
+        french = self.request(priority='emergency', language='fr')
+
+        with self.assertNumQueries(11):
+            stats = ConciergeAssignmentService.run(now=self.now)
+
+        self.assertEqual(stats['assigned'], 2)
+        self.assertEqual(
+            set(ConciergeRequest.objects.filter(agent=specialist).values_list('pk', flat=True)), {urgent.pk, normal.pk},
+        )
+        for pending in (low, french):
+            pending.refresh_from_db()
+            self.assertEqual((pending.status, pending.agent_id), ('submitted', None))
+        specialist.refresh_from_db()
+        self.assertEqual(specialist.open_requests, 2)
+        urgent.refresh_from_db()
+        self.assertEqual((urgent.status, urgent.assigned_at), ('assigned', self.now))
+
+    def test_commit_never_overassigns_with_stale_pool(self):
+        agent = self.agent('agent', max_concurrent_clients=2)
+        first, second, third = (self.request(minutes=index) for index in range(3))
+        stale = ConciergeAssignmentService.load_pool(self.now)
+        # Another worker assigns the first request before this one commits
+        ConciergeAssignmentService.commit(ConciergeAssignmentService.load_pool(self.now), [(first.pk, agent.pk)], self.now)
+        # Capacity for two is no longer there
+        self.assertEqual(ConciergeAssignmentService.commit(stale, [(first.pk, agent.pk), (second.pk, agent.pk)], self.now), 0)
+        # A request that was taken meanwhile hands its reservation back
+        self.assertEqual(ConciergeAssignmentService.commit(stale, [(first.pk, agent.pk)], self.now), 0)
+        agent.refresh_from_db()
+        self.assertEqual(agent.open_requests, 1)
+        self.assertEqual(ConciergeAssignmentService.commit(stale, [(second.pk, agent.pk)], self.now), 1)
+        self.assertEqual(ConciergeAssignmentService.commit(stale, [(third.pk, agent.pk)], self.now), 0)
+        agent.refresh_from_db()
+        third.refresh_from_db()
+        self.assertEqual((agent.open_requests, third.agent_id), (2, None))
+
+    def test_agent_load_follows_request_changes(self):
+        agent = self.agent('agent')
+        other = self.agent('other')
+        request = self.request(agent=agent, status='assigned')
+        agent.refresh_from_db()
+        self.assertEqual(agent.open_requests, 1)
+
+        request.agent = other
+        request.save()
+        request.status = 'completed'
+        request.save()
+        self.request(agent=agent, status='in_progress').delete()
+        agent.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual((agent.open_requests, other.open_requests), (0, 0))
+
+        ConciergeAgent.objects.filter(pk=agent.pk).update(open_requests=7)
+        self.assertEqual(ConciergeAssignmentService.reconcile(), 1)
+        agent.refresh_from_db()
+        self.assertEqual(agent.open_requests, 0)
+
+        # Partially loaded requests start from the stored status and agent
+        first, second = self.request(agent=agent, status='assigned'), self.request(agent=agent, status='in_progress')
+        self.assertEqual(len(ConciergeRequest.objects.only('status')), 3)
+        request = ConciergeRequest.objects.only('title').get(pk=first.pk)
+        request.status = 'completed'
+        request.save()
+        ConciergeRequest.objects.only('status').get(pk=second.pk).delete()
+        agent.refresh_from_db()
+        self.assertEqual(agent.open_requests, 0)
+
+    def test_claim_next_follows_priority_deadline_and_age(self):
+        agent = self.agent('agent', specializations=['travel'], languages=['EN'], max_concurrent_clients=3)
+        later = self.request(priority='high', minutes=0, deadline=self.now + timedelta(days=2))
+        no_deadline = self.request(priority='high', minutes=0)
+        sooner = self.request(priority='high', minutes=5, deadline=self.now + timedelta(days=1))
+        self.request(priority='emergency', category='nutrition')
+        self.request(priority='emergency', language='fr')
+        self.request(priority='low')
+
+        claimed = [ConciergeQueueService.claim_next(agent, now=self.now)['request'] for _ in range(3)]
+        self.assertEqual([request.pk for request in claimed], [sooner.pk, later.pk, no_deadline.pk])
+        # The returned instances are already counted; saving them must not count them again
+        claimed[0].save()
+        result = ConciergeQueueService.claim_next(agent, now=self.now)
+        self.assertEqual(result['error_code'], 'AT_CAPACITY')
+
+        agent.refresh_from_db()
+        self.assertEqual(agent.open_requests, 3)
+        sooner.refresh_from_db()
+        self.assertEqual((sooner.agent_id, sooner.status, sooner.assigned_at), (agent.pk, 'assigned', self.now))
+
+        self.assertEqual(ConciergeQueueService.refresh_response_times(), 1)
+        agent.refresh_from_db()
+        # Submitted 60, 60 and 55 minutes before the claims
+        self.assertEqual(agent.average_response_time, timedelta(minutes=175 / 3))
+
+    def test_claim_endpoint(self):
+        agent = self.agent('agent')
+        queued = self.request()
+        self.client.force_login(self.client_user)
+        self.assertEqual(self.client.post('/api/concierge/requests/claim/', HTTP_HOST='localhost').status_code, 403)
+
+        self.client.force_login(agent.user)
+        response = self.client.post('/api/concierge/requests/claim/', HTTP_HOST='localhost')
+        self.assertEqual(response.json()['request']['id'], queued.pk)
+        # Work on a claimed request keeps it counted once
+        request = ConciergeRequest.objects.get(pk=queued.pk)
+        request.status = 'in_progress'
+        request.save()
+        agent.refresh_from_db()
+        self.assertEqual(agent.open_requests, 1)
+
+        empty = self.client.post('/api/concierge/requests/claim/', HTTP_HOST='localhost')
+        self.assertEqual((empty.status_code, empty.json()['error_code']), (404, 'QUEUE_EMPTY'))
+        agent.refresh_from_db()
+        self.assertEqual(agent.open_requests, 1)
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+
+    def reply(self, text):
+        self.wfile.write(f'{text}\r\n'.encode())
+
+    def handle(self):
+        self.server.connections += 1
+        self.reply('220 localhost ready')
+        recipients = []
+        while line := self.rfile.readline():
+            command = line.decode().strip()
+            verb = command[:4].upper()
+            if verb in ('HELO', 'EHLO'):
+                self.reply('250 localhost')
+            elif verb == 'MAIL':
+                recipients = []
+                self.reply('250 OK')
+            elif verb == 'RCPT':
+                address = command.split(':', 1)[1].strip(' <>')
+                if address in self.server.refuse:
+                    self.reply('550 No such user')
+                else:
+                    recipients.append(address)
+                    self.reply('250 OK')
+            elif verb == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                data = []
+                while (line := self.rfile.readline()) not in (b'.\r\n', b''):
+                    data.append(line)
+                if set(recipients) & self.server.defer:
+                    self.reply('451 Try again later')
+                else:
+                    self.server.messages.append((recipients, message_from_bytes(b''.join(data))))
+                    self.reply('250 OK')
+            elif verb == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('250 OK')
+
+
+class LocalSMTPServer(socketserver.ThreadingTCPServer):
+    """Stand-in SMTP server on a free local port, recording connections and accepted messages"""
+    daemon_threads = True
+
+    def __init__(self, refuse=(), defer=()):
+        self.connections = 0
+        self.messages = []
+        self.refuse = set(refuse)
+        self.defer = set(defer)
+        super().__init__(('127.0.0.1', 0), SMTPHandler)
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        self.settings = override_settings(
+            EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend', EMAIL_HOST='127.0.0.1',
+            EMAIL_PORT=self.server_address[1], EMAIL_USE_TLS=False, EMAIL_USE_SSL=False,
+            EMAIL_HOST_USER='', EMAIL_HOST_PASSWORD='',
+        )
+        self.settings.enable()
+        return self
+
+    def __exit__(self, *args):
+        self.settings.disable()
+        self.shutdown()
+        self.server_close()
+
+
+class AppointmentReminderTests(TestCase):
+
+    def setUp(self):
+        agent_user = CustomUser.objects.create_user(username='agent', email='agent@example.com', password='password')
+        self.agent = ConciergeAgent.objects.create(user=agent_user, employee_id='A1', department='Concierge')
+        self.now = datetime(2030, 1, 7, 10, tzinfo=dt_timezone.utc)
+
+    def book(self, name, hours, **fields):
+        client = CustomUser.objects.create_user(
+            username=name, email=f'{name}@example.com', password='password', first_name=name.title(),
+        )
+        return ConciergeAppointment.objects.create(
+            client=client, agent=self.agent, title=f'Session for {name}', description='Session',
+            appointment_type='wellness_session', scheduled_datetime=self.now + timedelta(hours=hours), **fields,
+        )
+
+    def flags(self, appointment):
+        appointment.refresh_from_db()
+        return appointment.confirmation_sent, appointment.reminder_sent
+
+    def test_due_messages_go_out_over_one_connection_once(self):
+        soon = self.book('soon', 3, timezone='Europe/Paris', location='Spa, 2nd floor')
+        tomorrow = self.book('tomorrow', 20, status='confirmed', confirmation_sent=True)
+        later = self.book('later', 48)
+        cancelled = self.book('cancelled', 5, status='cancelled')
+        past = self.book('past', -2)
+
+        with LocalSMTPServer() as server:
+            stats = AppointmentReminderService.run(now=self.now, batch_size=2)
+            again = AppointmentReminderService.run(now=self.now, batch_size=2)
+
+        self.assertEqual((stats['confirmation']['sent'], stats['reminder']['sent'], stats['error']), (2, 2, None))
+        self.assertEqual((again['confirmation']['claimed'], again['reminder']['claimed']), (0, 0))
+        self.assertEqual(server.connections, 2)
+        self.assertEqual(
+            sorted((recipients[0], message['Subject'].split(':')[0]) for recipients, message in server.messages),
+            [
+                ('later@example.com', 'VELORA'), ('soon@example.com', 'VELORA'),
+                ('soon@example.com', 'VELORA reminder'), ('tomorrow@example.com', 'VELORA reminder'),
+            ],
+        )
+        reminder = next(
+            message for recipients, message in server.messages
+            if recipients == ['soon@example.com'] and 'reminder' in message['Subject']
+        )
+        body = reminder.get_payload(decode=True).decode()
+        self.assertIn('Hello Soon,', body)
+        self.assertIn('Monday 7 January 2030, 14:00 (Europe/Paris)', body)
+        self.assertIn('Where: Spa, 2nd floor', body)
+
+        self.assertEqual(self.flags(soon), (True, True))
+        self.assertEqual(self.flags(tomorrow), (True, True))
+        self.assertEqual(self.flags(later), (True, False))
+        self.assertEqual(self.flags(cancelled), (False, False))
+        self.assertEqual(self.flags(past), (False, False))
+
+    def test_failures_keep_unsent_appointments_due(self):
+        refused = self.book('refused', 1)
+        deferred = self.book('deferred', 2)
+        waiting = self.book('waiting', 3)
+
+        with LocalSMTPServer(refuse=['refused@example.com'], defer=['deferred@example.com']) as server:
+            stats = AppointmentReminderService.run(kinds=['reminder'], now=self.now)
+            self.assertEqual(stats['reminder']['sent'], 0)
+            self.assertIn('451', stats['error'])
+            # Refused addresses are settled, the deferred message and everything after it stay due
+            self.assertEqual(
+                [self.flags(appointment)[1] for appointment in (refused, deferred, waiting)], [True, False, False],
+            )
+
+            server.defer.clear()
+            stats = AppointmentReminderService.run(kinds=['reminder'], now=self.now)
+        self.assertEqual((stats['reminder']['sent'], stats['error']), (2, None))
+        self.assertEqual(len(server.messages), 2)
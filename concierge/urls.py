@@ -7,7 +7,10 @@ urlpatterns = [
     path('', views.concierge_dashboard, name='dashboard'),
     path('request/', views.create_request, name='create_request'),
     path('requests/', views.request_list, name='request_list'),
+    path('requests/claim/', views.claim_request, name='claim_request'),
     path('requests/<int:pk>/', views.request_detail, name='request_detail'),
     path('appointments/', views.appointment_list, name='appointment_list'),
+    path('calendar/', views.calendar_feed, name='calendar'),
+    path('calendar.ics', views.calendar_ics, name='calendar_ics'),
     path('services/', views.service_list, name='service_list'),
 ]
\ No newline at end of file
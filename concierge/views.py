@@ -1,8 +1,19 @@
+from datetime import datetime, time, timedelta
+
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse
-from .models import ConciergeRequest, ConciergeService, ConciergeAppointment
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.views.decorators.http import require_POST
+from specialists.availability import get_zone
+from .assignment import ConciergeQueueService
+from .calendar_feed import calendar_events, ics_stream, json_stream
+from .models import ConciergeAgent, ConciergeRequest, ConciergeService, ConciergeAppointment
+
+CALENDAR_DEFAULT_DAYS = 30
+CALENDAR_MAX_DAYS = 400
 
 
 @login_required
@@ -62,6 +73,32 @@ def request_detail(request, pk):
     return render(request, 'concierge/request_detail.html', context)
 
 
+@login_required
+@require_POST
+def claim_request(request):
+    """Assign the signed-in concierge agent the next queued request they can handle"""
+    agent = ConciergeAgent.objects.filter(user=request.user).first()
+    if agent is None:
+        return JsonResponse({'success': False, 'message': 'Only concierge agents can claim requests'}, status=403)
+
+    result = ConciergeQueueService.claim_next(agent)
+    claimed = result.pop('request')
+    if not result['success']:
+        return JsonResponse(result, status=409 if result['error_code'] == 'AT_CAPACITY' else 404)
+    result['request'] = {
+        'id': claimed.pk,
+        'title': claimed.title,
+        'priority': claimed.priority,
+        'client_id': claimed.client_id,
+        'service_id': claimed.service_id,
+        'language': claimed.language,
+        'deadline': claimed.deadline,
+        'created_at': claimed.created_at,
+        'assigned_at': claimed.assigned_at,
+    }
+    return JsonResponse(result)
+
+
 @login_required
 def appointment_list(request):
     """List user's appointments"""
@@ -74,6 +111,51 @@ def appointment_list(request):
     return render(request, 'concierge/appointment_list.html', context)
 
 
+def _calendar_range(request, default_start, default_days):
+    """
+    (start, end) datetimes for ?start=&end= dates (end inclusive) at midnight in the user's timezone
+    """
+    zone = get_zone(request.user.timezone)
+    start_date = parse_date(request.GET['start']) if request.GET.get('start') else default_start
+    end_date = parse_date(request.GET['end']) if request.GET.get('end') else None
+    if start_date is None or (request.GET.get('end') and end_date is None):
+        raise ValueError('start and end must be YYYY-MM-DD')
+    end_date = end_date or start_date + timedelta(days=default_days - 1)
+    if not 0 <= (end_date - start_date).days < CALENDAR_MAX_DAYS:
+        raise ValueError(f'end must be on or after start and at most {CALENDAR_MAX_DAYS} days later')
+    start = datetime.combine(start_date, time.min, tzinfo=zone)
+    end = datetime.combine(end_date + timedelta(days=1), time.min, tzinfo=zone)
+    return start, end
+
+
+@login_required
+def calendar_feed(request):
+    """Plan sessions and concierge appointments in one time-ordered, streamed list"""
+    try:
+        start, end = _calendar_range(request, timezone.localdate(), CALENDAR_DEFAULT_DAYS)
+    except ValueError as e:
+        return JsonResponse({'success': False, 'message': str(e)}, status=400)
+    events = calendar_events(request.user, start, end)
+    return StreamingHttpResponse(
+        json_stream(events, start, end, str(get_zone(request.user.timezone))), content_type='application/json',
+    )
+
+
+@login_required
+def calendar_ics(request):
+    """The same feed as an iCalendar file, a month back and a year ahead by default"""
+    try:
+        start, end = _calendar_range(request, timezone.localdate() - timedelta(days=30), 365 + 30)
+    except ValueError as e:
+        return JsonResponse({'success': False, 'message': str(e)}, status=400)
+    events = calendar_events(request.user, start, end)
+    response = StreamingHttpResponse(
+        ics_stream(events, str(get_zone(request.user.timezone)), timezone.now()), content_type='text/calendar; charset=utf-8',
+    )
+    response['Content-Disposition'] = 'attachment; filename="wellness-calendar.ics"'
+    return response
+
+
 def service_list(request):
     """List all concierge services"""
     services = ConciergeService.objects.filter(is_active=True).order_by('category', 'name')
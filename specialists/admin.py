@@ -1,5 +1,6 @@
 from django.contrib import admin
 from .models import SpecialistCategory, Specialist, SpecialistReview, SpecialistAvailability
+from .search import SpecialistSearchService
 
 
 @admin.register(SpecialistCategory)
@@ -35,6 +36,14 @@ class SpecialistAdmin(admin.ModelAdmin):
             'classes': ['collapse']
         }),
     )
+    
+    def get_search_results(self, request, queryset, search_term):
+        # Served by the indexed search documents instead of LIKE scans over joined columns
+        if not search_term:
+            return super().get_search_results(request, queryset, search_term)
+        if '@' in search_term:
+            return queryset.filter(user__email__iexact=search_term.strip()), False
+        return queryset.filter(pk__in=SpecialistSearchService.matches(search_term, accepting_only=False)), False
 
 
 @admin.register(SpecialistReview)
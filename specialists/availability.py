@@ -0,0 +1,366 @@
+import logging
+import time as timer
+from collections import defaultdict
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+import numpy as np
+from django.core.cache import cache
+from django.db.models import Q
+
+from concierge.models import ConciergeAppointment
+from .models import SpecialistAvailability, SpecialistCategory
+
+
+logger = logging.getLogger(__name__)
+
+# Appointment statuses that occupy the specialist's time
+BLOCKING_APPOINTMENT_STATUSES = ['scheduled', 'confirmed', 'in_progress']
+# Longest bookable appointment; overlap queries look back this far from a range's start
+MAX_APPOINTMENT_MINUTES = 24 * 60
+
+MAX_RANGE_DAYS = 62
+
+FREE_SPECIALISTS_CACHE_TIMEOUT = 300
+
+
+def get_zone(name):
+    """
+    Resolve a free-form timezone name, falling back to UTC for unknown values
+    """
+    try:
+        return ZoneInfo(name or 'UTC')
+    except (ZoneInfoNotFoundError, ValueError):
+        logger.warning(f"Unknown timezone {name!r}, falling back to UTC")
+        return ZoneInfo('UTC')
+
+
+def merge_intervals(intervals):
+    """
+    Sort intervals and merge overlapping or touching ones
+    """
+    merged = []
+    for start, end in sorted(intervals):
+        if end <= start:
+            continue
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return [(start, end) for start, end in merged]
+
+
+def subtract_intervals(free, busy):
+    """
+    Remove busy intervals from free intervals; both must be sorted and merged.
+    Single linear sweep over the two lists.
+    """
+    result = []
+    busy_index = 0
+    for start, end in free:
+        # Skip busy intervals that end before this free interval starts
+        while busy_index < len(busy) and busy[busy_index][1] <= start:
+            busy_index += 1
+        cursor = start
+        index = busy_index
+        while index < len(busy) and busy[index][0] < end:
+            busy_start, busy_end = busy[index]
+            if busy_start > cursor:
+                result.append((cursor, busy_start))
+            cursor = max(cursor, busy_end)
+            if cursor >= end:
+                break
+            index += 1
+        if cursor < end:
+            result.append((cursor, end))
+    return result
+
+
+def expand_weekly_windows(windows, start_date, end_date, zone):
+    """
+    Expand (day_of_week, start_time, end_time) windows into concrete UTC
+    intervals for every date in [start_date, end_date], interpreting the
+    times as wall-clock time in ``zone``. A window whose end is not after
+    its start runs past midnight into the next day.
+    """
+    by_weekday = defaultdict(list)
+    for day_of_week, start_time, end_time in windows:
+        by_weekday[day_of_week].append((start_time, end_time))
+
+    intervals = []
+    day = start_date
+    while day <= end_date:
+        for start_time, end_time in by_weekday.get(day.weekday(), ()):
+            local_start = datetime.combine(day, start_time, tzinfo=zone)
+            end_day = day if end_time > start_time else day + timedelta(days=1)
+            local_end = datetime.combine(end_day, end_time, tzinfo=zone)
+            intervals.append((local_start.astimezone(dt_timezone.utc), local_end.astimezone(dt_timezone.utc)))
+        day += timedelta(days=1)
+    return merge_intervals(intervals)
+
+
+def split_into_slots(intervals, slot_minutes, step_minutes=None):
+    """
+    Cut free intervals into slots of slot_minutes, starting every step_minutes
+    """
+    length = timedelta(minutes=slot_minutes)
+    step = timedelta(minutes=step_minutes or slot_minutes)
+    slots = []
+    for start, end in intervals:
+        cursor = start
+        while cursor + length <= end:
+            slots.append((cursor, cursor + length))
+            cursor += step
+    return slots
+
+
+def compute_free_slots(windows, busy, start_date, end_date, zone, slot_minutes, step_minutes=None, not_before=None):
+    """
+    Free slots for one specialist.
+
+    windows: iterable of (day_of_week, start_time, end_time)
+    busy: iterable of aware (start, end) datetimes
+    Returns a sorted list of UTC (start, end) tuples.
+    """
+    free = expand_weekly_windows(windows, start_date, end_date, zone)
+    if not_before is not None:
+        free = [(max(start, not_before), end) for start, end in free if end > not_before]
+    free = subtract_intervals(free, merge_intervals(busy))
+    return split_into_slots(free, slot_minutes, step_minutes)
+
+
+class AvailabilityService:
+    """
+    Service class to compute bookable specialist slots from weekly windows
+    and booked concierge appointments
+    """
+
+    @staticmethod
+    def range_bounds(start_date, end_date, zones):
+        """
+        UTC bounds covering [start_date, end_date] in every given timezone
+        """
+        lower = min(datetime.combine(start_date, time.min, tzinfo=zone) for zone in zones)
+        upper = max(datetime.combine(end_date + timedelta(days=2), time.min, tzinfo=zone) for zone in zones)
+        return lower, upper
+
+    @staticmethod
+    def load_windows(specialist_ids):
+        windows = defaultdict(list)
+        rows = SpecialistAvailability.objects.filter(
+            specialist_id__in=specialist_ids, is_active=True,
+        ).values_list('specialist_id', 'day_of_week', 'start_time', 'end_time')
+        for specialist_id, day_of_week, start_time, end_time in rows:
+            windows[specialist_id].append((day_of_week, start_time, end_time))
+        return windows
+
+    @staticmethod
+    def load_busy(specialist_ids, lower, upper):
+        """
+        Booked intervals per specialist overlapping [lower, upper)
+        """
+        busy = defaultdict(list)
+        # Appointments are bounded by their start; pad the lower bound by the
+        # longest bookable duration so appointments that started earlier still count.
+        rows = ConciergeAppointment.objects.filter(
+            specialist_id__in=specialist_ids,
+            status__in=BLOCKING_APPOINTMENT_STATUSES,
+            scheduled_datetime__gt=lower - timedelta(minutes=MAX_APPOINTMENT_MINUTES),
+            scheduled_datetime__lt=upper,
+        ).values_list('specialist_id', 'scheduled_datetime', 'duration_minutes')
+        for specialist_id, scheduled_datetime, duration_minutes in rows:
+            busy[specialist_id].append((scheduled_datetime, scheduled_datetime + timedelta(minutes=duration_minutes)))
+        return busy
+
+    @classmethod
+    def free_slots(cls, specialists, start_date, end_date, slot_minutes, step_minutes=None):
+        """
+        Free slots for several specialists in two queries.
+
+        Returns {specialist_id: [(start, end), ...]} in UTC.
+        """
+        zones = {specialist.id: get_zone(specialist.timezone) for specialist in specialists}
+        if not zones:
+            return {}
+        lower, upper = cls.range_bounds(start_date, end_date, set(zones.values()))
+        windows = cls.load_windows(list(zones))
+        busy = cls.load_busy(list(zones), lower, upper)
+        now = datetime.now(dt_timezone.utc)
+
+        return {
+            specialist_id: compute_free_slots(
+                windows.get(specialist_id, ()), busy.get(specialist_id, ()),
+                start_date, end_date, zone, slot_minutes, step_minutes, not_before=now,
+            )
+            for specialist_id, zone in zones.items()
+        }
+
+    @staticmethod
+    def generation_key(category):
+        return f'specialists:availability:generation:{category}'
+
+    @classmethod
+    def invalidate_specialist(cls, specialist_id, extra_category_ids=()):
+        """
+        Drop cached "who is free" data for every category the specialist is in
+        """
+        names = SpecialistCategory.objects.filter(
+            Q(specialists__id=specialist_id) | Q(pk__in=list(extra_category_ids))
+        ).values_list('name', flat=True).distinct()
+        for name in names:
+            cache.set(cls.generation_key(name), timer.time_ns(), None)
+
+    @classmethod
+    def load_category_day(cls, category, day):
+        """
+        Availability windows and bookings for every specialist in a category
+        around ``day``, cached per (category, day). Two queries on a miss.
+
+        Bookings start from day-1 in UTC, less the longest bookable duration,
+        up to day+2, so any client timezone's view of ``day`` (and overnight
+        windows) is fully contained.
+        """
+        generation = cache.get_or_set(cls.generation_key(category), timer.time_ns(), None)
+        key = f'specialists:availability:free:{category}:{generation}:{day.isoformat()}'
+        data = cache.get(key)
+        if data is not None:
+            return data
+
+        windows = list(SpecialistAvailability.objects.filter(
+            specialist__categories__name=category,
+            specialist__categories__is_active=True,
+            specialist__is_accepting_clients=True,
+            is_active=True,
+        ).values_list(
+            'specialist_id', 'specialist__timezone', 'specialist__title',
+            'specialist__user__first_name', 'specialist__user__last_name', 'specialist__average_rating',
+            'day_of_week', 'start_time', 'end_time',
+        ))
+
+        lower = datetime.combine(day - timedelta(days=1), time.min, tzinfo=dt_timezone.utc) - timedelta(minutes=MAX_APPOINTMENT_MINUTES)
+        upper = datetime.combine(day + timedelta(days=3), time.min, tzinfo=dt_timezone.utc)
+        bookings = [
+            (specialist_id, int(scheduled_datetime.timestamp()), int(scheduled_datetime.timestamp()) + duration_minutes * 60)
+            for specialist_id, scheduled_datetime, duration_minutes in ConciergeAppointment.objects.filter(
+                specialist__categories__name=category,
+                status__in=BLOCKING_APPOINTMENT_STATUSES,
+                scheduled_datetime__gte=lower,
+                scheduled_datetime__lt=upper,
+            ).values_list('specialist_id', 'scheduled_datetime', 'duration_minutes')
+        ]
+
+        data = {'windows': windows, 'bookings': bookings}
+        cache.set(key, data, FREE_SPECIALISTS_CACHE_TIMEOUT)
+        return data
+
+    @staticmethod
+    def minute_coverage(rows, starts, ends, origin, row_count, minutes, inner):
+        """
+        Boolean (row_count, minutes) matrix marking the minutes from ``origin``
+        covered by each interval. ``inner`` keeps only fully covered minutes
+        (for availability); otherwise any touched minute is marked (for bookings).
+        """
+        coverage = np.zeros((row_count, minutes + 1), dtype=np.int32)
+        if len(rows):
+            first = (starts - origin) / 60.0
+            last = (ends - origin) / 60.0
+            first = np.ceil(first) if inner else np.floor(first)
+            last = np.floor(last) if inner else np.ceil(last)
+            first = np.clip(first, 0, minutes).astype(np.int64)
+            last = np.clip(last, 0, minutes).astype(np.int64)
+            keep = last > first
+            np.add.at(coverage, (rows[keep], first[keep]), 1)
+            np.add.at(coverage, (rows[keep], last[keep]), -1)
+        return np.cumsum(coverage[:, :minutes], axis=1) > 0
+
+    @classmethod
+    def free_specialists(cls, category, day, start_time, end_time, zone, duration_minutes, limit=None, now=None):
+        """
+        Specialists in ``category`` with at least ``duration_minutes`` of
+        contiguous free time between start_time and end_time on ``day`` in
+        ``zone`` (and not before ``now``), ranked by rating, then total free
+        time, then earliest start.
+
+        Candidates are evaluated together on a per-minute grid with NumPy.
+        """
+        window_start = datetime.combine(day, start_time, tzinfo=zone)
+        window_end = datetime.combine(day, end_time, tzinfo=zone)
+        origin = int(window_start.timestamp())
+        minutes = (int(window_end.timestamp()) - origin) // 60
+        if minutes < duration_minutes:
+            return []
+
+        data = cls.load_category_day(category, day)
+        specialists = {}
+        window_rows, window_starts, window_ends = [], [], []
+        for specialist_id, tz_name, title, first_name, last_name, rating, day_of_week, start, end in data['windows']:
+            if specialist_id not in specialists:
+                specialists[specialist_id] = {
+                    'index': len(specialists),
+                    'name': f"{title} {first_name} {last_name}".strip(),
+                    'average_rating': rating,
+                    'zone': get_zone(tz_name),
+                }
+            info = specialists[specialist_id]
+            local_first = window_start.astimezone(info['zone']).date() - timedelta(days=1)
+            local_last = window_end.astimezone(info['zone']).date()
+            for local_start, local_end in expand_weekly_windows([(day_of_week, start, end)], local_first, local_last, info['zone']):
+                window_rows.append(info['index'])
+                window_starts.append(local_start.timestamp())
+                window_ends.append(local_end.timestamp())
+
+        if not specialists:
+            return []
+
+        booking_rows, booking_starts, booking_ends = [], [], []
+        for specialist_id, start, end in data['bookings']:
+            if specialist_id in specialists:
+                booking_rows.append(specialists[specialist_id]['index'])
+                booking_starts.append(start)
+                booking_ends.append(end)
+
+        count = len(specialists)
+        available = cls.minute_coverage(
+            np.array(window_rows, dtype=np.int64), np.array(window_starts, dtype=np.float64),
+            np.array(window_ends, dtype=np.float64), origin, count, minutes, inner=True,
+        )
+        booked = cls.minute_coverage(
+            np.array(booking_rows, dtype=np.int64), np.array(booking_starts, dtype=np.float64),
+            np.array(booking_ends, dtype=np.float64), origin, count, minutes, inner=False,
+        )
+        free = available & ~booked
+        # Minutes already past are never free, as in free_slots()
+        now = now or datetime.now(dt_timezone.utc)
+        free[:, :int(np.clip(np.ceil((now.timestamp() - origin) / 60.0), 0, minutes))] = False
+
+        # Length of the free run ending at each minute, for all candidates at once
+        counts = np.cumsum(free, axis=1)
+        runs = counts - np.maximum.accumulate(np.where(free, 0, counts), axis=1)
+        fits = runs >= duration_minutes
+        has_fit = fits.any(axis=1)
+        first_start = fits.argmax(axis=1) - duration_minutes + 1
+        free_minutes = free.sum(axis=1)
+        longest = runs.max(axis=1)
+
+        ordered = list(specialists.items())
+        ratings = np.array([float(info['average_rating']) for _, info in ordered])
+        ranking = np.lexsort((first_start, -free_minutes, -ratings))
+
+        results = []
+        for index in ranking:
+            if not has_fit[index]:
+                continue
+            specialist_id, info = ordered[index]
+            first_available = datetime.fromtimestamp(origin + int(first_start[index]) * 60, tz=dt_timezone.utc)
+            results.append({
+                'specialist_id': specialist_id,
+                'name': info['name'],
+                'average_rating': str(info['average_rating']),
+                'first_available': first_available.astimezone(zone).isoformat(),
+                'free_minutes': int(free_minutes[index]),
+                'longest_free_minutes': int(longest[index]),
+            })
+            if limit and len(results) >= limit:
+                break
+        return results
@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+
+# Backends whose entries are private to one process
+PROCESS_LOCAL_CACHES = {
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+}
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """
+    Listing invalidation bumps a cache key that every web worker and cron
+    process must see, so production needs a shared default cache
+    """
+    backend = settings.CACHES.get('default', {}).get('BACKEND')
+    if settings.DEBUG or backend not in PROCESS_LOCAL_CACHES:
+        return []
+    return [Error(
+        f'The default cache ({backend}) is not shared between processes.',
+        hint='Set REDIS_URL so cache invalidation reaches every worker.',
+        id='specialists.E001',
+    )]
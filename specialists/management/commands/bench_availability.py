@@ -0,0 +1,54 @@
+import random
+import time as timer
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+
+from django.core.management.base import BaseCommand
+
+from specialists.availability import compute_free_slots, get_zone
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the availability slot engine on synthetic specialists (no database access)'
+
+    ZONES = ['UTC', 'America/New_York', 'Europe/London', 'Asia/Kolkata', 'Australia/Sydney']
+
+    def add_arguments(self, parser):
+        parser.add_argument('--specialists', type=int, default=1000)
+        parser.add_argument('--days', type=int, default=30)
+        parser.add_argument('--appointments-per-day', type=int, default=4)
+        parser.add_argument('--slot-minutes', type=int, default=60)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def build_specialist(self, rng, start_date, days, per_day):
+        windows = []
+        for day_of_week in range(7):
+            if rng.random() < 0.8:
+                windows.append((day_of_week, time(rng.choice([7, 8, 9])), time(12)))
+                windows.append((day_of_week, time(13), time(rng.choice([17, 18, 19]))))
+        busy = []
+        for offset in range(days):
+            day = start_date + timedelta(days=offset)
+            for _ in range(per_day):
+                start = datetime.combine(day, time(rng.randint(6, 20), rng.choice([0, 30])), tzinfo=dt_timezone.utc)
+                busy.append((start, start + timedelta(minutes=rng.choice([30, 60, 90]))))
+        return windows, busy, get_zone(rng.choice(self.ZONES))
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        start_date = date.today() + timedelta(days=1)
+        end_date = start_date + timedelta(days=options['days'] - 1)
+        specialists = [
+            self.build_specialist(rng, start_date, options['days'], options['appointments_per_day'])
+            for _ in range(options['specialists'])
+        ]
+
+        started = timer.perf_counter()
+        total_slots = 0
+        for windows, busy, zone in specialists:
+            total_slots += len(compute_free_slots(windows, busy, start_date, end_date, zone, options['slot_minutes']))
+        elapsed = timer.perf_counter() - started
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{options['specialists']} specialists x {options['days']} days: {total_slots} slots in "
+            f"{elapsed * 1000:.1f} ms ({elapsed / options['specialists'] * 1000:.3f} ms per specialist)"
+        ))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from specialists.services import SpecialistRatingService
+
+
+class Command(BaseCommand):
+    help = 'Rebuild specialist rating aggregates and average_rating/total_reviews from reviews'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--specialist', type=int, action='append', dest='specialist_ids',
+                            help='Only rebuild the given specialist id (repeatable)')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        rebuilt = SpecialistRatingService.rebuild(
+            specialist_ids=options['specialist_ids'],
+            batch_size=options['batch_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt rating aggregates for {rebuilt} specialists'))
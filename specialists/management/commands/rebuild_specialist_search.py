@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from specialists.search import SpecialistSearchService
+
+
+class Command(BaseCommand):
+    help = 'Rebuild search documents (full-text and autocomplete) for every specialist'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        refreshed = SpecialistSearchService.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt search documents for {refreshed} specialists'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from specialists.similarity import SpecialistSimilarityService
+
+
+class Command(BaseCommand):
+    help = 'Rebuild tf-idf postings and precomputed neighbours for every specialist'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        indexed = SpecialistSimilarityService.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt similarity index for {indexed} specialists'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from specialists.matching import SpecialistMatchingService
+
+
+class Command(BaseCommand):
+    help = 'Recompute matching feature vectors for every specialist'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        refreshed = SpecialistMatchingService.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt feature vectors for {refreshed} specialists'))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from specialists.models import Specialist
+from specialists.schedule import SpecialistScheduleService
+
+
+class Command(BaseCommand):
+    help = 'Rolling refresh of stale specialist schedule summaries and category counts (run from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=1000, help='Maximum specialists refreshed per run')
+        parser.add_argument('--batch-size', type=int, default=200)
+        parser.add_argument('--all', action='store_true', help='Refresh every specialist and category')
+
+    def handle(self, *args, **options):
+        if options['all']:
+            ids = list(Specialist.objects.order_by('pk').values_list('pk', flat=True))
+            refreshed = 0
+            for start in range(0, len(ids), options['batch_size']):
+                refreshed += SpecialistScheduleService.refresh(ids[start:start + options['batch_size']])
+        else:
+            refreshed = SpecialistScheduleService.refresh_stale(limit=options['limit'], batch_size=options['batch_size'])
+        categories = SpecialistScheduleService.refresh_categories()
+        self.stdout.write(self.style.SUCCESS(f'Refreshed {refreshed} schedule summaries and {categories} category counts'))
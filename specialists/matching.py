@@ -0,0 +1,304 @@
+import logging
+import threading
+import time as timer
+from datetime import timedelta
+
+import numpy as np
+from django.core.cache import cache
+from django.db import transaction
+
+from authentication.models import UserProfile
+from .models import Specialist, SpecialistCategory, SpecialistFeatureVector
+from .services import SpecialistBookingService
+
+
+logger = logging.getLogger(__name__)
+
+# Bump when the feature layout below changes; stale rows are rebuilt on load
+FEATURE_VERSION = 1
+
+CATEGORY_FEATURES = [name for name, _ in SpecialistCategory.CATEGORY_CHOICES]
+
+# Topic -> keywords searched for in a specialist's professional text
+TOPIC_KEYWORDS = {
+    'weight': ['weight', 'fat loss', 'obesity', 'metabolic', 'body composition'],
+    'muscle': ['strength', 'muscle', 'hypertrophy', 'resistance', 'powerlifting'],
+    'endurance': ['endurance', 'cardio', 'running', 'marathon', 'cycling', 'triathlon'],
+    'stress': ['stress', 'anxiety', 'mindfulness', 'meditation', 'sleep', 'burnout'],
+    'diet': ['diet', 'nutrition', 'meal', 'vegan', 'vegetarian', 'keto', 'gluten'],
+    'clinical': ['diabetes', 'hypertension', 'cardiac', 'chronic', 'thyroid', 'clinical'],
+    'mobility': ['mobility', 'injury', 'rehab', 'physio', 'posture', 'pain'],
+    'longevity': ['longevity', 'aging', 'ageing', 'hormone'],
+}
+TOPIC_FEATURES = list(TOPIC_KEYWORDS)
+
+INTEREST_FEATURES = CATEGORY_FEATURES + TOPIC_FEATURES
+QUALITY_FEATURES = ['rating', 'experience']
+FEATURES = INTEREST_FEATURES + QUALITY_FEATURES
+FEATURE_INDEX = {name: index for index, name in enumerate(FEATURES)}
+
+# How much each quality feature adds to a match score
+QUALITY_WEIGHTS = {'rating': 0.3, 'experience': 0.1}
+MAX_EXPERIENCE_YEARS = 30
+
+GOAL_WEIGHTS = {
+    'lose_weight': {'nutrition': 1.0, 'fitness': 0.6, 'weight': 1.0, 'diet': 0.6},
+    'weight_fat_loss': {'nutrition': 1.0, 'fitness': 0.6, 'weight': 1.0, 'diet': 0.6},
+    'gain_weight': {'nutrition': 1.0, 'fitness': 0.5, 'muscle': 0.6, 'diet': 0.6},
+    'maintain_weight': {'nutrition': 0.8, 'fitness': 0.4, 'diet': 0.5},
+    'build_muscle': {'fitness': 1.0, 'muscle': 1.0, 'nutrition': 0.4},
+    'improve_endurance': {'fitness': 1.0, 'endurance': 1.0},
+    'improve_fitness_endurance': {'fitness': 1.0, 'endurance': 1.0},
+    'stress_relief': {'mental_health': 1.0, 'stress': 1.0, 'alternative': 0.4, 'coaching': 0.3},
+    'general_fitness': {'fitness': 0.8, 'coaching': 0.3},
+}
+
+ACTIVITY_WEIGHTS = {
+    'sedentary': {'coaching': 0.3, 'fitness': 0.3},
+    'lightly_active': {'fitness': 0.2},
+    'very_active': {'physiotherapy': 0.3, 'mobility': 0.3, 'endurance': 0.2},
+    'extremely_active': {'physiotherapy': 0.4, 'mobility': 0.4, 'endurance': 0.2},
+}
+
+TIER_RANKS = {name: rank for rank, (name, _) in enumerate(Specialist.TIER_CHOICES)}
+
+VERSION_KEY = 'specialists:matching:version'
+WATERMARK_SLACK_SECONDS = 300
+
+
+def _normalize(vector):
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def specialist_features(specialist, category_names):
+    """
+    Feature vector for one specialist: L2-normalized interest block
+    (categories + text topics) followed by scaled quality features
+    """
+    vector = np.zeros(len(FEATURES), dtype=np.float32)
+    for name in category_names:
+        if name in FEATURE_INDEX:
+            vector[FEATURE_INDEX[name]] = 1.0
+
+    text = ' '.join([
+        specialist.specializations, specialist.professional_summary, specialist.certifications,
+    ]).lower()
+    for topic, keywords in TOPIC_KEYWORDS.items():
+        hits = sum(1 for keyword in keywords if keyword in text)
+        if hits:
+            vector[FEATURE_INDEX[topic]] = min(1.0, 0.5 + 0.25 * hits)
+
+    interest = len(INTEREST_FEATURES)
+    vector[:interest] = _normalize(vector[:interest])
+    vector[FEATURE_INDEX['rating']] = float(specialist.average_rating) / 5.0
+    vector[FEATURE_INDEX['experience']] = min(specialist.years_experience, MAX_EXPERIENCE_YEARS) / MAX_EXPERIENCE_YEARS
+    return vector
+
+
+def user_features(profile):
+    """
+    Query vector for a user profile, on the same layout as specialist_features
+    """
+    vector = np.zeros(len(FEATURES), dtype=np.float32)
+
+    def add(weights, scale=1.0):
+        for name, weight in weights.items():
+            vector[FEATURE_INDEX[name]] += weight * scale
+
+    if profile is not None:
+        if profile.primary_goal:
+            add(GOAL_WEIGHTS.get(profile.primary_goal, {}))
+        for goal in profile.health_goals or []:
+            if isinstance(goal, str) and goal != profile.primary_goal:
+                add(GOAL_WEIGHTS.get(goal, {}), 0.5)
+        add(ACTIVITY_WEIGHTS.get(profile.activity_level, {}))
+        if profile.medical_conditions:
+            add({'clinical': 0.8, 'physiotherapy': 0.3})
+        if profile.dietary_preferences:
+            add({'diet': 0.5, 'nutrition': 0.3})
+
+    interest = len(INTEREST_FEATURES)
+    vector[:interest] = _normalize(vector[:interest])
+    for name, weight in QUALITY_WEIGHTS.items():
+        vector[FEATURE_INDEX[name]] = weight
+    return vector
+
+
+class SpecialistMatchIndex:
+    """
+    In-process matrix of all specialist feature vectors.
+
+    Other processes signal changes through a cache version; on the next
+    query the index pulls only rows updated since its watermark, or reloads
+    fully when a specialist was removed.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = None
+        self.watermark = None
+        self.positions = {}
+        # (ids, matrix, tier_ranks, accepting), swapped as one object so
+        # readers never see arrays of different lengths
+        self.snapshot = (
+            np.zeros(0, dtype=np.int64),
+            np.zeros((0, len(FEATURES)), dtype=np.float32),
+            np.zeros(0, dtype=np.int8),
+            np.zeros(0, dtype=bool),
+        )
+
+    def _rows(self, since=None):
+        rows = SpecialistFeatureVector.objects.filter(feature_version=FEATURE_VERSION)
+        if since is not None:
+            # Re-read a slack window: rows saved just before the watermark may
+            # have committed after it was taken. Re-applying a row is harmless.
+            rows = rows.filter(updated_at__gte=since - timedelta(seconds=WATERMARK_SLACK_SECONDS))
+        return rows.values_list('specialist_id', 'vector', 'tier', 'is_accepting_clients', 'updated_at')
+
+    def _apply(self, rows, full):
+        if full:
+            self.positions = {}
+            self.watermark = None
+            ids, ranks, accepting = [], [], []
+            matrix = np.zeros((0, len(FEATURES)), dtype=np.float32)
+        else:
+            ids, matrix, ranks, accepting = self.snapshot
+            ids, ranks, accepting = ids.tolist(), ranks.tolist(), accepting.tolist()
+            matrix = matrix.copy()
+
+        new_vectors = []
+        for specialist_id, raw, tier, is_accepting, updated_at in rows:
+            vector = np.frombuffer(bytes(raw), dtype=np.float32)
+            rank = TIER_RANKS.get(tier, len(TIER_RANKS))
+            position = self.positions.get(specialist_id)
+            if position is None:
+                self.positions[specialist_id] = len(ids)
+                ids.append(specialist_id)
+                ranks.append(rank)
+                accepting.append(is_accepting)
+                new_vectors.append(vector)
+            elif position < len(matrix):
+                matrix[position] = vector
+                ranks[position] = rank
+                accepting[position] = is_accepting
+            else:
+                # Row added earlier in this batch and updated again
+                new_vectors[position - len(matrix)] = vector
+                ranks[position] = rank
+                accepting[position] = is_accepting
+            if self.watermark is None or updated_at > self.watermark:
+                self.watermark = updated_at
+
+        if new_vectors:
+            matrix = np.vstack([matrix, np.stack(new_vectors)])
+        self.snapshot = (
+            np.array(ids, dtype=np.int64),
+            matrix,
+            np.array(ranks, dtype=np.int8),
+            np.array(accepting, dtype=bool),
+        )
+
+    def ensure_fresh(self):
+        state = cache.get_or_set(VERSION_KEY, {'version': timer.time_ns(), 'epoch': 0}, None)
+        if self.version == state:
+            return
+        with self.lock:
+            if self.version == state:
+                return
+            full = self.version is None or self.version['epoch'] != state['epoch']
+            self._apply(self._rows(since=None if full else self.watermark), full)
+            self.version = state
+
+    def top_k(self, query, max_tier_rank, k):
+        """
+        (ids, scores) of the k best entitled, accepting specialists
+        """
+        self.ensure_fresh()
+        ids, matrix, tier_ranks, accepting = self.snapshot
+        scores = matrix @ query
+        eligible = accepting & (tier_ranks <= max_tier_rank)
+        k = min(k, int(eligible.sum()))
+        if k <= 0:
+            return [], []
+        scores = np.where(eligible, scores, -np.inf)
+        candidates = np.argpartition(-scores, k - 1)[:k]
+        ordered = candidates[np.argsort(-scores[candidates], kind='stable')]
+        return ids[ordered].tolist(), scores[ordered].tolist()
+
+
+match_index = SpecialistMatchIndex()
+
+
+class SpecialistMatchingService:
+    """
+    Service class to maintain specialist feature vectors and match users to specialists
+    """
+
+    @staticmethod
+    def bump_version(removed=False):
+        state = cache.get(VERSION_KEY) or {'epoch': 0}
+        now = timer.time_ns()
+        cache.set(VERSION_KEY, {'version': now, 'epoch': now if removed else state['epoch']}, None)
+
+    @classmethod
+    def refresh_on_commit(cls, specialist_ids):
+        """
+        Refresh once the current transaction commits, so deleted specialists
+        are skipped and readers never see uncommitted vectors
+        """
+        specialist_ids = list(specialist_ids)
+        transaction.on_commit(lambda: cls.refresh(specialist_ids))
+
+    @classmethod
+    def refresh(cls, specialist_ids):
+        """
+        Recompute and store vectors for the given specialists
+        """
+        specialists = list(
+            Specialist.objects.filter(pk__in=specialist_ids).prefetch_related('categories')
+        )
+        rows = [
+            SpecialistFeatureVector(
+                specialist_id=specialist.pk,
+                vector=specialist_features(specialist, [category.name for category in specialist.categories.all()]).tobytes(),
+                feature_version=FEATURE_VERSION,
+                tier=specialist.tier,
+                is_accepting_clients=specialist.is_accepting_clients,
+            )
+            for specialist in specialists
+        ]
+        if rows:
+            SpecialistFeatureVector.objects.bulk_create(
+                rows,
+                update_conflicts=True,
+                unique_fields=['specialist'],
+                update_fields=['vector', 'feature_version', 'tier', 'is_accepting_clients', 'updated_at'],
+            )
+            cls.bump_version()
+        return len(rows)
+
+    @classmethod
+    def rebuild(cls, batch_size=1000):
+        ids = list(Specialist.objects.order_by('pk').values_list('pk', flat=True))
+        refreshed = 0
+        for start in range(0, len(ids), batch_size):
+            refreshed += cls.refresh(ids[start:start + batch_size])
+        cls.bump_version(removed=True)
+        return refreshed
+
+    @staticmethod
+    def recommend(user, k=10, profile=None):
+        """
+        Top-k (specialist_id, score) pairs for a user within their tier entitlement.
+        Pass ``profile`` when the caller already has it loaded.
+        """
+        tier = SpecialistBookingService.client_tier(user)
+        if tier is None:
+            return []
+        # Subscription tiers start at 'basic'; specialist tiers start at 'premium'
+        max_rank = SpecialistBookingService.TIER_RANKS[tier] - SpecialistBookingService.TIER_RANKS['premium']
+        if profile is None:
+            profile = UserProfile.objects.filter(user=user).first()
+        ids, scores = match_index.top_k(user_features(profile), max_rank, k)
+        return list(zip(ids, scores))
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.8 on 2026-10-19 02:09
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('specialists', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='specialist',
+            index=models.Index(fields=['is_accepting_clients', '-average_rating', '-id'], name='spec_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='specialist',
+            index=models.Index(fields=['is_accepting_clients', 'tier', '-average_rating', '-id'], name='spec_tier_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='specialist',
+            index=models.Index(fields=['is_accepting_clients', 'is_verified', 'is_featured', '-average_rating', '-id'], name='spec_status_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='specialist',
+            index=models.Index(fields=['is_accepting_clients', 'hourly_rate', 'id'], name='spec_hourly_rate_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='specialist',
+            index=models.Index(fields=['is_accepting_clients', 'consultation_rate', 'id'], name='spec_consult_rate_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='specialist',
+            index=models.Index(fields=['is_accepting_clients', '-years_experience', '-id'], name='spec_experience_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='specialist',
+            index=models.Index(fields=['is_accepting_clients', '-created_at', '-id'], name='spec_newest_idx'),
+        ),
+    ]
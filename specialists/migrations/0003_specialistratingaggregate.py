@@ -0,0 +1,27 @@
+# Generated by Django 5.2.8 on 2026-10-19 02:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('specialists', '0002_specialist_directory_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SpecialistRatingAggregate',
+            fields=[
+                ('specialist', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rating_aggregate', serialize=False, to='specialists.specialist')),
+                ('review_count', models.PositiveIntegerField(default=0)),
+                ('rating_sum', models.PositiveIntegerField(default=0)),
+                ('professionalism_sum', models.PositiveIntegerField(default=0)),
+                ('expertise_sum', models.PositiveIntegerField(default=0)),
+                ('communication_sum', models.PositiveIntegerField(default=0)),
+                ('results_sum', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
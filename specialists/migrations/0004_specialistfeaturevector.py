@@ -0,0 +1,25 @@
+# Generated by Django 5.2.8 on 2026-10-19 02:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('specialists', '0003_specialistratingaggregate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SpecialistFeatureVector',
+            fields=[
+                ('specialist', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='feature_vector', serialize=False, to='specialists.specialist')),
+                ('vector', models.BinaryField()),
+                ('feature_version', models.PositiveIntegerField(default=1)),
+                ('tier', models.CharField(choices=[('premium', 'Premium'), ('platinum', 'Platinum'), ('diamond', 'Diamond')], max_length=20)),
+                ('is_accepting_clients', models.BooleanField(default=True)),
+                ('updated_at', models.DateTimeField(auto_now=True, db_index=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.8 on 2026-10-19 02:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('specialists', '0004_specialistfeaturevector'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SpecialistNeighbour',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('neighbour', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='specialists.specialist')),
+                ('specialist', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='neighbours', to='specialists.specialist')),
+            ],
+            options={
+                'ordering': ['-score'],
+                'unique_together': {('specialist', 'neighbour')},
+            },
+        ),
+        migrations.CreateModel(
+            name='SpecialistTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('term_frequency', models.PositiveIntegerField()),
+                ('weight', models.FloatField(help_text='L2-normalized tf-idf weight')),
+                ('specialist', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='terms', to='specialists.specialist')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['term'], name='spec_term_idx')],
+                'unique_together': {('specialist', 'term')},
+            },
+        ),
+    ]
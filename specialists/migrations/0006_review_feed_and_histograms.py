@@ -0,0 +1,56 @@
+# Generated by Django 5.2.8 on 2026-10-19 02:20
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('specialists', '0005_specialist_similarity'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SpecialistReviewVote',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='specialistratingaggregate',
+            name='distributions',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='specialistreview',
+            name='helpful_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='specialistreview',
+            index=models.Index(fields=['specialist', 'is_public', '-created_at', '-id'], name='spec_review_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='specialistreview',
+            index=models.Index(fields=['specialist', 'is_public', '-helpful_count', '-created_at', '-id'], name='spec_review_helpful_idx'),
+        ),
+        migrations.AddField(
+            model_name='specialistreviewvote',
+            name='review',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='helpful_votes', to='specialists.specialistreview'),
+        ),
+        migrations.AddField(
+            model_name='specialistreviewvote',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='review_votes', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterUniqueTogether(
+            name='specialistreviewvote',
+            unique_together={('review', 'user')},
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.8 on 2026-10-19 02:22
+
+import django.contrib.postgres.search
+import django.db.models.deletion
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+
+SEARCH_INDEXES = [
+    'CREATE INDEX spec_search_vector_idx ON specialists_specialistsearchdocument USING gin (search_vector)',
+    'CREATE INDEX spec_search_name_trgm_idx ON specialists_specialistsearchdocument USING gin (name gin_trgm_ops)',
+    'CREATE INDEX spec_search_keywords_trgm_idx ON specialists_specialistsearchdocument USING gin (keywords gin_trgm_ops)',
+]
+
+
+def create_search_indexes(apps, schema_editor):
+    # GIN and trigram indexes only exist on Postgres; other backends fall back to LIKE
+    if schema_editor.connection.vendor == 'postgresql':
+        for statement in SEARCH_INDEXES:
+            schema_editor.execute(statement)
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for name in ['spec_search_vector_idx', 'spec_search_name_trgm_idx', 'spec_search_keywords_trgm_idx']:
+            schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('specialists', '0006_review_feed_and_histograms'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.CreateModel(
+            name='SpecialistSearchDocument',
+            fields=[
+                ('specialist', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='specialists.specialist')),
+                ('name', models.CharField(max_length=200)),
+                ('keywords', models.TextField(blank=True)),
+                ('document', models.TextField(blank=True)),
+                ('search_vector', django.contrib.postgres.search.SearchVectorField(null=True)),
+                ('weight', models.FloatField(default=0)),
+                ('is_accepting_clients', models.BooleanField(default=True)),
+                ('updated_at', models.DateTimeField(auto_now=True, db_index=True)),
+            ],
+        ),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.8 on 2026-10-19 02:24
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('specialists', '0007_specialist_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SpecialistCategoryStats',
+            fields=[
+                ('category', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='specialists.specialistcategory')),
+                ('specialist_count', models.PositiveIntegerField(default=0)),
+                ('accepting_count', models.PositiveIntegerField(default=0)),
+                ('available_this_week_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SpecialistScheduleSummary',
+            fields=[
+                ('specialist', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='schedule_summary', serialize=False, to='specialists.specialist')),
+                ('next_available_at', models.DateTimeField(blank=True, null=True)),
+                ('bookable_minutes_this_week', models.PositiveIntegerField(default=0)),
+                ('week_start', models.DateField(blank=True, null=True)),
+                ('computed_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
@@ -1,4 +1,5 @@
-from django.db import models
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models, transaction
 from django.utils import timezone as django_timezone
 from authentication.models import CustomUser
 
@@ -73,6 +74,18 @@ class Specialist(models.Model):
     created_at = models.DateTimeField(default=django_timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
     
+    class Meta:
+        # Composite indexes matching the directory's filter + keyset sort orders
+        indexes = [
+            models.Index(fields=['is_accepting_clients', '-average_rating', '-id'], name='spec_rating_idx'),
+            models.Index(fields=['is_accepting_clients', 'tier', '-average_rating', '-id'], name='spec_tier_rating_idx'),
+            models.Index(fields=['is_accepting_clients', 'is_verified', 'is_featured', '-average_rating', '-id'], name='spec_status_rating_idx'),
+            models.Index(fields=['is_accepting_clients', 'hourly_rate', 'id'], name='spec_hourly_rate_idx'),
+            models.Index(fields=['is_accepting_clients', 'consultation_rate', 'id'], name='spec_consult_rate_idx'),
+            models.Index(fields=['is_accepting_clients', '-years_experience', '-id'], name='spec_experience_idx'),
+            models.Index(fields=['is_accepting_clients', '-created_at', '-id'], name='spec_newest_idx'),
+        ]
+    
     def __str__(self):
         return f"{self.title} {self.user.get_full_name()}"
     
@@ -99,15 +112,52 @@ class SpecialistReview(models.Model):
     
     is_verified = models.BooleanField(default=False)
     is_public = models.BooleanField(default=True)
+    helpful_count = models.PositiveIntegerField(default=0)
     
     created_at = models.DateTimeField(default=django_timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
     
+    SCORE_FIELDS = ['rating', 'professionalism', 'expertise', 'communication', 'results']
+    
     class Meta:
         unique_together = ['specialist', 'client']
+        indexes = [
+            # Review feed orderings (see SpecialistReviewService.FEED_SORTS)
+            models.Index(fields=['specialist', 'is_public', '-created_at', '-id'], name='spec_review_recent_idx'),
+            models.Index(fields=['specialist', 'is_public', '-helpful_count', '-created_at', '-id'], name='spec_review_helpful_idx'),
+        ]
     
     def __str__(self):
         return f"Review for {self.specialist} by {self.client.get_full_name()}"
+    
+    def save(self, *args, **kwargs):
+        # Rating aggregates move by the difference from the stored row, which
+        # pre_save locks; keep that read, the write and the delta in one transaction
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+    
+    def rating_snapshot(self):
+        """(specialist_id, scores) counted towards the aggregate, or None if not counted"""
+        loaded = self.__dict__
+        if any(name not in loaded for name in ['specialist_id', 'is_public', *self.SCORE_FIELDS]):
+            return None
+        if not self.is_public:
+            return None
+        return self.specialist_id, tuple(int(getattr(self, name)) for name in self.SCORE_FIELDS)
+
+
+class SpecialistReviewVote(models.Model):
+    """A user marking a review as helpful"""
+    review = models.ForeignKey(SpecialistReview, on_delete=models.CASCADE, related_name='helpful_votes')
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='review_votes')
+    
+    created_at = models.DateTimeField(default=django_timezone.now)
+    
+    class Meta:
+        unique_together = ['review', 'user']
+    
+    def __str__(self):
+        return f"{self.user} found review {self.review_id} helpful"
 
 
 class SpecialistAvailability(models.Model):
@@ -136,3 +186,152 @@ class SpecialistAvailability(models.Model):
     
     def __str__(self):
         return f"{self.specialist} - {self.get_day_of_week_display()}: {self.start_time}-{self.end_time}"
+
+
+class SpecialistRatingAggregate(models.Model):
+    """Running review sums per specialist, maintained on review writes"""
+    specialist = models.OneToOneField(Specialist, on_delete=models.CASCADE, primary_key=True, related_name='rating_aggregate')
+    
+    review_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    professionalism_sum = models.PositiveIntegerField(default=0)
+    expertise_sum = models.PositiveIntegerField(default=0)
+    communication_sum = models.PositiveIntegerField(default=0)
+    results_sum = models.PositiveIntegerField(default=0)
+    
+    # Score field -> [count of 1s, 2s, 3s, 4s, 5s]
+    distributions = models.JSONField(default=dict, blank=True)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"Ratings for {self.specialist_id}: {self.review_count} reviews"
+    
+    def get_averages(self):
+        if not self.review_count:
+            return {name: None for name in SpecialistReview.SCORE_FIELDS}
+        return {
+            name: round(getattr(self, f'{name}_sum') / self.review_count, 2)
+            for name in SpecialistReview.SCORE_FIELDS
+        }
+    
+    def get_distribution(self, name):
+        counts = self.distributions.get(name) or [0] * 5
+        return {star: counts[star - 1] for star in range(1, 6)}
+    
+    def get_summary(self):
+        """Payload for the review summary widget"""
+        return {
+            'count': self.review_count,
+            'averages': self.get_averages(),
+            'histogram': self.get_distribution('rating'),
+            'distributions': {
+                name: self.get_distribution(name)
+                for name in SpecialistReview.SCORE_FIELDS if name != 'rating'
+            },
+        }
+
+
+class SpecialistFeatureVector(models.Model):
+    """Precomputed matching features for a specialist (float32 bytes)"""
+    specialist = models.OneToOneField(Specialist, on_delete=models.CASCADE, primary_key=True, related_name='feature_vector')
+    
+    vector = models.BinaryField()
+    feature_version = models.PositiveIntegerField(default=1)
+    
+    # Copied from Specialist so the matching index loads from this table alone
+    tier = models.CharField(max_length=20, choices=Specialist.TIER_CHOICES)
+    is_accepting_clients = models.BooleanField(default=True)
+    
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    
+    def __str__(self):
+        return f"Feature vector for {self.specialist_id}"
+
+
+class SpecialistTerm(models.Model):
+    """TF-IDF postings over a specialist's professional text"""
+    specialist = models.ForeignKey(Specialist, on_delete=models.CASCADE, related_name='terms')
+    term = models.CharField(max_length=64)
+    term_frequency = models.PositiveIntegerField()
+    weight = models.FloatField(help_text="L2-normalized tf-idf weight")
+    
+    class Meta:
+        unique_together = ['specialist', 'term']
+        indexes = [
+            models.Index(fields=['term'], name='spec_term_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.specialist_id}: {self.term} ({self.weight:.3f})"
+
+
+class SpecialistNeighbour(models.Model):
+    """Precomputed most similar specialists, by professional text"""
+    specialist = models.ForeignKey(Specialist, on_delete=models.CASCADE, related_name='neighbours')
+    neighbour = models.ForeignKey(Specialist, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ['specialist', 'neighbour']
+        ordering = ['-score']
+    
+    def __str__(self):
+        return f"{self.specialist_id} ~ {self.neighbour_id} ({self.score:.3f})"
+
+
+class SpecialistSearchDocument(models.Model):
+    """Denormalized search text for a specialist, including user and category names"""
+    specialist = models.OneToOneField(Specialist, on_delete=models.CASCADE, primary_key=True, related_name='search_document')
+    
+    name = models.CharField(max_length=200)
+    # Name, title, specializations and category names: the autocomplete vocabulary
+    keywords = models.TextField(blank=True)
+    # keywords plus the professional summary, for full-text search
+    document = models.TextField(blank=True)
+    # Postgres only; GIN and trigram indexes are created in migration 0007
+    search_vector = SearchVectorField(null=True)
+    
+    weight = models.FloatField(default=0)
+    is_accepting_clients = models.BooleanField(default=True)
+    
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    
+    def __str__(self):
+        return f"Search document for {self.specialist_id}"
+
+
+class SpecialistScheduleSummary(models.Model):
+    """Precomputed next free slot and bookable time this week, for listing cards"""
+    specialist = models.OneToOneField(Specialist, on_delete=models.CASCADE, primary_key=True, related_name='schedule_summary')
+    
+    next_available_at = models.DateTimeField(null=True, blank=True)
+    # Free one-hour slots left in the specialist's current local week
+    bookable_minutes_this_week = models.PositiveIntegerField(default=0)
+    week_start = models.DateField(null=True, blank=True)
+    
+    computed_at = models.DateTimeField(default=django_timezone.now, db_index=True)
+    
+    def __str__(self):
+        return f"Schedule summary for {self.specialist_id}"
+    
+    @property
+    def bookable_hours_this_week(self):
+        return self.bookable_minutes_this_week / 60
+
+
+class SpecialistCategoryStats(models.Model):
+    """Maintained specialist counts per category"""
+    category = models.OneToOneField(SpecialistCategory, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    
+    specialist_count = models.PositiveIntegerField(default=0)
+    accepting_count = models.PositiveIntegerField(default=0)
+    # Accepting specialists with at least one free slot left this week
+    available_this_week_count = models.PositiveIntegerField(default=0)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"Stats for {self.category_id}"
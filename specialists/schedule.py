@@ -0,0 +1,156 @@
+import logging
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from .availability import AvailabilityService, get_zone
+from .models import Specialist, SpecialistCategory, SpecialistCategoryStats, SpecialistScheduleSummary
+from .services import SpecialistListingService
+
+
+logger = logging.getLogger(__name__)
+
+SLOT_MINUTES = 60
+# How far ahead the next free slot is searched for
+HORIZON_DAYS = 14
+# Summaries older than this are recomputed by the rolling job even without writes
+STALE_AFTER = timedelta(hours=1)
+
+
+class SpecialistScheduleService:
+    """
+    Service class to maintain the schedule projections read by listing
+    cards: SpecialistScheduleSummary per specialist and
+    SpecialistCategoryStats per category
+    """
+
+    SUMMARY_FIELDS = ['next_available_at', 'bookable_minutes_this_week', 'week_start']
+
+    @staticmethod
+    def summarize(specialist, slots, now):
+        zone = get_zone(specialist.timezone)
+        local_today = now.astimezone(zone).date()
+        week_start = local_today - timedelta(days=local_today.weekday())
+        week_end = datetime.combine(week_start + timedelta(days=7), time.min, tzinfo=zone)
+        return SpecialistScheduleSummary(
+            specialist_id=specialist.pk,
+            next_available_at=slots[0][0] if slots else None,
+            bookable_minutes_this_week=SLOT_MINUTES * sum(1 for _, end in slots if end <= week_end),
+            week_start=week_start,
+            computed_at=now,
+        )
+
+    @classmethod
+    def refresh(cls, specialist_ids, now=None):
+        """
+        Recompute summaries for the given specialists (three queries for
+        availability plus one upsert), then the counts of their categories
+        """
+        now = now or timezone.now()
+        specialists = list(
+            Specialist.objects.filter(pk__in=specialist_ids).only('pk', 'timezone', 'is_accepting_clients')
+        )
+        if not specialists:
+            return 0
+
+        today = now.astimezone(dt_timezone.utc).date()
+        slots = AvailabilityService.free_slots(
+            specialists, today - timedelta(days=1), today + timedelta(days=HORIZON_DAYS), SLOT_MINUTES,
+        )
+        summaries = [cls.summarize(specialist, slots[specialist.pk], now) for specialist in specialists]
+
+        previous = {
+            row[0]: row[1:]
+            for row in SpecialistScheduleSummary.objects.filter(
+                pk__in=[summary.pk for summary in summaries],
+            ).values_list('pk', *cls.SUMMARY_FIELDS)
+        }
+        changed = any(
+            previous.get(summary.pk) != tuple(getattr(summary, field) for field in cls.SUMMARY_FIELDS)
+            for summary in summaries
+        )
+
+        SpecialistScheduleSummary.objects.bulk_create(
+            summaries,
+            update_conflicts=True,
+            unique_fields=['specialist'],
+            update_fields=[*cls.SUMMARY_FIELDS, 'computed_at'],
+        )
+        if changed:
+            cls.refresh_categories(
+                SpecialistCategory.objects.filter(specialists__in=specialist_ids).values_list('pk', flat=True).distinct()
+            )
+            # Cached listing pages embed these columns
+            SpecialistListingService.invalidate()
+        return len(summaries)
+
+    @classmethod
+    def refresh_on_commit(cls, specialist_ids):
+        specialist_ids = list(specialist_ids)
+        transaction.on_commit(lambda: cls.refresh(specialist_ids))
+
+    @classmethod
+    def refresh_categories_on_commit(cls, category_ids=None):
+        category_ids = None if category_ids is None else list(category_ids)
+        transaction.on_commit(lambda: cls.refresh_categories(category_ids))
+
+    @staticmethod
+    def refresh_categories(category_ids=None):
+        """
+        Recount specialists per category in one grouped query
+        """
+        categories = SpecialistCategory.objects.all()
+        if category_ids is not None:
+            categories = categories.filter(pk__in=list(category_ids))
+        counts = categories.annotate(
+            specialist_count=Count('specialists', distinct=True),
+            accepting_count=Count(
+                'specialists', filter=Q(specialists__is_accepting_clients=True), distinct=True,
+            ),
+            available_this_week_count=Count(
+                'specialists',
+                filter=Q(
+                    specialists__is_accepting_clients=True,
+                    specialists__schedule_summary__bookable_minutes_this_week__gt=0,
+                ),
+                distinct=True,
+            ),
+        ).values_list('pk', 'specialist_count', 'accepting_count', 'available_this_week_count')
+
+        stats = [
+            SpecialistCategoryStats(
+                category_id=pk, specialist_count=total, accepting_count=accepting, available_this_week_count=available,
+            )
+            for pk, total, accepting, available in counts
+        ]
+        SpecialistCategoryStats.objects.bulk_create(
+            stats,
+            update_conflicts=True,
+            unique_fields=['category'],
+            update_fields=['specialist_count', 'accepting_count', 'available_this_week_count', 'updated_at'],
+        )
+        return len(stats)
+
+    @classmethod
+    def refresh_stale(cls, limit=1000, batch_size=200, now=None):
+        """
+        Rolling refresh: specialists without a summary, whose next slot is
+        over, or that were computed more than STALE_AFTER ago (which also
+        bounds how late a week rollover is picked up)
+        """
+        now = now or timezone.now()
+        stale = Specialist.objects.filter(
+            Q(schedule_summary__isnull=True)
+            | Q(schedule_summary__computed_at__lt=now - STALE_AFTER)
+            # A slot starting "now" stays accurate until it would have ended
+            | Q(schedule_summary__next_available_at__lt=now - timedelta(minutes=SLOT_MINUTES))
+        ).order_by(F('schedule_summary__computed_at').asc(nulls_first=True), 'pk')
+        ids = list(stale.values_list('pk', flat=True)[:limit])
+
+        refreshed = 0
+        for start in range(0, len(ids), batch_size):
+            refreshed += cls.refresh(ids[start:start + batch_size], now=now)
+        logger.info(f"Refreshed {refreshed} specialist schedule summaries")
+        return refreshed
@@ -0,0 +1,346 @@
+import bisect
+import heapq
+import logging
+import re
+import threading
+import time as timer
+from datetime import timedelta
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramSimilarity
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import F, Q
+
+from .models import Specialist, SpecialistSearchDocument
+
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"\w[\w'+-]*")
+MAX_TERM_LENGTH = 32
+SUGGESTION_COUNT = 10
+# Multi-word typeahead filters the smallest matching subtree; above this it
+# only filters that subtree's best entries
+MAX_SCAN = 5000
+
+VERSION_KEY = 'specialists:search:version'
+WATERMARK_SLACK_SECONDS = 300
+
+
+def tokenize(text):
+    return [token[:MAX_TERM_LENGTH] for token in TOKEN_PATTERN.findall((text or '').lower())]
+
+
+def search_weight(specialist):
+    """Typeahead ranking: featured first, then rating, then review volume"""
+    return (
+        (10.0 if specialist.is_featured else 0.0)
+        + float(specialist.average_rating)
+        + min(specialist.total_reviews, 1000) / 1000
+    )
+
+
+class _Node:
+    __slots__ = ('children', 'ids', 'count', 'top')
+
+    def __init__(self):
+        self.children = {}
+        self.ids = set()
+        # Number of (term, specialist) entries in this subtree
+        self.count = 0
+        # Cached best (-weight, id) entries of this subtree; None when stale
+        self.top = None
+
+
+class PrefixTrie:
+    """
+    Character trie from terms to specialist ids.
+
+    Every node caches the best SUGGESTION_COUNT entries of its subtree.
+    Inserts merge into the caches along their path; removing an entry only
+    invalidates the caches it appears in, and a stale node is rebuilt from
+    its children's caches, so lookups stay proportional to the prefix length
+    rather than to the catalog size.
+    """
+
+    def __init__(self):
+        self.root = _Node()
+        self.terms = {}
+        self.weights = {}
+        self.names = {}
+
+    @staticmethod
+    def _offer(node, entry):
+        top = node.top
+        if top is None or entry in top:
+            return
+        if len(top) < SUGGESTION_COUNT:
+            bisect.insort(top, entry)
+        elif entry < top[-1]:
+            bisect.insort(top, entry)
+            top.pop()
+
+    def _add(self, term, specialist_id):
+        entry = (-self.weights[specialist_id], specialist_id)
+        node = self.root
+        node.count += 1
+        self._offer(node, entry)
+        for char in term:
+            child = node.children.get(char)
+            if child is None:
+                # An empty cache is exact for a new node
+                child = node.children[char] = _Node()
+                child.top = []
+            node = child
+            node.count += 1
+            self._offer(node, entry)
+        node.ids.add(specialist_id)
+
+    def _discard(self, term, specialist_id):
+        path = [self.root]
+        for char in term:
+            child = path[-1].children.get(char)
+            if child is None:
+                return
+            path.append(child)
+        if specialist_id not in path[-1].ids:
+            return
+        path[-1].ids.discard(specialist_id)
+        entry = (-self.weights[specialist_id], specialist_id)
+        for depth, node in enumerate(path):
+            node.count -= 1
+            if node.top is not None and entry in node.top:
+                # Another entry of the same specialist may still qualify here
+                node.top = None
+            if node.count == 0 and depth:
+                # Prune the now empty branch
+                del path[depth - 1].children[term[depth - 1]]
+                break
+
+    def set(self, specialist_id, terms, weight, name):
+        self.remove(specialist_id)
+        terms = frozenset(term for term in terms if term)
+        self.terms[specialist_id] = terms
+        self.weights[specialist_id] = weight
+        self.names[specialist_id] = name
+        for term in terms:
+            self._add(term, specialist_id)
+
+    def remove(self, specialist_id):
+        for term in self.terms.pop(specialist_id, ()):
+            self._discard(term, specialist_id)
+        self.weights.pop(specialist_id, None)
+        self.names.pop(specialist_id, None)
+
+    def find(self, prefix):
+        node = self.root
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return None
+        return node
+
+    def best(self, node):
+        if node.top is None:
+            entries = {(-self.weights[pk], pk) for pk in node.ids}
+            for child in node.children.values():
+                entries.update(self.best(child))
+            node.top = heapq.nsmallest(SUGGESTION_COUNT, entries)
+        return node.top
+
+    def subtree_ids(self, node):
+        ids, stack = set(), [node]
+        while stack:
+            current = stack.pop()
+            ids.update(current.ids)
+            stack.extend(current.children.values())
+        return ids
+
+    def complete(self, text, limit=SUGGESTION_COUNT):
+        """
+        Specialist ids whose terms start with every word of ``text``, best first
+        """
+        prefixes = tokenize(text)
+        if not prefixes:
+            return []
+        nodes = [self.find(prefix) for prefix in prefixes]
+        if any(node is None for node in nodes):
+            return []
+        if len(nodes) == 1:
+            return [pk for _, pk in self.best(nodes[0])[:limit]]
+
+        # Enumerate the most selective word, then check the others per specialist
+        narrowest = min(nodes, key=lambda node: node.count)
+        if narrowest.count > MAX_SCAN:
+            candidates = {pk for _, pk in self.best(narrowest)}
+        else:
+            candidates = self.subtree_ids(narrowest)
+        matches = [
+            (-self.weights[pk], pk) for pk in candidates
+            if all(any(term.startswith(prefix) for term in self.terms[pk]) for prefix in prefixes)
+        ]
+        return [pk for _, pk in heapq.nsmallest(limit, matches)]
+
+
+class SpecialistSearchIndex:
+    """
+    In-process autocomplete trie over SpecialistSearchDocument.
+
+    Kept current the same way as the matching index: writers bump a cache
+    version, and readers pull documents updated since their watermark, or
+    reload fully after a specialist was removed.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = None
+        self.watermark = None
+        self.trie = PrefixTrie()
+
+    def _rows(self, since=None):
+        rows = SpecialistSearchDocument.objects.all()
+        if since is not None:
+            rows = rows.filter(updated_at__gte=since - timedelta(seconds=WATERMARK_SLACK_SECONDS))
+        return rows.values_list('specialist_id', 'name', 'keywords', 'weight', 'is_accepting_clients', 'updated_at')
+
+    def _apply(self, rows, full):
+        if full:
+            self.trie = PrefixTrie()
+            self.watermark = None
+        for specialist_id, name, keywords, weight, is_accepting, updated_at in rows.iterator(chunk_size=5000):
+            if is_accepting:
+                self.trie.set(specialist_id, keywords.split(), weight, name)
+            else:
+                self.trie.remove(specialist_id)
+            if self.watermark is None or updated_at > self.watermark:
+                self.watermark = updated_at
+
+    def ensure_fresh(self):
+        state = cache.get_or_set(VERSION_KEY, {'version': timer.time_ns(), 'epoch': 0}, None)
+        if self.version == state:
+            return
+        with self.lock:
+            if self.version == state:
+                return
+            full = self.version is None or self.version['epoch'] != state['epoch']
+            self._apply(self._rows(since=None if full else self.watermark), full)
+            self.version = state
+
+    def suggest(self, text, limit=SUGGESTION_COUNT):
+        self.ensure_fresh()
+        # Lookups fill node caches, so they share the writers' lock
+        with self.lock:
+            trie = self.trie
+            return [{'id': pk, 'name': trie.names[pk]} for pk in trie.complete(text, limit)]
+
+
+search_index = SpecialistSearchIndex()
+
+
+class SpecialistSearchService:
+    """
+    Service class to maintain specialist search documents and run
+    full-text search and typeahead over them
+    """
+
+    DEFAULT_LIMIT = 20
+
+    @staticmethod
+    def bump_version(removed=False):
+        state = cache.get(VERSION_KEY) or {'epoch': 0}
+        now = timer.time_ns()
+        cache.set(VERSION_KEY, {'version': now, 'epoch': now if removed else state['epoch']}, None)
+
+    @staticmethod
+    def build_document(specialist, category_names):
+        name = specialist.get_full_name()
+        keywords = ' '.join(dict.fromkeys(tokenize(' '.join([
+            name, specialist.specializations, *category_names,
+        ]))))
+        return SpecialistSearchDocument(
+            specialist_id=specialist.pk,
+            name=name[:200],
+            keywords=keywords,
+            document=f'{keywords} {specialist.professional_summary}',
+            weight=search_weight(specialist),
+            is_accepting_clients=specialist.is_accepting_clients,
+        )
+
+    @classmethod
+    def refresh_on_commit(cls, specialist_ids):
+        specialist_ids = list(specialist_ids)
+        transaction.on_commit(lambda: cls.refresh(specialist_ids))
+
+    @classmethod
+    def refresh(cls, specialist_ids):
+        """
+        Rebuild search documents for the given specialists
+        """
+        specialists = Specialist.objects.filter(pk__in=specialist_ids).select_related('user').prefetch_related('categories')
+        documents = [
+            cls.build_document(specialist, [category.display_name for category in specialist.categories.all()])
+            for specialist in specialists
+        ]
+        if not documents:
+            return 0
+        SpecialistSearchDocument.objects.bulk_create(
+            documents,
+            update_conflicts=True,
+            unique_fields=['specialist'],
+            update_fields=['name', 'keywords', 'document', 'weight', 'is_accepting_clients', 'updated_at'],
+        )
+        if connection.vendor == 'postgresql':
+            SpecialistSearchDocument.objects.filter(pk__in=[document.pk for document in documents]).update(
+                search_vector=(
+                    SearchVector('name', weight='A')
+                    + SearchVector('keywords', weight='B')
+                    + SearchVector('document', weight='C')
+                ),
+            )
+        cls.bump_version()
+        return len(documents)
+
+    @classmethod
+    def rebuild(cls, batch_size=1000):
+        ids = list(Specialist.objects.order_by('pk').values_list('pk', flat=True))
+        refreshed = 0
+        for start in range(0, len(ids), batch_size):
+            refreshed += cls.refresh(ids[start:start + batch_size])
+        cls.bump_version(removed=True)
+        return refreshed
+
+    @staticmethod
+    def matches(text, accepting_only=True):
+        """
+        Ordered queryset of ids of specialists matching ``text``, most relevant first
+        """
+        words = tokenize(text)
+        documents = SpecialistSearchDocument.objects.all()
+        if not words:
+            return documents.none().values_list('specialist_id', flat=True)
+        if accepting_only:
+            documents = documents.filter(is_accepting_clients=True)
+
+        if connection.vendor == 'postgresql':
+            query = SearchQuery(' '.join(words), search_type='websearch')
+            documents = documents.annotate(
+                rank=SearchRank(F('search_vector'), query) + TrigramSimilarity('name', ' '.join(words)),
+            ).filter(
+                # Full-text match, or a fuzzy match on the name for typos
+                Q(search_vector=query) | Q(name__trigram_similar=' '.join(words))
+            ).order_by('-rank', '-weight')
+        else:
+            condition = Q()
+            for word in words:
+                condition &= Q(document__icontains=word)
+            documents = documents.filter(condition).order_by('-weight')
+
+        return documents.values_list('specialist_id', flat=True)
+
+    @classmethod
+    def search(cls, text, limit=None):
+        return list(cls.matches(text)[:limit or cls.DEFAULT_LIMIT])
+
+    @staticmethod
+    def autocomplete(text, limit=SUGGESTION_COUNT):
+        return search_index.suggest(text, limit)
@@ -0,0 +1,689 @@
+import base64
+import hashlib
+import json
+import logging
+import time
+from datetime import timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Prefetch, Q, Sum
+from django.utils import timezone
+
+from concierge.models import ConciergeAgent, ConciergeAppointment
+from core.models import SubscriptionTier, UserSubscription
+from .availability import BLOCKING_APPOINTMENT_STATUSES, MAX_APPOINTMENT_MINUTES, expand_weekly_windows, get_zone
+from .models import (
+    Specialist, SpecialistAvailability, SpecialistCategory, SpecialistRatingAggregate, SpecialistReview,
+    SpecialistReviewVote,
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+class SpecialistDirectoryService:
+    """
+    Service class to filter and keyset-paginate the public specialist directory
+    """
+
+    DEFAULT_PAGE_SIZE = 20
+    MAX_PAGE_SIZE = 100
+
+    # Sort key -> (field, descending). The primary key is always appended as a
+    # tie-breaker in the same direction, so every ordering is total and each
+    # one is backed by a composite index declared on Specialist.Meta.
+    SORT_OPTIONS = {
+        'rating': ('average_rating', True),
+        'experience': ('years_experience', True),
+        'hourly_rate': ('hourly_rate', False),
+        'consultation_rate': ('consultation_rate', False),
+        'newest': ('created_at', True),
+    }
+    DEFAULT_SORT = 'rating'
+
+    BOOLEAN_VALUES = {
+        'true': True, '1': True, 'yes': True,
+        'false': False, '0': False, 'no': False,
+    }
+
+    @staticmethod
+    def _parse_decimal(params, key):
+        value = params.get(key)
+        if value in (None, ''):
+            return None
+        try:
+            number = Decimal(value)
+        except InvalidOperation:
+            raise ValueError(f'{key} must be a number')
+        # Decimal also parses NaN and Infinity, which no filter can use
+        if not number.is_finite():
+            raise ValueError(f'{key} must be a number')
+        return number
+
+    @staticmethod
+    def _parse_int(params, key):
+        value = params.get(key)
+        if value in (None, ''):
+            return None
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            raise ValueError(f'{key} must be an integer')
+
+    @classmethod
+    def _parse_bool(cls, params, key):
+        value = params.get(key)
+        if value in (None, ''):
+            return None
+        try:
+            return cls.BOOLEAN_VALUES[str(value).lower()]
+        except KeyError:
+            raise ValueError(f'{key} must be true or false')
+
+    @classmethod
+    def parse_filters(cls, params):
+        """
+        Validate query parameters into a filter dict, raising ValueError on bad input
+        """
+        tiers = [tier for tier in params.get('tier', '').split(',') if tier]
+        valid_tiers = {choice for choice, _ in Specialist.TIER_CHOICES}
+        if any(tier not in valid_tiers for tier in tiers):
+            raise ValueError(f'tier must be one of: {", ".join(sorted(valid_tiers))}')
+
+        sort = params.get('sort') or cls.DEFAULT_SORT
+        if sort not in cls.SORT_OPTIONS:
+            raise ValueError(f'sort must be one of: {", ".join(cls.SORT_OPTIONS)}')
+
+        page_size = cls._parse_int(params, 'page_size') or cls.DEFAULT_PAGE_SIZE
+        if page_size < 1:
+            raise ValueError('page_size must be positive')
+
+        return {
+            'category': params.get('category') or None,
+            'tiers': tiers,
+            'min_hourly_rate': cls._parse_decimal(params, 'min_hourly_rate'),
+            'max_hourly_rate': cls._parse_decimal(params, 'max_hourly_rate'),
+            'min_consultation_rate': cls._parse_decimal(params, 'min_consultation_rate'),
+            'max_consultation_rate': cls._parse_decimal(params, 'max_consultation_rate'),
+            'min_rating': cls._parse_decimal(params, 'min_rating'),
+            'min_years_experience': cls._parse_int(params, 'min_years_experience'),
+            'is_verified': cls._parse_bool(params, 'is_verified'),
+            'is_featured': cls._parse_bool(params, 'is_featured'),
+            'sort': sort,
+            'page_size': min(page_size, cls.MAX_PAGE_SIZE),
+        }
+
+    @staticmethod
+    def filter_queryset(filters):
+        """
+        Build the filtered queryset of specialists accepting clients
+        """
+        queryset = Specialist.objects.filter(is_accepting_clients=True)
+
+        if filters['category']:
+            # Join through the M2M table instead of resolving the category first
+            queryset = queryset.filter(
+                categories__name=filters['category'],
+                categories__is_active=True,
+            )
+        if filters['tiers']:
+            queryset = queryset.filter(tier__in=filters['tiers'])
+
+        range_lookups = {
+            'min_hourly_rate': 'hourly_rate__gte',
+            'max_hourly_rate': 'hourly_rate__lte',
+            'min_consultation_rate': 'consultation_rate__gte',
+            'max_consultation_rate': 'consultation_rate__lte',
+            'min_rating': 'average_rating__gte',
+            'min_years_experience': 'years_experience__gte',
+        }
+        for key, lookup in range_lookups.items():
+            if filters[key] is not None:
+                queryset = queryset.filter(**{lookup: filters[key]})
+
+        for flag in ('is_verified', 'is_featured'):
+            if filters[flag] is not None:
+                queryset = queryset.filter(**{flag: filters[flag]})
+
+        return queryset
+
+    @staticmethod
+    def encode_cursor(values):
+        raw = json.dumps([str(value) for value in values]).encode()
+        return base64.urlsafe_b64encode(raw).decode()
+
+    @staticmethod
+    def decode_cursor(cursor, field_names, model=Specialist):
+        """
+        Decode a cursor into python values for the given sort fields
+        """
+        try:
+            raw = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            if not isinstance(raw, list) or len(raw) != len(field_names):
+                raise ValueError
+            return [
+                model._meta.get_field(name).to_python(value)
+                for name, value in zip(field_names, raw)
+            ]
+        except Exception:
+            raise ValueError('Invalid cursor')
+
+    @staticmethod
+    def keyset_condition(field, descending, sort_value, last_id):
+        """
+        Rows strictly after (sort_value, last_id) in the given direction
+        """
+        op = 'lt' if descending else 'gt'
+        return (
+            Q(**{f'{field}__{op}': sort_value})
+            | Q(**{field: sort_value, f'id__{op}': last_id})
+        )
+
+    @classmethod
+    def search(cls, filters, cursor=None):
+        """
+        Return one page of specialists and the cursor for the next page
+        """
+        field, descending = cls.SORT_OPTIONS[filters['sort']]
+        queryset = cls.filter_queryset(filters)
+
+        if cursor:
+            sort_value, last_id = cls.decode_cursor(cursor, [field, 'id'])
+            queryset = queryset.filter(cls.keyset_condition(field, descending, sort_value, last_id))
+
+        prefix = '-' if descending else ''
+        page_size = filters['page_size']
+        page = SpecialistListingService.load(
+            queryset.order_by(f'{prefix}{field}', f'{prefix}id')[:page_size + 1]
+        )
+
+        next_cursor = None
+        if len(page) > page_size:
+            page = page[:page_size]
+            last = page[-1]
+            next_cursor = cls.encode_cursor([getattr(last, field), last.id])
+
+        return page, next_cursor
+
+    @classmethod
+    def cached_search(cls, filters, cursor=None):
+        """
+        Serialized search page, cached per (filters, cursor) until the next invalidation
+        """
+        key = SpecialistListingService.cache_key('directory', filters, cursor)
+        payload = cache.get(key)
+        if payload is None:
+            specialists, next_cursor = cls.search(filters, cursor=cursor)
+            payload = {
+                'results': [cls.serialize(specialist) for specialist in specialists],
+                'next_cursor': next_cursor,
+            }
+            cache.set(key, payload, SpecialistListingService.CACHE_TIMEOUT)
+        return payload
+
+    @staticmethod
+    def serialize(specialist):
+        return {
+            'id': specialist.id,
+            'name': specialist.get_full_name(),
+            'title': specialist.title,
+            'tier': specialist.tier,
+            'years_experience': specialist.years_experience,
+            'hourly_rate': str(specialist.hourly_rate),
+            'consultation_rate': str(specialist.consultation_rate),
+            'average_rating': str(specialist.average_rating),
+            'total_reviews': specialist.total_reviews,
+            'is_verified': specialist.is_verified,
+            'is_featured': specialist.is_featured,
+            'timezone': specialist.timezone,
+            'categories': [
+                {'name': category.name, 'display_name': category.display_name}
+                for category in specialist.categories.all()
+            ],
+            'review_summary': specialist.review_summary,
+            **specialist.next_available,
+            'availability': [
+                {
+                    'day_of_week': window.day_of_week,
+                    'start_time': window.start_time.isoformat(),
+                    'end_time': window.end_time.isoformat(),
+                }
+                for window in specialist.availability.all()
+            ],
+        }
+
+
+class SpecialistListingService:
+    """
+    Service class to load specialist listing pages in a constant number of queries
+    """
+
+    CACHE_TIMEOUT = 300
+    GENERATION_KEY = 'specialists:listing:generation'
+
+    @staticmethod
+    def load(queryset):
+        """
+        Evaluate a specialist queryset with user, schedule summary, active
+        categories and active availability attached, plus a review summary
+        read from the maintained rating columns.
+
+        Costs three queries regardless of the number of specialists.
+        """
+        specialists = list(
+            queryset.select_related('user', 'schedule_summary').prefetch_related(
+                Prefetch('categories', queryset=SpecialistCategory.objects.filter(is_active=True)),
+                Prefetch(
+                    'availability',
+                    queryset=SpecialistAvailability.objects.filter(is_active=True).order_by('day_of_week', 'start_time'),
+                ),
+            )
+        )
+        for specialist in specialists:
+            specialist.review_summary = {
+                'count': specialist.total_reviews,
+                'average': str(specialist.average_rating) if specialist.total_reviews else None,
+            }
+            summary = getattr(specialist, 'schedule_summary', None)
+            specialist.next_available = {
+                'next_available_at': summary.next_available_at.isoformat() if summary and summary.next_available_at else None,
+                'bookable_hours_this_week': summary.bookable_hours_this_week if summary else None,
+            }
+        return specialists
+
+    @classmethod
+    def cache_key(cls, namespace, filters, cursor=None):
+        generation = cache.get_or_set(cls.GENERATION_KEY, time.time_ns(), None)
+        digest = hashlib.md5(
+            json.dumps([filters, cursor], sort_keys=True, default=str).encode()
+        ).hexdigest()
+        return f'specialists:listing:{namespace}:{generation}:{digest}'
+
+    @classmethod
+    def invalidate(cls):
+        """
+        Drop every cached listing page by moving to a new cache generation.
+        Other processes only see the new generation through a shared cache
+        backend (see CACHES in settings).
+        """
+        cache.set(cls.GENERATION_KEY, time.time_ns(), None)
+
+
+class SpecialistRatingService:
+    """
+    Service class to keep SpecialistRatingAggregate and the denormalized
+    Specialist.average_rating/total_reviews columns in step with reviews
+    """
+
+    SUM_FIELDS = [f'{name}_sum' for name in SpecialistReview.SCORE_FIELDS]
+
+    @staticmethod
+    def _average(aggregate):
+        if not aggregate.review_count:
+            return Decimal('0.00')
+        return (Decimal(aggregate.rating_sum) / aggregate.review_count).quantize(Decimal('0.01'))
+
+    @classmethod
+    def _sync_specialist(cls, aggregate):
+        # update() rather than save() so the specialist's other columns are untouched
+        Specialist.objects.filter(pk=aggregate.specialist_id).update(
+            average_rating=cls._average(aggregate),
+            total_reviews=aggregate.review_count,
+        )
+
+    @classmethod
+    def _apply(cls, specialist_id, scores, sign):
+        aggregates = SpecialistRatingAggregate.objects.select_for_update()
+        if sign > 0:
+            aggregate, _ = aggregates.get_or_create(specialist_id=specialist_id)
+        else:
+            # Never create a row on removal: during a specialist cascade delete
+            # the aggregate may already be gone and must not be resurrected.
+            aggregate = aggregates.filter(specialist_id=specialist_id).first()
+            if aggregate is None:
+                return
+        aggregate.review_count += sign
+        for field, score in zip(cls.SUM_FIELDS, scores):
+            setattr(aggregate, field, getattr(aggregate, field) + sign * score)
+        for name, score in zip(SpecialistReview.SCORE_FIELDS, scores):
+            counts = aggregate.distributions.setdefault(name, [0] * 5)
+            # Scores are not validated on save; out-of-range ones have no bucket
+            if 1 <= score <= 5:
+                counts[score - 1] += sign
+        aggregate.save()
+        cls._sync_specialist(aggregate)
+
+    @staticmethod
+    def stored_snapshot(review_id):
+        """
+        rating_snapshot() of the review as stored, locking its row until the
+        surrounding save or delete commits so concurrent edits apply in turn
+        """
+        if review_id is None:
+            return None
+        stored = SpecialistReview.objects.select_for_update().filter(pk=review_id).only(
+            'specialist_id', 'is_public', *SpecialistReview.SCORE_FIELDS,
+        ).first()
+        return stored.rating_snapshot() if stored else None
+
+    @classmethod
+    def apply_change(cls, old_snapshot, new_snapshot):
+        """
+        Move one review's contribution from old_snapshot to new_snapshot.
+        Snapshots come from SpecialistReview.rating_snapshot(); None means
+        the review is not counted (missing, deleted or not public).
+        """
+        if old_snapshot == new_snapshot:
+            return
+        with transaction.atomic():
+            if old_snapshot:
+                cls._apply(old_snapshot[0], old_snapshot[1], -1)
+            if new_snapshot:
+                cls._apply(new_snapshot[0], new_snapshot[1], 1)
+
+    @classmethod
+    def rebuild(cls, specialist_ids=None, batch_size=1000):
+        """
+        Recompute aggregates from scratch with one grouped query; used for backfill
+        """
+        reviews = SpecialistReview.objects.filter(is_public=True)
+        specialists = Specialist.objects.all()
+        if specialist_ids is not None:
+            reviews = reviews.filter(specialist_id__in=specialist_ids)
+            specialists = specialists.filter(pk__in=specialist_ids)
+
+        totals = {
+            row['specialist_id']: row
+            for row in reviews.values('specialist_id').annotate(
+                review_count=Count('id'),
+                **{f'{name}_sum': Sum(name) for name in SpecialistReview.SCORE_FIELDS},
+            )
+        }
+        distributions = {}
+        for name in SpecialistReview.SCORE_FIELDS:
+            for row in reviews.filter(**{f'{name}__range': (1, 5)}).values('specialist_id', name).annotate(
+                count=Count('id'),
+            ).order_by():
+                counts = distributions.setdefault(row['specialist_id'], {}).setdefault(name, [0] * 5)
+                counts[row[name] - 1] = row['count']
+
+        rebuilt = 0
+        with transaction.atomic():
+            ids = list(specialists.values_list('pk', flat=True))
+            for start in range(0, len(ids), batch_size):
+                aggregates = []
+                for specialist_id in ids[start:start + batch_size]:
+                    row = totals.get(specialist_id, {})
+                    aggregates.append(SpecialistRatingAggregate(
+                        specialist_id=specialist_id,
+                        review_count=row.get('review_count', 0),
+                        distributions=distributions.get(specialist_id, {}),
+                        **{field: row.get(field) or 0 for field in cls.SUM_FIELDS},
+                    ))
+                SpecialistRatingAggregate.objects.bulk_create(
+                    aggregates,
+                    update_conflicts=True,
+                    unique_fields=['specialist'],
+                    update_fields=['review_count', *cls.SUM_FIELDS, 'distributions', 'updated_at'],
+                )
+                Specialist.objects.bulk_update(
+                    [
+                        Specialist(pk=aggregate.specialist_id, average_rating=cls._average(aggregate), total_reviews=aggregate.review_count)
+                        for aggregate in aggregates
+                    ],
+                    ['average_rating', 'total_reviews'],
+                )
+                rebuilt += len(aggregates)
+        return rebuilt
+
+
+class SpecialistReviewService:
+    """
+    Service class for the public review feed and the review summary widget
+    """
+
+    DEFAULT_PAGE_SIZE = 20
+    MAX_PAGE_SIZE = 50
+
+    # Sort key -> ordering fields, all descending with the primary key last.
+    # Each ordering is backed by an index declared on SpecialistReview.Meta.
+    FEED_SORTS = {
+        'recent': ['created_at', 'id'],
+        'helpful': ['helpful_count', 'created_at', 'id'],
+    }
+
+    @staticmethod
+    def after(fields, values):
+        """
+        Rows strictly after ``values`` in descending (field1, field2, ...) order
+        """
+        condition = Q()
+        for position, field in enumerate(fields):
+            step = Q(**{f'{field}__lt': values[position]})
+            for previous, value in zip(fields[:position], values[:position]):
+                step &= Q(**{previous: value})
+            condition |= step
+        return condition
+
+    @classmethod
+    def feed(cls, specialist_id, sort='recent', cursor=None, page_size=None):
+        """
+        Return one page of public reviews and the cursor for the next page
+        """
+        if sort not in cls.FEED_SORTS:
+            raise ValueError(f"Invalid sort '{sort}'; expected one of {', '.join(cls.FEED_SORTS)}")
+        fields = cls.FEED_SORTS[sort]
+        page_size = page_size or cls.DEFAULT_PAGE_SIZE
+        if page_size < 1:
+            raise ValueError('page_size must be positive')
+        page_size = min(page_size, cls.MAX_PAGE_SIZE)
+
+        queryset = SpecialistReview.objects.filter(specialist_id=specialist_id, is_public=True)
+        if cursor:
+            values = SpecialistDirectoryService.decode_cursor(cursor, fields, model=SpecialistReview)
+            queryset = queryset.filter(cls.after(fields, values))
+
+        page = list(
+            queryset.select_related('client').order_by(*[f'-{field}' for field in fields])[:page_size + 1]
+        )
+        next_cursor = None
+        if len(page) > page_size:
+            page = page[:page_size]
+            next_cursor = SpecialistDirectoryService.encode_cursor([getattr(page[-1], field) for field in fields])
+        return page, next_cursor
+
+    @staticmethod
+    def serialize(review):
+        return {
+            'id': review.id,
+            'client_name': review.client.get_full_name(),
+            'rating': review.rating,
+            'title': review.title,
+            'review_text': review.review_text,
+            'scores': {name: getattr(review, name) for name in SpecialistReview.SCORE_FIELDS if name != 'rating'},
+            'is_verified': review.is_verified,
+            'helpful_count': review.helpful_count,
+            'created_at': review.created_at.isoformat(),
+        }
+
+    @staticmethod
+    def summary(specialist_id):
+        """
+        Counts, averages and star histograms from the precomputed aggregate (one query)
+        """
+        aggregate = SpecialistRatingAggregate.objects.filter(pk=specialist_id).first()
+        return (aggregate or SpecialistRatingAggregate(specialist_id=specialist_id)).get_summary()
+
+    @staticmethod
+    def mark_helpful(user, review_id):
+        """
+        Record a helpful vote; voting twice on the same review is a no-op
+        """
+        review = SpecialistReview.objects.filter(pk=review_id, is_public=True).only('pk', 'client_id').first()
+        if review is None:
+            return {
+                'success': False,
+                'message': 'Review not found',
+                'error_code': 'NOT_FOUND'
+            }
+        if review.client_id == user.id:
+            return {
+                'success': False,
+                'message': 'You cannot vote on your own review',
+                'error_code': 'OWN_REVIEW'
+            }
+
+        try:
+            with transaction.atomic():
+                SpecialistReviewVote.objects.create(review_id=review_id, user=user)
+                SpecialistReview.objects.filter(pk=review_id).update(helpful_count=F('helpful_count') + 1)
+        except IntegrityError:
+            return {
+                'success': True,
+                'message': 'Already marked as helpful'
+            }
+        return {
+            'success': True,
+            'message': 'Marked as helpful'
+        }
+
+
+class SpecialistBookingService:
+    """
+    Service class to book specialists without double-booking.
+
+    The specialist row is locked (SELECT ... FOR UPDATE) for the duration of
+    the overlap check and insert, so concurrent bookings for the same
+    specialist are serialized and at most one of several overlapping
+    requests succeeds.
+    """
+
+    TIER_RANKS = {name: rank for rank, (name, _) in enumerate(SubscriptionTier.TIER_LEVELS)}
+
+    @classmethod
+    def client_tier(cls, user):
+        try:
+            subscription = UserSubscription.objects.select_related('tier').get(user=user)
+        except UserSubscription.DoesNotExist:
+            return None
+        return subscription.tier.name if subscription.is_active() else None
+
+    @classmethod
+    def is_entitled(cls, user, specialist):
+        tier = cls.client_tier(user)
+        if tier is None:
+            return False
+        return cls.TIER_RANKS[tier] >= cls.TIER_RANKS.get(specialist.tier, len(cls.TIER_RANKS))
+
+    @staticmethod
+    def pick_agent(user):
+        """
+        The agent already handling the client's latest request, else the least loaded active agent
+        """
+        agent = ConciergeAgent.objects.filter(
+            is_active=True, assigned_requests__client=user,
+        ).order_by('-assigned_requests__created_at').first()
+        if agent is None:
+            agent = ConciergeAgent.objects.filter(is_active=True).order_by('total_clients', 'id').first()
+        return agent
+
+    @staticmethod
+    def within_availability(specialist, start, end):
+        windows = SpecialistAvailability.objects.filter(
+            specialist=specialist, is_active=True,
+        ).values_list('day_of_week', 'start_time', 'end_time')
+        zone = get_zone(specialist.timezone)
+        local_day = start.astimezone(zone).date()
+        intervals = expand_weekly_windows(windows, local_day - timedelta(days=1), local_day, zone)
+        return any(window_start <= start and end <= window_end for window_start, window_end in intervals)
+
+    @staticmethod
+    def find_conflict(specialist_id, start, end):
+        """
+        First blocking appointment overlapping [start, end), if any
+        """
+        candidates = ConciergeAppointment.objects.filter(
+            specialist_id=specialist_id,
+            status__in=BLOCKING_APPOINTMENT_STATUSES,
+            scheduled_datetime__gt=start - timedelta(minutes=MAX_APPOINTMENT_MINUTES),
+            scheduled_datetime__lt=end,
+        ).only('id', 'scheduled_datetime', 'duration_minutes')
+        for appointment in candidates:
+            if appointment.scheduled_datetime + timedelta(minutes=appointment.duration_minutes) > start:
+                return appointment
+        return None
+
+    @classmethod
+    def book(cls, user, specialist_id, start, duration_minutes=60, appointment_type='specialist_consultation',
+             title='', description='', is_virtual=False):
+        """
+        Book a specialist for [start, start + duration_minutes)
+        """
+        if not 0 < duration_minutes <= MAX_APPOINTMENT_MINUTES:
+            return {
+                'success': False,
+                'message': f'Duration must be between 1 and {MAX_APPOINTMENT_MINUTES} minutes',
+                'error_code': 'INVALID_DURATION',
+            }
+        if appointment_type not in dict(ConciergeAppointment.APPOINTMENT_TYPES):
+            return {'success': False, 'message': 'Invalid appointment type', 'error_code': 'INVALID_TYPE'}
+        if start <= timezone.now():
+            return {'success': False, 'message': 'Bookings must be in the future', 'error_code': 'INVALID_START'}
+        end = start + timedelta(minutes=duration_minutes)
+
+        try:
+            specialist = Specialist.objects.select_related('user').get(pk=specialist_id)
+        except Specialist.DoesNotExist:
+            return {'success': False, 'message': 'Specialist not found', 'error_code': 'NOT_FOUND'}
+
+        if not specialist.is_accepting_clients:
+            return {'success': False, 'message': 'Specialist is not accepting clients', 'error_code': 'NOT_ACCEPTING'}
+        if not cls.is_entitled(user, specialist):
+            return {
+                'success': False,
+                'message': f'Your subscription does not include {specialist.get_tier_display()} specialists',
+                'error_code': 'NOT_ENTITLED',
+            }
+        if not cls.within_availability(specialist, start, end):
+            return {'success': False, 'message': 'Requested time is outside the specialist\'s availability', 'error_code': 'OUTSIDE_AVAILABILITY'}
+
+        agent = cls.pick_agent(user)
+        if agent is None:
+            return {'success': False, 'message': 'No concierge agent is available', 'error_code': 'NO_AGENT'}
+
+        with transaction.atomic():
+            # Serializes every booking for this specialist until commit
+            Specialist.objects.select_for_update().only('pk').get(pk=specialist.pk)
+
+            conflict = cls.find_conflict(specialist.pk, start, end)
+            if conflict is not None:
+                return {
+                    'success': False,
+                    'message': 'The requested time overlaps an existing booking',
+                    'error_code': 'SLOT_CONFLICT',
+                    'conflicting_appointment_id': conflict.id,
+                }
+
+            appointment = ConciergeAppointment.objects.create(
+                client=user,
+                agent=agent,
+                specialist=specialist,
+                title=title or f'Consultation with {specialist.get_full_name()}',
+                description=description,
+                appointment_type=appointment_type,
+                scheduled_datetime=start,
+                duration_minutes=duration_minutes,
+                timezone=user.timezone,
+                is_virtual=is_virtual,
+            )
+
+        logger.info(f"Booked specialist {specialist.pk} for user {user.pk} at {start.isoformat()}")
+        return {
+            'success': True,
+            'message': 'Booking confirmed',
+            'appointment_id': appointment.id,
+            'scheduled_datetime': start,
+            'duration_minutes': duration_minutes,
+        }
@@ -0,0 +1,171 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from authentication.models import CustomUser
+from concierge.models import ConciergeAppointment
+from .availability import AvailabilityService
+from .matching import SpecialistMatchingService
+from .models import Specialist, SpecialistAvailability, SpecialistCategory, SpecialistReview
+from .schedule import SpecialistScheduleService
+from .search import SpecialistSearchService
+from .similarity import SpecialistSimilarityService
+from .services import SpecialistListingService, SpecialistRatingService
+
+
+@receiver(post_save, sender=Specialist)
+@receiver(post_delete, sender=Specialist)
+@receiver(post_save, sender=SpecialistCategory)
+@receiver(post_delete, sender=SpecialistCategory)
+@receiver(post_save, sender=SpecialistReview)
+@receiver(post_delete, sender=SpecialistReview)
+@receiver(post_save, sender=SpecialistAvailability)
+@receiver(post_delete, sender=SpecialistAvailability)
+@receiver(m2m_changed, sender=Specialist.categories.through)
+def invalidate_listing_cache(sender, **kwargs):
+    """Cached listing pages embed all of these, so any write invalidates them"""
+    SpecialistListingService.invalidate()
+
+
+@receiver(pre_save, sender=SpecialistReview)
+@receiver(pre_delete, sender=SpecialistReview)
+def lock_stored_review(sender, instance, raw=False, **kwargs):
+    """Deltas are taken against the stored row, not whatever the instance was loaded with"""
+    if not raw:
+        instance._rating_snapshot = SpecialistRatingService.stored_snapshot(instance.pk)
+
+
+@receiver(post_save, sender=SpecialistReview)
+def apply_review_rating_change(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    SpecialistRatingService.apply_change(instance._rating_snapshot, instance.rating_snapshot())
+
+
+@receiver(post_delete, sender=SpecialistReview)
+def remove_review_rating(sender, instance, **kwargs):
+    SpecialistRatingService.apply_change(instance._rating_snapshot, None)
+
+
+@receiver(post_save, sender=ConciergeAppointment)
+@receiver(post_delete, sender=ConciergeAppointment)
+@receiver(post_save, sender=SpecialistAvailability)
+@receiver(post_delete, sender=SpecialistAvailability)
+def invalidate_specialist_availability(sender, instance, **kwargs):
+    if instance.specialist_id:
+        AvailabilityService.invalidate_specialist(instance.specialist_id)
+
+
+@receiver(post_save, sender=Specialist)
+def invalidate_specialist_availability_on_profile_change(sender, instance, **kwargs):
+    AvailabilityService.invalidate_specialist(instance.pk)
+
+
+@receiver(m2m_changed, sender=Specialist.categories.through)
+def invalidate_specialist_availability_on_categories(sender, instance, action, pk_set, reverse, **kwargs):
+    if reverse or action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    AvailabilityService.invalidate_specialist(instance.pk, extra_category_ids=pk_set or ())
+
+
+@receiver(post_save, sender=Specialist)
+def refresh_feature_vector(sender, instance, raw=False, **kwargs):
+    if not raw:
+        SpecialistMatchingService.refresh_on_commit([instance.pk])
+
+
+@receiver(post_save, sender=Specialist)
+def refresh_similarity_index(sender, instance, raw=False, **kwargs):
+    # A no-op unless the professional text actually changed
+    if not raw:
+        SpecialistSimilarityService.refresh_on_commit(instance.pk)
+
+
+@receiver(post_save, sender=SpecialistReview)
+@receiver(post_delete, sender=SpecialistReview)
+def refresh_feature_vector_on_review(sender, instance, **kwargs):
+    # Refreshed on commit, after the rating receivers above updated the average
+    SpecialistMatchingService.refresh_on_commit([instance.specialist_id])
+
+
+@receiver(m2m_changed, sender=Specialist.categories.through)
+def refresh_feature_vector_on_categories(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if reverse:
+        SpecialistMatchingService.refresh_on_commit(list(pk_set or instance.specialists.values_list('pk', flat=True)))
+    else:
+        SpecialistMatchingService.refresh_on_commit([instance.pk])
+
+
+@receiver(post_delete, sender=Specialist)
+def drop_feature_vector(sender, instance, **kwargs):
+    SpecialistMatchingService.bump_version(removed=True)
+
+
+@receiver(post_save, sender=Specialist)
+@receiver(post_save, sender=SpecialistReview)
+@receiver(post_delete, sender=SpecialistReview)
+def refresh_search_document(sender, instance, raw=False, **kwargs):
+    if not raw:
+        SpecialistSearchService.refresh_on_commit([getattr(instance, 'specialist_id', instance.pk)])
+
+
+@receiver(m2m_changed, sender=Specialist.categories.through)
+def refresh_search_document_on_categories(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if reverse:
+        SpecialistSearchService.refresh_on_commit(list(pk_set or instance.specialists.values_list('pk', flat=True)))
+    else:
+        SpecialistSearchService.refresh_on_commit([instance.pk])
+
+
+@receiver(post_save, sender=SpecialistCategory)
+def refresh_search_documents_on_category(sender, instance, created, raw=False, **kwargs):
+    if not raw and not created:
+        SpecialistSearchService.refresh_on_commit(instance.specialists.values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=CustomUser)
+def refresh_search_document_on_user(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Logins save last_login only; just name changes affect search
+    if raw or (update_fields and not {'first_name', 'last_name'} & set(update_fields)):
+        return
+    specialist_ids = list(Specialist.objects.filter(user=instance).values_list('pk', flat=True))
+    if specialist_ids:
+        SpecialistSearchService.refresh_on_commit(specialist_ids)
+
+
+@receiver(post_delete, sender=Specialist)
+def drop_search_document(sender, instance, **kwargs):
+    SpecialistSearchService.bump_version(removed=True)
+
+
+@receiver(post_save, sender=ConciergeAppointment)
+@receiver(post_delete, sender=ConciergeAppointment)
+@receiver(post_save, sender=SpecialistAvailability)
+@receiver(post_delete, sender=SpecialistAvailability)
+def refresh_schedule_summary(sender, instance, raw=False, **kwargs):
+    if not raw and instance.specialist_id:
+        SpecialistScheduleService.refresh_on_commit([instance.specialist_id])
+
+
+@receiver(post_save, sender=Specialist)
+def refresh_schedule_summary_on_profile_change(sender, instance, raw=False, **kwargs):
+    if not raw:
+        # Timezone or accepting status may have changed
+        SpecialistScheduleService.refresh_on_commit([instance.pk])
+        SpecialistScheduleService.refresh_categories_on_commit(instance.categories.values_list('pk', flat=True))
+
+
+@receiver(m2m_changed, sender=Specialist.categories.through)
+def refresh_category_stats(sender, instance, action, reverse, pk_set, **kwargs):
+    if action in ('post_add', 'post_remove'):
+        SpecialistScheduleService.refresh_categories_on_commit([instance.pk] if reverse else pk_set)
+    elif action == 'post_clear':
+        SpecialistScheduleService.refresh_categories_on_commit([instance.pk] if reverse else None)
+
+
+@receiver(post_delete, sender=Specialist)
+def refresh_category_stats_on_delete(sender, instance, **kwargs):
+    SpecialistScheduleService.refresh_categories_on_commit()
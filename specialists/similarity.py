@@ -0,0 +1,246 @@
+import heapq
+import logging
+import math
+import re
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Count
+
+from .models import Specialist, SpecialistNeighbour, SpecialistTerm
+
+
+logger = logging.getLogger(__name__)
+
+TEXT_FIELDS = ['professional_summary', 'specializations', 'certifications', 'education']
+TOKEN_PATTERN = re.compile(r"[a-z][a-z0-9+\-]{2,}")
+STOP_WORDS = frozenset("""
+    and are also been being but can for from has have into its may more most not our over per such than that the
+    their them then they this under via was were which while who will with within year years you your
+""".split())
+MAX_TERM_LENGTH = 64
+
+NEIGHBOUR_COUNT = 10
+# Strongest terms of a profile used to retrieve candidate neighbours
+QUERY_TERMS = 25
+# Best candidates whose own neighbour lists are checked on an incremental refresh
+REVERSE_CANDIDATES = 50
+
+
+def term_frequencies(specialist):
+    text = ' '.join(getattr(specialist, field) or '' for field in TEXT_FIELDS).lower()
+    return Counter(
+        token[:MAX_TERM_LENGTH] for token in TOKEN_PATTERN.findall(text) if token not in STOP_WORDS
+    )
+
+
+def idf(document_frequency, document_count):
+    """Smoothed inverse document frequency; ``document_frequency`` counts the document itself"""
+    return math.log((1 + document_count) / (1 + document_frequency)) + 1
+
+
+def tfidf(frequencies, document_frequencies, document_count):
+    """
+    L2-normalized sublinear tf-idf weights for one document, with
+    ``document_frequencies`` covering every term of the document
+    """
+    weights = {
+        term: (1 + math.log(count)) * idf(document_frequencies[term], document_count)
+        for term, count in frequencies.items()
+    }
+    norm = math.sqrt(sum(weight * weight for weight in weights.values()))
+    return {term: weight / norm for term, weight in weights.items()} if norm else {}
+
+
+def strongest_terms(weights):
+    return heapq.nlargest(QUERY_TERMS, weights.items(), key=lambda item: item[1])
+
+
+def top_neighbours(scores):
+    return heapq.nlargest(NEIGHBOUR_COUNT, ((pk, score) for pk, score in scores.items() if score > 0), key=lambda item: item[1])
+
+
+class SpecialistSimilarityService:
+    """
+    Service class to maintain the "similar specialists" index: tf-idf
+    postings per specialist (SpecialistTerm) and the top neighbours per
+    specialist (SpecialistNeighbour), so similarity is never computed at
+    request time
+    """
+
+    @staticmethod
+    def _score_candidates(specialist_id, weights):
+        query = dict(strongest_terms(weights))
+        scores = defaultdict(float)
+        postings = SpecialistTerm.objects.filter(term__in=list(query)).exclude(
+            specialist_id=specialist_id,
+        ).values_list('specialist_id', 'term', 'weight')
+        for other_id, term, weight in postings:
+            scores[other_id] += weight * query[term]
+        return scores
+
+    @staticmethod
+    def _upsert_neighbours(rows):
+        # A concurrent refresh of another specialist may insert the same pair
+        SpecialistNeighbour.objects.bulk_create(
+            rows, update_conflicts=True, unique_fields=['specialist', 'neighbour'], update_fields=['score', 'updated_at'],
+        )
+
+    @classmethod
+    def _store_neighbours(cls, specialist_id, scores):
+        SpecialistNeighbour.objects.filter(specialist_id=specialist_id).delete()
+        cls._upsert_neighbours([
+            SpecialistNeighbour(specialist_id=specialist_id, neighbour_id=other_id, score=score)
+            for other_id, score in top_neighbours(scores)
+        ])
+
+    @classmethod
+    def _update_reverse(cls, specialist_id, scores):
+        """
+        Fix up other specialists' neighbour lists after this one changed
+        """
+        # Lists that already contain this specialist get its new score, or drop it
+        existing = list(SpecialistNeighbour.objects.filter(neighbour_id=specialist_id))
+        changed, dropped = [], []
+        for row in existing:
+            score = scores.get(row.specialist_id, 0)
+            if score > 0:
+                row.score = score
+                changed.append(row)
+            else:
+                dropped.append(row.pk)
+        SpecialistNeighbour.objects.bulk_update(changed, ['score'])
+        SpecialistNeighbour.objects.filter(pk__in=dropped).delete()
+
+        # Strong candidates whose lists this specialist should now join
+        listed = {row.specialist_id for row in existing}
+        candidates = heapq.nlargest(
+            REVERSE_CANDIDATES,
+            ((pk, score) for pk, score in scores.items() if pk not in listed and score > 0),
+            key=lambda item: item[1],
+        )
+        if not candidates:
+            return
+
+        lists = defaultdict(list)
+        for owner_id, pk, score in SpecialistNeighbour.objects.filter(
+            specialist_id__in=[pk for pk, _ in candidates],
+        ).values_list('specialist_id', 'pk', 'score'):
+            lists[owner_id].append((score, pk))
+
+        additions, evicted = [], []
+        for owner_id, score in candidates:
+            current = lists[owner_id]
+            if len(current) >= NEIGHBOUR_COUNT:
+                weakest = min(current)
+                if score <= weakest[0]:
+                    continue
+                evicted.append(weakest[1])
+            additions.append(SpecialistNeighbour(specialist_id=owner_id, neighbour_id=specialist_id, score=score))
+        SpecialistNeighbour.objects.filter(pk__in=evicted).delete()
+        cls._upsert_neighbours(additions)
+
+    @classmethod
+    def refresh(cls, specialist_id):
+        """
+        Re-index one specialist after a profile change. Returns False when the
+        indexed text is unchanged and nothing had to be done.
+        """
+        with transaction.atomic():
+            # Serializes refreshes of one specialist, which replace its rows wholesale
+            specialist = Specialist.objects.select_for_update().filter(pk=specialist_id).only('pk', *TEXT_FIELDS).first()
+            if specialist is None:
+                return False
+
+            frequencies = term_frequencies(specialist)
+            indexed = dict(SpecialistTerm.objects.filter(specialist_id=specialist_id).values_list('term', 'term_frequency'))
+            if indexed == dict(frequencies):
+                return False
+
+            # Other documents containing each term, plus this one, as rebuild() counts them
+            others = dict(
+                SpecialistTerm.objects.filter(term__in=list(frequencies)).exclude(
+                    specialist_id=specialist_id,
+                ).values('term').annotate(count=Count('id')).order_by().values_list('term', 'count')
+            )
+            document_frequencies = {term: others.get(term, 0) + 1 for term in frequencies}
+            weights = tfidf(frequencies, document_frequencies, Specialist.objects.count())
+
+            SpecialistTerm.objects.filter(specialist_id=specialist_id).delete()
+            SpecialistTerm.objects.bulk_create([
+                SpecialistTerm(specialist_id=specialist_id, term=term, term_frequency=frequencies[term], weight=weight)
+                for term, weight in weights.items()
+            ])
+
+            scores = cls._score_candidates(specialist_id, weights)
+            cls._store_neighbours(specialist_id, scores)
+            cls._update_reverse(specialist_id, scores)
+        return True
+
+    @staticmethod
+    def refresh_on_commit(specialist_id):
+        transaction.on_commit(lambda: SpecialistSimilarityService.refresh(specialist_id))
+
+    @staticmethod
+    def rebuild(batch_size=5000):
+        """
+        Recompute every posting with corpus-wide document frequencies and
+        every neighbour list from an in-memory inverted index
+        """
+        frequencies = {
+            specialist.pk: term_frequencies(specialist)
+            for specialist in Specialist.objects.only('pk', *TEXT_FIELDS).iterator(chunk_size=2000)
+        }
+        document_frequencies = Counter()
+        for counts in frequencies.values():
+            document_frequencies.update(counts.keys())
+        weights = {
+            pk: tfidf(counts, document_frequencies, len(frequencies))
+            for pk, counts in frequencies.items()
+        }
+
+        postings = defaultdict(list)
+        for pk, document in weights.items():
+            for term, weight in document.items():
+                postings[term].append((pk, weight))
+
+        with transaction.atomic():
+            SpecialistTerm.objects.all().delete()
+            SpecialistNeighbour.objects.all().delete()
+
+            terms = [
+                SpecialistTerm(specialist_id=pk, term=term, term_frequency=frequencies[pk][term], weight=weight)
+                for pk, document in weights.items()
+                for term, weight in document.items()
+            ]
+            SpecialistTerm.objects.bulk_create(terms, batch_size=batch_size)
+
+            neighbours = []
+            for pk, document in weights.items():
+                scores = defaultdict(float)
+                for term, query_weight in strongest_terms(document):
+                    for other_id, weight in postings[term]:
+                        if other_id != pk:
+                            scores[other_id] += query_weight * weight
+                neighbours.extend(
+                    SpecialistNeighbour(specialist_id=pk, neighbour_id=other_id, score=score)
+                    for other_id, score in top_neighbours(scores)
+                )
+                if len(neighbours) >= batch_size:
+                    SpecialistNeighbour.objects.bulk_create(neighbours)
+                    neighbours = []
+            SpecialistNeighbour.objects.bulk_create(neighbours)
+
+        logger.info(f"Rebuilt similarity index for {len(weights)} specialists")
+        return len(weights)
+
+    @staticmethod
+    def similar(specialist_id, limit=NEIGHBOUR_COUNT):
+        """
+        Precomputed neighbours that are accepting clients, best first (one query)
+        """
+        return list(
+            SpecialistNeighbour.objects.filter(
+                specialist_id=specialist_id, neighbour__is_accepting_clients=True,
+            ).select_related('neighbour__user').order_by('-score')[:limit]
+        )
@@ -1,3 +1,657 @@
-from django.test import TestCase
+import sys
+import threading
+import time as timer
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from io import StringIO
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections
+from django.test import TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature
+from django.utils import timezone as dj_timezone
+from rest_framework.test import APIClient
+
+from authentication.models import CustomUser, UserProfile
+from concierge.models import ConciergeAgent, ConciergeAppointment
+from core.models import SubscriptionTier, UserSubscription
+
+from . import matching, search
+from .checks import check_shared_cache
+from .availability import AvailabilityService, compute_free_slots, expand_weekly_windows, get_zone, merge_intervals, subtract_intervals
+from .models import (
+    Specialist, SpecialistAvailability, SpecialistCategory, SpecialistCategoryStats, SpecialistRatingAggregate,
+    SpecialistReview, SpecialistScheduleSummary, SpecialistTerm,
+)
+from .matching import SpecialistMatchingService
+from .schedule import SpecialistScheduleService
+from .search import PrefixTrie, SpecialistSearchService
+from .services import SpecialistBookingService, SpecialistReviewService
+from .similarity import SpecialistSimilarityService
+
+
+def create_specialist(index, categories=(), **overrides):
+    user = CustomUser.objects.create_user(
+        username=f'specialist{index}',
+        email=f'specialist{index}@example.com',
+        password='password',
+        first_name='Specialist',
+        last_name=str(index),
+    )
+    fields = {
+        'title': 'Dr.',
+        'professional_summary': 'Summary',
+        'years_experience': 5,
+        'certifications': 'Certified',
+        'education': 'Educated',
+        'specializations': 'Wellness',
+        'hourly_rate': Decimal('150.00'),
+        'consultation_rate': Decimal('90.00'),
+    }
+    fields.update(overrides)
+    specialist = Specialist.objects.create(user=user, **fields)
+    specialist.categories.add(*categories)
+    return specialist
+
+
+# Query counts below assume cache hits cost no queries
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class SpecialistListingQueryCountTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.categories = [
+            SpecialistCategory.objects.create(name='fitness', display_name='Fitness', description='Fitness'),
+            SpecialistCategory.objects.create(name='nutrition', display_name='Nutrition', description='Nutrition'),
+        ]
+        self.reviewer = CustomUser.objects.create_user(
+            username='reviewer', email='reviewer@example.com', password='password'
+        )
+        self.next_index = 0
+
+    def add_specialists(self, count):
+        for _ in range(count):
+            specialist = create_specialist(self.next_index, categories=self.categories)
+            self.next_index += 1
+            SpecialistAvailability.objects.create(
+                specialist=specialist, day_of_week=1, start_time=time(9), end_time=time(12)
+            )
+            SpecialistReview.objects.create(
+                specialist=specialist, client=self.reviewer, rating=5, title='Great',
+                review_text='Great', professionalism=5, expertise=5, communication=5, results=5,
+            )
+
+    def get_directory(self, **params):
+        return self.client.get('/api/specialists/directory/', params, HTTP_HOST='localhost')
+
+    def test_directory_query_count_is_constant(self):
+        self.add_specialists(2)
+        with self.assertNumQueries(3):
+            small = self.get_directory(category='fitness')
+
+        self.add_specialists(10)
+        cache.clear()
+        with self.assertNumQueries(3):
+            large = self.get_directory(category='fitness')
+
+        self.assertEqual(len(small.data['results']), 2)
+        self.assertEqual(len(large.data['results']), 12)
+        self.assertEqual(len(large.data['results'][0]['categories']), 2)
+        self.assertEqual(large.data['results'][0]['review_summary']['count'], 1)
+
+    def test_cached_page_is_served_without_queries(self):
+        self.add_specialists(3)
+        self.get_directory()
+        with self.assertNumQueries(0):
+            response = self.get_directory()
+        self.assertEqual(len(response.data['results']), 3)
+
+    def test_non_finite_numbers_are_rejected(self):
+        for value in ('NaN', 'Infinity', '-inf', 'sNaN', 'abc'):
+            response = self.get_directory(min_rating=value)
+            self.assertEqual((response.status_code, response.data['message']), (400, 'min_rating must be a number'))
+
+    def test_deploy_check_requires_shared_cache(self):
+        with self.settings(DEBUG=False):
+            self.assertEqual([error.id for error in check_shared_cache(None)], ['specialists.E001'])
+        redis = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://cache:6379/0'}}
+        with self.settings(DEBUG=False, CACHES=redis):
+            self.assertEqual(check_shared_cache(None), [])
+
+    def test_review_save_invalidates_cached_pages(self):
+        self.add_specialists(1)
+        self.get_directory()
+        review = SpecialistReview.objects.get()
+        review.is_public = False
+        review.save()
+        response = self.get_directory()
+        self.assertEqual(response.data['results'][0]['review_summary']['count'], 0)
+
+
+class SpecialistRatingAggregateTests(TestCase):
+
+    def setUp(self):
+        self.specialist = create_specialist(1)
+        self.clients = [
+            CustomUser.objects.create_user(username=f'client{i}', email=f'client{i}@example.com', password='password')
+            for i in range(3)
+        ]
+
+    def review(self, client, rating, **overrides):
+        fields = {
+            'rating': rating, 'title': 'Review', 'review_text': 'Review',
+            'professionalism': rating, 'expertise': rating, 'communication': rating, 'results': rating,
+        }
+        fields.update(overrides)
+        return SpecialistReview.objects.create(specialist=self.specialist, client=client, **fields)
+
+    def assertRatings(self, total_reviews, average_rating):
+        self.specialist.refresh_from_db()
+        self.assertEqual(self.specialist.total_reviews, total_reviews)
+        self.assertEqual(self.specialist.average_rating, Decimal(average_rating))
+
+    def test_create_update_delete_maintain_running_sums(self):
+        first = self.review(self.clients[0], 5, expertise=3)
+        self.review(self.clients[1], 2)
+        self.assertRatings(2, '3.50')
+
+        aggregate = SpecialistRatingAggregate.objects.get(specialist=self.specialist)
+        self.assertEqual(aggregate.expertise_sum, 5)
+        self.assertEqual(aggregate.get_averages()['expertise'], 2.5)
+
+        first = SpecialistReview.objects.get(pk=first.pk)
+        first.rating = 4
+        first.save()
+        self.assertRatings(2, '3.00')
+
+        first.is_public = False
+        first.save()
+        self.assertRatings(1, '2.00')
+
+        SpecialistReview.objects.filter(client=self.clients[1]).get().delete()
+        self.assertRatings(0, '0.00')
+
+    def test_stale_and_unloaded_instances_apply_stored_deltas(self):
+        review = self.review(self.clients[0], 5)
+        stale = SpecialistReview.objects.get(pk=review.pk)
+        current = SpecialistReview.objects.get(pk=review.pk)
+        current.rating = 1
+        current.save()
+        # Still holds rating 5 in memory, the stored row says 1
+        stale.rating = 3
+        stale.save()
+        self.assertRatings(1, '3.00')
+
+        rebuilt = SpecialistReview(
+            pk=review.pk, specialist=self.specialist, client=self.clients[0], rating=4, title='Review',
+            review_text='Review', professionalism=5, expertise=5, communication=5, results=5,
+            created_at=review.created_at,
+        )
+        rebuilt.save()
+        self.assertRatings(1, '4.00')
+        aggregate = SpecialistRatingAggregate.objects.get(specialist=self.specialist)
+        self.assertEqual((aggregate.rating_sum, aggregate.distributions['rating']), (4, [0, 0, 0, 1, 0]))
+
+        stale.delete()
+        self.assertRatings(0, '0.00')
+
+    def test_rebuild_command_backfills_from_reviews(self):
+        self.review(self.clients[0], 4)
+        self.review(self.clients[1], 5)
+        SpecialistRatingAggregate.objects.all().delete()
+        Specialist.objects.update(total_reviews=0, average_rating=0)
+
+        call_command('rebuild_specialist_ratings', stdout=StringIO())
+
+        self.assertRatings(2, '4.50')
+        self.assertEqual(SpecialistRatingAggregate.objects.get(specialist=self.specialist).results_sum, 9)
+
+    def test_histograms_follow_writes_and_match_rebuild(self):
+        first = self.review(self.clients[0], 5, expertise=3)
+        self.review(self.clients[1], 5)
+        self.review(self.clients[2], 2)
+        first = SpecialistReview.objects.get(pk=first.pk)
+        first.rating = 4
+        first.save()
+
+        with self.assertNumQueries(1):
+            summary = SpecialistReviewService.summary(self.specialist.pk)
+        self.assertEqual(summary['histogram'], {1: 0, 2: 1, 3: 0, 4: 1, 5: 1})
+        self.assertEqual(summary['distributions']['expertise'], {1: 0, 2: 1, 3: 1, 4: 0, 5: 1})
+
+        incremental = SpecialistRatingAggregate.objects.get(specialist=self.specialist).distributions
+        call_command('rebuild_specialist_ratings', stdout=StringIO())
+        self.assertEqual(SpecialistRatingAggregate.objects.get(specialist=self.specialist).distributions, incremental)
+
+    def test_out_of_range_scores_stay_out_of_histograms(self):
+        self.review(self.clients[0], 5)
+        self.review(self.clients[1], 6, expertise=0)
+        aggregate = SpecialistRatingAggregate.objects.get(specialist=self.specialist)
+        self.assertEqual(aggregate.distributions['rating'], [0, 0, 0, 0, 1])
+        self.assertEqual(aggregate.distributions['expertise'], [0, 0, 0, 0, 1])
+        call_command('rebuild_specialist_ratings', stdout=StringIO())
+        self.assertEqual(SpecialistRatingAggregate.objects.get(specialist=self.specialist).distributions, aggregate.distributions)
+
+    def test_deleting_specialist_cascades_cleanly(self):
+        self.review(self.clients[0], 4)
+        self.specialist.delete()
+        self.assertFalse(SpecialistRatingAggregate.objects.exists())
+
+
+class SpecialistReviewFeedTests(TestCase):
+
+    def setUp(self):
+        self.specialist = create_specialist(1)
+        self.voter = CustomUser.objects.create_user(username='voter', email='voter@example.com', password='password')
+        created = dj_timezone.now()
+        self.reviews = []
+        for i in range(7):
+            client = CustomUser.objects.create_user(username=f'client{i}', email=f'client{i}@example.com', password='password')
+            self.reviews.append(SpecialistReview.objects.create(
+                specialist=self.specialist, client=client, rating=4, title='Review', review_text='Review',
+                professionalism=4, expertise=4, communication=4, results=4,
+                # Two reviews share a timestamp so the id tie-breaker is exercised
+                created_at=created - timedelta(hours=max(i, 1)),
+                helpful_count=i % 3,
+            ))
+
+    def collect(self, sort):
+        client = APIClient()
+        ids, cursor = [], None
+        while True:
+            params = {'sort': sort, 'page_size': 3, **({'cursor': cursor} if cursor else {})}
+            response = client.get(f'/api/specialists/reviews/{self.specialist.pk}/feed/', params, HTTP_HOST='localhost')
+            self.assertEqual(response.status_code, 200)
+            ids.extend(row['id'] for row in response.data['results'])
+            cursor = response.data['next_cursor']
+            if not cursor:
+                return ids
+
+    def test_cursor_pages_cover_every_review_in_order(self):
+        expected = SpecialistReview.objects.filter(specialist=self.specialist).order_by('-created_at', '-id')
+        self.assertEqual(self.collect('recent'), [review.pk for review in expected])
+        expected = SpecialistReview.objects.filter(specialist=self.specialist).order_by('-helpful_count', '-created_at', '-id')
+        self.assertEqual(self.collect('helpful'), [review.pk for review in expected])
+
+    def test_helpful_vote_counts_once(self):
+        review = self.reviews[0]
+        for _ in range(2):
+            self.assertTrue(SpecialistReviewService.mark_helpful(self.voter, review.pk)['success'])
+        review.refresh_from_db()
+        self.assertEqual(review.helpful_count, 1)
+        self.assertEqual(SpecialistReviewService.mark_helpful(review.client, review.pk)['error_code'], 'OWN_REVIEW')
+
+
+class AvailabilityEngineTests(TestCase):
+
+    def test_subtract_intervals_splits_around_bookings(self):
+        day = datetime(2030, 1, 7, tzinfo=dt_timezone.utc)
+        free = [(day.replace(hour=9), day.replace(hour=17))]
+        busy = merge_intervals([
+            (day.replace(hour=12), day.replace(hour=13)),
+            (day.replace(hour=8), day.replace(hour=10)),
+            (day.replace(hour=12, minute=30), day.replace(hour=14)),
+        ])
+        self.assertEqual(subtract_intervals(free, busy), [
+            (day.replace(hour=10), day.replace(hour=12)),
+            (day.replace(hour=14), day.replace(hour=17)),
+        ])
+
+    def test_windows_follow_specialist_timezone_across_dst(self):
+        zone = get_zone('America/New_York')
+        windows = [(5, time(9), time(10)), (0, time(9), time(10))]
+        # DST starts in New York on Sunday 2030-03-10, between these two windows
+        intervals = expand_weekly_windows(windows, date(2030, 3, 9), date(2030, 3, 11), zone)
+        self.assertEqual([start.hour for start, _ in intervals], [14, 13])
+
+    def test_free_slots_exclude_booked_appointments(self):
+        zone = get_zone('UTC')
+        booked = datetime(2030, 1, 7, 10, tzinfo=dt_timezone.utc)
+        slots = compute_free_slots(
+            [(0, time(9), time(12))], [(booked, booked + timedelta(minutes=30))],
+            date(2030, 1, 7), date(2030, 1, 7), zone, slot_minutes=60,
+        )
+        self.assertEqual([start.strftime('%H:%M') for start, _ in slots], ['09:00', '10:30'])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class FreeSpecialistsTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.category = SpecialistCategory.objects.create(name='nutrition', display_name='Nutrition', description='Nutrition')
+        self.day = date.today() + timedelta(days=7 - date.today().weekday() + 1)  # a Tuesday in the future
+        self.busy = create_specialist(1, categories=[self.category], average_rating=Decimal('4.90'))
+        self.free = create_specialist(2, categories=[self.category], average_rating=Decimal('4.50'), timezone='Europe/London')
+        for specialist in (self.busy, self.free):
+            SpecialistAvailability.objects.create(
+                specialist=specialist, day_of_week=self.day.weekday(), start_time=time(8), end_time=time(17)
+            )
+        agent_user = CustomUser.objects.create_user(username='agent', email='agent@example.com', password='password')
+        self.agent = ConciergeAgent.objects.create(user=agent_user, employee_id='A1', department='Concierge')
+        self.client_user = CustomUser.objects.create_user(username='client', email='client@example.com', password='password')
+
+    def book(self, specialist, hour, minutes=60):
+        return ConciergeAppointment.objects.create(
+            client=self.client_user, agent=self.agent, specialist=specialist, title='Session', description='Session',
+            appointment_type='nutrition_consultation',
+            scheduled_datetime=datetime.combine(self.day, time(hour), tzinfo=dt_timezone.utc),
+            duration_minutes=minutes,
+        )
+
+    def query(self):
+        return AvailabilityService.free_specialists(
+            'nutrition', self.day, time(9), time(11), get_zone('UTC'), duration_minutes=60
+        )
+
+    def test_ranks_free_specialists_and_caches_per_category_day(self):
+        self.book(self.busy, 9, minutes=90)
+        with self.assertNumQueries(2):
+            results = self.query()
+        # London is UTC+0 or +1, so its 08:00-17:00 window always covers 09:00-11:00 UTC
+        self.assertEqual([result['specialist_id'] for result in results], [self.free.id])
+        with self.assertNumQueries(0):
+            self.query()
+
+        # Minutes already past are not offered
+        now = datetime.combine(self.day, time(10), tzinfo=dt_timezone.utc)
+        results = AvailabilityService.free_specialists('nutrition', self.day, time(9), time(11), get_zone('UTC'), 30, now=now)
+        self.assertEqual([(result['first_available'], result['free_minutes']) for result in results], [
+            ((now + timedelta(minutes=30)).isoformat(), 30), (now.isoformat(), 60),
+        ])
+        later = now + timedelta(minutes=45)
+        self.assertEqual(AvailabilityService.free_specialists('nutrition', self.day, time(9), time(11), get_zone('UTC'), 30, now=later), [])
+
+    def test_view_rejects_impossible_dates(self):
+        client = APIClient()
+        client.force_authenticate(self.client_user)
+        params = {'category': 'nutrition', 'start': '09:00', 'end': '11:00'}
+        response = client.get('/api/specialists/free/', {**params, 'date': '2024-02-30'}, HTTP_HOST='localhost')
+        self.assertEqual(response.status_code, 400)
+        response = client.get('/api/specialists/free/', {**params, 'date': self.day.isoformat()}, HTTP_HOST='localhost')
+        self.assertEqual(len(response.json()['results']), 2)
+
+    def test_day_long_appointments_from_the_previous_day_are_busy(self):
+        overnight = self.book(self.busy, 11, minutes=24 * 60)
+        overnight.scheduled_datetime -= timedelta(days=1)
+        overnight.save()
+        lower = datetime.combine(self.day, time(9), tzinfo=dt_timezone.utc)
+        busy = AvailabilityService.load_busy([self.busy.id], lower, lower + timedelta(hours=2))
+        self.assertEqual(busy[self.busy.id], [(overnight.scheduled_datetime, lower + timedelta(hours=2))])
+        self.assertEqual([result['specialist_id'] for result in self.query()], [self.free.id])
+
+    def test_booking_invalidates_cached_results(self):
+        self.assertEqual(len(self.query()), 2)
+        self.book(self.free, 9, minutes=120)
+        self.assertEqual([result['specialist_id'] for result in self.query()], [self.busy.id])
+
+
+class SpecialistBookingTests(TransactionTestCase):
+
+    STRESS_ATTEMPTS = 300
+    # Stay below PostgreSQL's default max_connections (100)
+    STRESS_WORKERS = 80
+
+    def setUp(self):
+        cache.clear()
+        self.specialist = create_specialist(1, tier='premium')
+        self.start = datetime.combine(date.today() + timedelta(days=3), time(10), tzinfo=dt_timezone.utc)
+        SpecialistAvailability.objects.create(
+            specialist=self.specialist, day_of_week=self.start.weekday(), start_time=time(8), end_time=time(18)
+        )
+        agent_user = CustomUser.objects.create_user(username='agent', email='agent@example.com', password='password')
+        ConciergeAgent.objects.create(user=agent_user, employee_id='A1', department='Concierge')
+        tier = SubscriptionTier.objects.create(
+            name='premium', display_name='Premium', description='Premium', monthly_price=100, annual_price=1000,
+        )
+        self.clients = []
+        for index in range(5):
+            user = CustomUser.objects.create_user(
+                username=f'client{index}', email=f'client{index}@example.com', password='password'
+            )
+            UserSubscription.objects.create(
+                user=user, tier=tier, status='active', end_date=dj_timezone.now() + timedelta(days=30)
+            )
+            self.clients.append(user)
+
+    def book(self, user, start=None, minutes=60):
+        return SpecialistBookingService.book(user, self.specialist.id, start or self.start, duration_minutes=minutes)
+
+    def test_overlapping_booking_returns_conflict(self):
+        self.assertTrue(self.book(self.clients[0])['success'])
+        result = self.book(self.clients[1], start=self.start + timedelta(minutes=30))
+        self.assertEqual(result['error_code'], 'SLOT_CONFLICT')
+        self.assertTrue(self.book(self.clients[1], start=self.start + timedelta(minutes=60))['success'])
+        # Longer bookings would fall outside the overlap lookback
+        self.assertEqual(self.book(self.clients[2], start=self.start + timedelta(hours=2), minutes=24 * 60 + 1)['error_code'], 'INVALID_DURATION')
+
+    def test_requires_entitlement_and_availability(self):
+        outsider = CustomUser.objects.create_user(username='outsider', email='outsider@example.com', password='password')
+        self.assertEqual(self.book(outsider)['error_code'], 'NOT_ENTITLED')
+        self.assertEqual(self.book(self.clients[0], start=self.start.replace(hour=19))['error_code'], 'OUTSIDE_AVAILABILITY')
+
+    def test_booking_view_maps_conflict_to_409(self):
+        self.client.force_login(self.clients[0])
+        url = f'/api/specialists/book/{self.specialist.id}/'
+        payload = {'start': self.start.isoformat(), 'duration_minutes': 60}
+        self.assertEqual(self.client.post(url, payload, content_type='application/json', HTTP_HOST='localhost').status_code, 201)
+        self.assertEqual(self.client.post(url, payload, content_type='application/json', HTTP_HOST='localhost').status_code, 409)
+
+    def test_booking_view_rejects_malformed_input(self):
+        self.client.force_login(self.clients[0])
+        url = f'/api/specialists/book/{self.specialist.id}/'
+        bodies = [
+            {'start': '2030-02-30T10:00:00', 'duration_minutes': 60},
+            ['start'],
+            {'start': self.start.isoformat(), 'duration_minutes': 'x'},
+            {'start': self.start.isoformat(), 'duration_minutes': 24 * 60 + 1},
+        ]
+        for body in bodies:
+            response = self.client.post(url, body, content_type='application/json', HTTP_HOST='localhost')
+            self.assertEqual(response.status_code, 400)
+
+    @skipUnlessDBFeature('has_select_for_update')
+    def test_concurrent_bookings_for_same_slot_yield_one_success(self):
+        gate = threading.Event()
+
+        def attempt(index):
+            gate.wait()
+            try:
+                return self.book(self.clients[index % len(self.clients)])['success']
+            finally:
+                connections.close_all()
+
+        with ThreadPoolExecutor(max_workers=self.STRESS_WORKERS) as pool:
+            futures = [pool.submit(attempt, index) for index in range(self.STRESS_ATTEMPTS)]
+            started = timer.perf_counter()
+            gate.set()
+            outcomes = [future.result() for future in futures]
+            elapsed = timer.perf_counter() - started
+
+        self.assertEqual(outcomes.count(True), 1)
+        self.assertEqual(ConciergeAppointment.objects.filter(specialist=self.specialist).count(), 1)
+        sys.stderr.write(
+            f'\n{self.STRESS_ATTEMPTS} concurrent booking attempts in {elapsed:.2f}s '
+            f'({self.STRESS_ATTEMPTS / elapsed:.0f} attempts/s)\n'
+        )
+
+
+class SpecialistMatchingTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        matching.match_index = matching.SpecialistMatchIndex()
+        nutrition = SpecialistCategory.objects.create(name='nutrition', display_name='Nutrition', description='Nutrition')
+        fitness = SpecialistCategory.objects.create(name='fitness', display_name='Fitness', description='Fitness')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.dietitian = create_specialist(1, categories=[nutrition], specializations='Weight loss and meal planning')
+            self.coach = create_specialist(2, categories=[fitness], specializations='Strength and hypertrophy')
+            self.diamond = create_specialist(3, categories=[nutrition], specializations='Weight loss', tier='diamond')
+            self.closed = create_specialist(4, categories=[nutrition], specializations='Weight loss', is_accepting_clients=False)
+
+        self.user = CustomUser.objects.create_user(username='member', email='member@example.com', password='password')
+        self.profile = UserProfile(user=self.user, primary_goal='lose_weight', dietary_preferences=['vegetarian'])
+        tier = SubscriptionTier.objects.create(
+            name='premium', display_name='Premium', description='Premium', monthly_price=100, annual_price=1000,
+        )
+        UserSubscription.objects.create(user=self.user, tier=tier, status='active', end_date=dj_timezone.now() + timedelta(days=30))
+
+    def test_recommends_best_goal_match_within_entitlement(self):
+        matches = SpecialistMatchingService.recommend(self.user, k=5, profile=self.profile)
+        self.assertEqual([pk for pk, _ in matches], [self.dietitian.pk, self.coach.pk])
+
+    def test_view_reads_stored_profile(self):
+        self.profile.save()
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.get('/api/specialists/recommendations/', {'k': 5}, HTTP_HOST='localhost')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([result['id'] for result in response.json()['results']], [self.dietitian.pk, self.coach.pk])
+
+    def test_profile_change_refreshes_index_incrementally(self):
+        SpecialistMatchingService.recommend(self.user, profile=self.profile)
+        with self.captureOnCommitCallbacks(execute=True):
+            dietitian = Specialist.objects.get(pk=self.dietitian.pk)
+            dietitian.is_accepting_clients = False
+            dietitian.save()
+        matches = SpecialistMatchingService.recommend(self.user, k=5, profile=self.profile)
+        self.assertEqual([pk for pk, _ in matches], [self.coach.pk])
+
+
+class SpecialistSimilarityTests(TestCase):
+
+    def setUp(self):
+        self.nutrition = [
+            create_specialist(1, specializations='Clinical nutrition, diabetes meal planning, weight loss'),
+            create_specialist(2, specializations='Sports nutrition, meal planning for weight loss'),
+        ]
+        self.yoga = create_specialist(3, specializations='Yoga, meditation and mindfulness for stress')
+
+    def test_rebuild_ranks_text_neighbours(self):
+        call_command('rebuild_specialist_similarity', stdout=StringIO())
+        similar = SpecialistSimilarityService.similar(self.nutrition[0].pk)
+        self.assertEqual(similar[0].neighbour_id, self.nutrition[1].pk)
+
+    def test_profile_change_updates_both_sides_incrementally(self):
+        call_command('rebuild_specialist_similarity', stdout=StringIO())
+        with self.captureOnCommitCallbacks(execute=True):
+            self.yoga.specializations = 'Diabetes meal planning and clinical nutrition'
+            self.yoga.save()
+        self.assertEqual(SpecialistSimilarityService.similar(self.yoga.pk)[0].neighbour_id, self.nutrition[0].pk)
+        self.assertIn(self.yoga.pk, [row.neighbour_id for row in SpecialistSimilarityService.similar(self.nutrition[0].pk)])
+        with self.assertNumQueries(1):
+            [row.neighbour.get_full_name() for row in SpecialistSimilarityService.similar(self.nutrition[1].pk)]
+
+    def test_incremental_weights_match_rebuild(self):
+        call_command('rebuild_specialist_similarity', stdout=StringIO())
+        with self.captureOnCommitCallbacks(execute=True):
+            # 'ayurveda' appears in no other profile
+            self.yoga.specializations = 'Ayurveda, yoga and meal planning'
+            self.yoga.save()
+        refreshed = dict(SpecialistTerm.objects.filter(specialist=self.yoga).values_list('term', 'weight'))
+        call_command('rebuild_specialist_similarity', stdout=StringIO())
+        rebuilt = dict(SpecialistTerm.objects.filter(specialist=self.yoga).values_list('term', 'weight'))
+        self.assertEqual(refreshed.keys(), rebuilt.keys())
+        for term, weight in rebuilt.items():
+            self.assertAlmostEqual(refreshed[term], weight)
+
+
+class SpecialistSearchTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        search.search_index = search.SpecialistSearchIndex()
+        self.nutrition = SpecialistCategory.objects.create(name='nutrition', display_name='Nutrition & Dietetics', description='Nutrition')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.dietitian = create_specialist(1, categories=[self.nutrition], specializations='Sports nutrition', average_rating=Decimal('4.50'))
+            self.nurse = create_specialist(2, specializations='Diabetes nursing', average_rating=Decimal('4.90'))
+            self.closed = create_specialist(3, specializations='Nutrition', is_accepting_clients=False)
+
+    def suggest(self, text):
+        return [row['id'] for row in SpecialistSearchService.autocomplete(text)]
+
+    def test_autocomplete_ranks_prefix_matches(self):
+        self.assertEqual(self.suggest('nu'), [self.nurse.pk, self.dietitian.pk])
+        self.assertEqual(self.suggest('diet'), [self.dietitian.pk])
+        self.assertEqual(self.suggest('specialist 2'), [self.nurse.pk])
+        self.assertEqual(self.suggest('zz'), [])
+
+    def test_signals_update_autocomplete_and_search(self):
+        self.suggest('nu')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.nurse.specializations = 'Sleep coaching'
+            self.nurse.save()
+            self.dietitian.user.last_name = 'Moreau'
+            self.dietitian.user.save()
+            self.nutrition.display_name = 'Dietetics'
+            self.nutrition.save()
+        self.assertEqual(self.suggest('nu'), [self.dietitian.pk])
+        self.assertEqual(self.suggest('mor'), [self.dietitian.pk])
+        self.assertEqual(SpecialistSearchService.search('sleep coaching'), [self.nurse.pk])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.dietitian.delete()
+        self.assertEqual(self.suggest('nu'), [])
+
+    def test_trie_prunes_removed_terms(self):
+        trie = PrefixTrie()
+        trie.set(1, ['nutrition', 'nursing'], 4.0, 'A')
+        trie.set(2, ['nutrition'], 5.0, 'B')
+        trie.set(1, ['yoga'], 4.0, 'A')
+        self.assertEqual(trie.complete('nu'), [2])
+        trie.remove(2)
+        self.assertIsNone(trie.find('n'))
+        self.assertEqual(trie.root.count, 1)
+
+
+class SpecialistScheduleProjectionTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.category = SpecialistCategory.objects.create(name='fitness', display_name='Fitness', description='Fitness')
+        agent_user = CustomUser.objects.create_user(username='agent', email='agent@example.com', password='password')
+        self.agent = ConciergeAgent.objects.create(user=agent_user, employee_id='A1', department='Concierge')
+        self.client_user = CustomUser.objects.create_user(username='client', email='client@example.com', password='password')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.specialist = create_specialist(1, categories=[self.category])
+            for day in range(7):
+                SpecialistAvailability.objects.create(
+                    specialist=self.specialist, day_of_week=day, start_time=time(0), end_time=time(23, 59),
+                )
+
+    def summary(self):
+        return SpecialistScheduleSummary.objects.get(specialist=self.specialist)
+
+    def test_booking_moves_next_available_slot(self):
+        first = self.summary().next_available_at
+        self.assertIsNotNone(first)
+        with self.captureOnCommitCallbacks(execute=True):
+            ConciergeAppointment.objects.create(
+                client=self.client_user, agent=self.agent, specialist=self.specialist, title='Session',
+                description='Session', appointment_type='nutrition_consultation',
+                scheduled_datetime=first, duration_minutes=60,
+            )
+        self.assertGreater(self.summary().next_available_at, first)
+
+    def test_category_counts_follow_accepting_status(self):
+        stats = SpecialistCategoryStats.objects.get(category=self.category)
+        self.assertEqual((stats.specialist_count, stats.accepting_count), (1, 1))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.specialist.is_accepting_clients = False
+            self.specialist.save()
+        stats.refresh_from_db()
+        self.assertEqual((stats.specialist_count, stats.accepting_count, stats.available_this_week_count), (1, 0, 0))
+
+    def test_rolling_job_fills_missing_summaries_and_cards_read_them(self):
+        SpecialistScheduleSummary.objects.all().delete()
+        call_command('refresh_specialist_schedules', stdout=StringIO())
+        expected = self.summary().next_available_at.isoformat()
+
+        response = APIClient().get('/api/specialists/directory/', HTTP_HOST='localhost')
+        self.assertEqual(response.data['results'][0]['next_available_at'], expected)
+        self.assertEqual(SpecialistScheduleService.refresh_stale(), 0)
@@ -5,8 +5,19 @@ app_name = 'specialists'
 
 urlpatterns = [
     path('', views.specialist_list, name='list'),
+    path('directory/', views.specialist_directory, name='directory'),
+    path('free/', views.free_specialists, name='free'),
+    path('recommendations/', views.recommended_specialists, name='recommendations'),
+    path('search/', views.search_specialists, name='search'),
+    path('autocomplete/', views.autocomplete_specialists, name='autocomplete'),
+    path('categories/', views.category_counts, name='category_counts'),
     path('<int:pk>/', views.specialist_detail, name='detail'),
     path('category/<str:category>/', views.specialists_by_category, name='by_category'),
+    path('<int:specialist_id>/slots/', views.specialist_slots, name='slots'),
+    path('<int:specialist_id>/similar/', views.similar_specialists, name='similar'),
     path('book/<int:specialist_id>/', views.book_specialist, name='book'),
     path('reviews/<int:specialist_id>/', views.specialist_reviews, name='reviews'),
+    path('reviews/<int:specialist_id>/feed/', views.review_feed, name='review_feed'),
+    path('reviews/<int:specialist_id>/summary/', views.review_summary, name='review_summary'),
+    path('reviews/vote/<int:review_id>/helpful/', views.mark_review_helpful, name='mark_review_helpful'),
 ]
\ No newline at end of file
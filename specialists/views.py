@@ -1,14 +1,36 @@
+import json
+
 from django.shortcuts import render, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
 from django.contrib import messages
-from .models import Specialist, SpecialistCategory, SpecialistReview
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime, parse_time
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.response import Response
+from .models import Specialist, SpecialistCategory, SpecialistRatingAggregate
+from .availability import AvailabilityService, MAX_RANGE_DAYS, get_zone
+from .matching import SpecialistMatchingService
+from .search import SpecialistSearchService
+from .similarity import SpecialistSimilarityService
+from .services import (
+    SpecialistBookingService, SpecialistDirectoryService, SpecialistListingService, SpecialistReviewService,
+)
+
+BOOKING_ERROR_STATUS = {
+    'NOT_FOUND': 404,
+    'NOT_ENTITLED': 403,
+    'SLOT_CONFLICT': 409,
+    'NO_AGENT': 503,
+}
 
 
 def specialist_list(request):
     """List all specialists"""
-    specialists = Specialist.objects.filter(is_accepting_clients=True).select_related('user')
-    categories = SpecialistCategory.objects.filter(is_active=True)
+    specialists = SpecialistListingService.load(Specialist.objects.filter(is_accepting_clients=True))
+    categories = SpecialistCategory.objects.filter(is_active=True).select_related('stats')
     
     context = {
         'specialists': specialists,
@@ -20,12 +42,21 @@ def specialist_list(request):
 
 def specialist_detail(request, pk):
     """Specialist detail view"""
-    specialist = get_object_or_404(Specialist, pk=pk)
-    reviews = SpecialistReview.objects.filter(specialist=specialist, is_public=True).select_related('client')[:10]
+    specialist = get_object_or_404(Specialist.objects.select_related('user', 'rating_aggregate'), pk=pk)
+    reviews, reviews_cursor = SpecialistReviewService.feed(specialist.pk, page_size=10)
+    
+    try:
+        rating_summary = specialist.rating_aggregate.get_summary()
+    except SpecialistRatingAggregate.DoesNotExist:
+        rating_summary = None
     
     context = {
         'specialist': specialist,
         'reviews': reviews,
+        'reviews_cursor': reviews_cursor,
+        'rating_breakdown': rating_summary['averages'] if rating_summary else None,
+        'rating_summary': rating_summary,
+        'similar_specialists': [row.neighbour for row in SpecialistSimilarityService.similar(specialist.pk, limit=4)],
         'title': f'{specialist.get_full_name()}',
     }
     return render(request, 'specialists/detail.html', context)
@@ -35,10 +66,10 @@ def specialists_by_category(request, category):
     """Filter specialists by category"""
     try:
         category_obj = SpecialistCategory.objects.get(name=category, is_active=True)
-        specialists = Specialist.objects.filter(
+        specialists = SpecialistListingService.load(Specialist.objects.filter(
             categories=category_obj, 
             is_accepting_clients=True
-        ).select_related('user')
+        ))
     except SpecialistCategory.DoesNotExist:
         specialists = Specialist.objects.none()
         category_obj = None
@@ -57,9 +88,44 @@ def book_specialist(request, specialist_id):
     specialist = get_object_or_404(Specialist, id=specialist_id)
     
     if request.method == 'POST':
-        # Handle booking logic here
-        messages.success(request, f'Booking request sent to {specialist.get_full_name()}!')
-        return JsonResponse({'success': True, 'message': 'Booking requested successfully'})
+        if request.content_type == 'application/json':
+            try:
+                data = json.loads(request.body or '{}')
+            except ValueError:
+                data = None
+            if not isinstance(data, dict):
+                return JsonResponse({'success': False, 'message': 'Invalid JSON body'}, status=400)
+        else:
+            data = request.POST
+        
+        try:
+            start = parse_datetime(str(data.get('start', '')))
+            duration = int(data.get('duration_minutes', 60))
+        except (TypeError, ValueError):
+            start = duration = None
+        if start is None or duration is None:
+            return JsonResponse({
+                'success': False,
+                'message': 'start (ISO 8601 datetime) and an integer duration_minutes are required'
+            }, status=400)
+        if timezone.is_naive(start):
+            start = timezone.make_aware(start, get_zone(request.user.timezone))
+        
+        result = SpecialistBookingService.book(
+            request.user,
+            specialist.id,
+            start,
+            duration_minutes=duration,
+            appointment_type=data.get('appointment_type') or 'specialist_consultation',
+            title=data.get('title', ''),
+            description=data.get('description', ''),
+            is_virtual=str(data.get('is_virtual', '')).lower() in ('true', '1'),
+        )
+        if not result['success']:
+            return JsonResponse(result, status=BOOKING_ERROR_STATUS.get(result['error_code'], 400))
+        
+        messages.success(request, f'Booking confirmed with {specialist.get_full_name()}!')
+        return JsonResponse(result, status=201)
     
     context = {
         'specialist': specialist,
@@ -71,11 +137,291 @@ def book_specialist(request, specialist_id):
 def specialist_reviews(request, specialist_id):
     """Specialist reviews"""
     specialist = get_object_or_404(Specialist, id=specialist_id)
-    reviews = SpecialistReview.objects.filter(specialist=specialist, is_public=True).select_related('client')
+    sort = request.GET.get('sort', 'recent')
+    try:
+        reviews, next_cursor = SpecialistReviewService.feed(
+            specialist.pk, sort=sort, cursor=request.GET.get('cursor'),
+        )
+    except ValueError:
+        sort = 'recent'
+        reviews, next_cursor = SpecialistReviewService.feed(specialist.pk)
     
     context = {
         'specialist': specialist,
         'reviews': reviews,
+        'sort': sort,
+        'next_cursor': next_cursor,
+        'rating_summary': SpecialistReviewService.summary(specialist.pk),
         'title': f'Reviews for {specialist.get_full_name()}',
     }
     return render(request, 'specialists/reviews.html', context)
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def specialist_directory(request):
+    """
+    Filterable, keyset-paginated specialist directory
+    """
+    try:
+        filters = SpecialistDirectoryService.parse_filters(request.query_params)
+        page = SpecialistDirectoryService.cached_search(
+            filters, cursor=request.query_params.get('cursor')
+        )
+    except ValueError as e:
+        return Response({
+            'success': False,
+            'message': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response({
+        'success': True,
+        **page,
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def specialist_slots(request, specialist_id):
+    """
+    Bookable slots for a specialist between two dates (inclusive)
+    """
+    specialist = get_object_or_404(Specialist, id=specialist_id)
+
+    try:
+        start_date = parse_date(request.query_params.get('start', ''))
+        end_date = parse_date(request.query_params.get('end', ''))
+        duration = int(request.query_params.get('duration', 60))
+    except ValueError:
+        start_date = end_date = duration = None
+
+    if not start_date or not end_date or not duration or duration <= 0:
+        return Response({
+            'success': False,
+            'message': 'start, end (YYYY-MM-DD) and a positive duration in minutes are required'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    if end_date < start_date or (end_date - start_date).days > MAX_RANGE_DAYS:
+        return Response({
+            'success': False,
+            'message': f'end must be on or after start and within {MAX_RANGE_DAYS} days'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    slots = AvailabilityService.free_slots([specialist], start_date, end_date, duration)[specialist.id]
+
+    return Response({
+        'success': True,
+        'specialist_id': specialist.id,
+        'timezone': specialist.timezone,
+        'duration_minutes': duration,
+        'slots': [{'start': start.isoformat(), 'end': end.isoformat()} for start, end in slots],
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def free_specialists(request):
+    """
+    Specialists in a category who are free for a time window on a given day
+    """
+    params = request.query_params
+    category = params.get('category')
+    try:
+        day = parse_date(params.get('date', '')) if params.get('date') else None
+        start_time = parse_time(params.get('start', ''))
+        end_time = parse_time(params.get('end', ''))
+        duration = int(params.get('duration', 60))
+        limit = int(params['limit']) if params.get('limit') else None
+    except ValueError:
+        day = start_time = end_time = duration = None
+        limit = None
+
+    if not category or not day or not start_time or not end_time or not duration or duration <= 0:
+        return Response({
+            'success': False,
+            'message': 'category, date (YYYY-MM-DD), start and end (HH:MM) and a positive duration are required'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    if end_time <= start_time:
+        return Response({
+            'success': False,
+            'message': 'end must be after start'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    zone = get_zone(params.get('timezone') or request.user.timezone)
+    results = AvailabilityService.free_specialists(category, day, start_time, end_time, zone, duration, limit=limit)
+
+    return Response({
+        'success': True,
+        'category': category,
+        'date': day.isoformat(),
+        'timezone': zone.key,
+        'results': results,
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def recommended_specialists(request):
+    """
+    Specialists best matching the user's goals and profile, within their tier
+    """
+    try:
+        k = min(int(request.query_params.get('k', 10)), SpecialistDirectoryService.MAX_PAGE_SIZE)
+    except ValueError:
+        return Response({
+            'success': False,
+            'message': 'k must be an integer'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    matches = SpecialistMatchingService.recommend(request.user, k=max(k, 1))
+    specialists = {
+        specialist.id: specialist
+        for specialist in SpecialistListingService.load(Specialist.objects.filter(pk__in=[pk for pk, _ in matches]))
+    }
+
+    return Response({
+        'success': True,
+        'results': [
+            {**SpecialistDirectoryService.serialize(specialists[pk]), 'match_score': round(score, 4)}
+            for pk, score in matches if pk in specialists
+        ],
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def similar_specialists(request, specialist_id):
+    """
+    Precomputed most similar specialists by professional background
+    """
+    neighbours = SpecialistSimilarityService.similar(specialist_id)
+
+    return Response({
+        'success': True,
+        'specialist_id': specialist_id,
+        'results': [
+            {
+                'id': row.neighbour.id,
+                'name': row.neighbour.get_full_name(),
+                'tier': row.neighbour.tier,
+                'average_rating': str(row.neighbour.average_rating),
+                'similarity': round(row.score, 4),
+            }
+            for row in neighbours
+        ],
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def review_feed(request, specialist_id):
+    """
+    Cursor-paginated public reviews, by recency or helpfulness
+    """
+    try:
+        page_size = SpecialistDirectoryService._parse_int(request.query_params, 'page_size')
+        reviews, next_cursor = SpecialistReviewService.feed(
+            specialist_id,
+            sort=request.query_params.get('sort', 'recent'),
+            cursor=request.query_params.get('cursor'),
+            page_size=page_size,
+        )
+    except ValueError as e:
+        return Response({
+            'success': False,
+            'message': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response({
+        'success': True,
+        'results': [SpecialistReviewService.serialize(review) for review in reviews],
+        'next_cursor': next_cursor,
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def review_summary(request, specialist_id):
+    """
+    Review count, averages and star histograms for a specialist
+    """
+    return Response({
+        'success': True,
+        'specialist_id': specialist_id,
+        **SpecialistReviewService.summary(specialist_id),
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def mark_review_helpful(request, review_id):
+    """
+    Mark a review as helpful
+    """
+    result = SpecialistReviewService.mark_helpful(request.user, review_id)
+    if not result['success']:
+        return Response(result, status=status.HTTP_404_NOT_FOUND if result['error_code'] == 'NOT_FOUND' else status.HTTP_400_BAD_REQUEST)
+    return Response(result, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def search_specialists(request):
+    """
+    Full-text search over specialist names, titles, summaries, specializations and categories
+    """
+    text = request.query_params.get('q', '').strip()
+    if not text:
+        return Response({
+            'success': False,
+            'message': 'q is required'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    ids = SpecialistSearchService.search(text)
+    specialists = {
+        specialist.id: specialist
+        for specialist in SpecialistListingService.load(Specialist.objects.filter(pk__in=ids))
+    }
+
+    return Response({
+        'success': True,
+        'results': [SpecialistDirectoryService.serialize(specialists[pk]) for pk in ids if pk in specialists],
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def autocomplete_specialists(request):
+    """
+    Typeahead suggestions served from the in-memory prefix index
+    """
+    return Response({
+        'success': True,
+        'results': SpecialistSearchService.autocomplete(request.query_params.get('q', '')),
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def category_counts(request):
+    """
+    Active categories with their maintained specialist counts
+    """
+    categories = SpecialistCategory.objects.filter(is_active=True).select_related('stats').order_by('display_name')
+
+    def counts(category):
+        stats = getattr(category, 'stats', None)
+        return {
+            'specialist_count': stats.specialist_count if stats else 0,
+            'accepting_count': stats.accepting_count if stats else 0,
+            'available_this_week_count': stats.available_this_week_count if stats else 0,
+        }
+
+    return Response({
+        'success': True,
+        'results': [
+            {'name': category.name, 'display_name': category.display_name, **counts(category)}
+            for category in categories
+        ],
+    }, status=status.HTTP_200_OK)
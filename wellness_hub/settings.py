@@ -51,6 +51,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     
     # Third party apps
     'rest_framework',
@@ -463,6 +464,27 @@ SWAGGER_SETTINGS = {
     ],
 }
 
+# Cache settings
+# Cached specialist listings are invalidated by bumping a generation key, often
+# from another process (other web workers, management commands run from cron),
+# so production needs a cache every process shares: set REDIS_URL (needs the
+# redis package). Without it the per-process memory cache is used, which only
+# suits the development server and tests; `manage.py check --deploy` reports
+# it as an error when DEBUG is off.
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
 # Email settings for OTP verification
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'  # Changed from console to smtp
 EMAIL_HOST = os.getenv('EMAIL_HOST', 'smtp.gmail.com')
@@ -0,0 +1,288 @@
+import logging
+import time as timer
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Avg, Count, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import PlanProgress, PlanSession, WellnessPlan
+
+
+logger = logging.getLogger(__name__)
+
+ENGINE_VERSION = 'adapt-1'
+
+DIFFICULTY_ORDER = [name for name, _ in WellnessPlan.DIFFICULTY_LEVELS]
+
+# Supported keys of WellnessPlan.adaptation_rules and their defaults
+DEFAULT_RULES = {
+    'enabled': True,
+    # Raise difficulty one level every N completed weeks (0 disables)
+    'raise_difficulty_after_weeks': 4,
+    # ...but only while at least this share of recent sessions was completed
+    'raise_min_completion_rate': 0.8,
+    # Cut session length when average energy over the lookback is below this
+    'low_energy_threshold': 4,
+    # ...or when fewer than this share of recent sessions was completed
+    'min_completion_rate': 0.5,
+    'volume_reduction': 0.8,
+    'min_session_minutes': 15,
+    # Restore length towards the original once energy is this far above the threshold
+    'restore_energy_margin': 2,
+}
+LOOKBACK_DAYS = 14
+
+# Column order of the numeric rule matrix passed to evaluate()
+RULE_COLUMNS = [name for name in DEFAULT_RULES if name != 'enabled']
+
+
+def plan_rules(adaptation_rules):
+    """
+    Numeric rule values for one plan, with defaults for missing or invalid entries
+    """
+    rules = adaptation_rules if isinstance(adaptation_rules, dict) else {}
+    values = []
+    for name in RULE_COLUMNS:
+        try:
+            values.append(float(rules.get(name, DEFAULT_RULES[name])))
+        except (TypeError, ValueError):
+            values.append(float(DEFAULT_RULES[name]))
+    return values
+
+
+def evaluated_on_or_after(factors, now):
+    """
+    Whether the plan was already adapted on ``now``'s date or later, so a
+    repeated run the same night does not apply its rules a second time
+    """
+    state = factors.get('adaptation') if isinstance(factors, dict) else None
+    if not isinstance(state, dict) or not isinstance(state.get('evaluated_at'), str):
+        return False
+    evaluated_at = parse_datetime(state['evaluated_at'])
+    if evaluated_at is None or timezone.is_naive(evaluated_at):
+        return False
+    return evaluated_at.astimezone(now.tzinfo).date() >= now.date()
+
+
+def build_batch(rows, energy, completion):
+    """
+    Column arrays for one chunk of plan rows.
+
+    rows: (id, difficulty_level, sessions_per_week, estimated_time_per_session,
+    completed_sessions, adaptation_rules, personalization_factors) tuples of
+    enabled plans. energy / completion: {plan_id: value} from the recent window.
+    """
+    count = len(rows)
+    batch = {
+        'ids': np.fromiter((row[0] for row in rows), dtype=np.int64, count=count),
+        'difficulty': np.fromiter((DIFFICULTY_ORDER.index(row[1]) if row[1] in DIFFICULTY_ORDER else 0 for row in rows), dtype=np.int8, count=count),
+        'sessions_per_week': np.fromiter((row[2] for row in rows), dtype=np.int32, count=count),
+        'minutes': np.fromiter((row[3] for row in rows), dtype=np.int32, count=count),
+        'completed_sessions': np.fromiter((row[4] for row in rows), dtype=np.int32, count=count),
+        'rules': np.array([plan_rules(row[5]) for row in rows], dtype=np.float64).reshape(count, len(RULE_COLUMNS)),
+        'last_raise': np.zeros(count, dtype=np.int32),
+        'base_minutes': np.zeros(count, dtype=np.int32),
+        'energy': np.fromiter((energy.get(row[0], np.nan) for row in rows), dtype=np.float64, count=count),
+        'completion': np.fromiter((completion.get(row[0], np.nan) for row in rows), dtype=np.float64, count=count),
+    }
+    for index, row in enumerate(rows):
+        factors = row[6] if isinstance(row[6], dict) else {}
+        state = factors.get('adaptation') if isinstance(factors.get('adaptation'), dict) else {}
+        batch['last_raise'][index] = int(state.get('raised_at_week', 0) or 0)
+        batch['base_minutes'][index] = int(state.get('base_minutes', row[3]) or row[3])
+    return batch
+
+
+def evaluate(batch):
+    """
+    Apply the adaptation rules to a whole chunk at once.
+
+    Returns (difficulty, minutes, last_raise) arrays; rows where they differ
+    from the inputs are the plans to update.
+    """
+    rules = {name: batch['rules'][:, index] for index, name in enumerate(RULE_COLUMNS)}
+    difficulty, minutes = batch['difficulty'], batch['minutes']
+    energy, completion = batch['energy'], batch['completion']
+
+    completed_weeks = batch['completed_sessions'] // np.maximum(batch['sessions_per_week'], 1)
+    # NaN (no recent data) compares False, so missing data never triggers a rule
+    low_energy = energy < rules['low_energy_threshold']
+    low_completion = completion < rules['min_completion_rate']
+    high_energy = energy >= rules['low_energy_threshold'] + rules['restore_energy_margin']
+
+    raise_after = rules['raise_difficulty_after_weeks']
+    raise_difficulty = (
+        (raise_after > 0)
+        & (completed_weeks - batch['last_raise'] >= raise_after)
+        & ~(completion < rules['raise_min_completion_rate'])
+        & ~low_energy
+        & (difficulty < len(DIFFICULTY_ORDER) - 1)
+    )
+
+    floor = rules['min_session_minutes']
+    reduce = (low_energy | low_completion) & (minutes > floor)
+    reduced = np.maximum(floor, np.round(minutes * rules['volume_reduction']))
+    restore = ~reduce & high_energy & (minutes < batch['base_minutes'])
+    restored = np.minimum(batch['base_minutes'], np.ceil(minutes / rules['volume_reduction']))
+
+    new_minutes = np.where(reduce, reduced, np.where(restore, restored, minutes)).astype(np.int32)
+    new_difficulty = (difficulty + raise_difficulty).astype(np.int8)
+    new_last_raise = np.where(raise_difficulty, completed_weeks, batch['last_raise']).astype(np.int32)
+    return new_difficulty, new_minutes, new_last_raise
+
+
+def evaluate_rows(rows, energy, completion):
+    """
+    Worker entry point: build the chunk's arrays and evaluate them (no database access)
+    """
+    batch = build_batch(rows, energy, completion)
+    difficulty, minutes, last_raise = evaluate(batch)
+    changed = np.nonzero(
+        (difficulty != batch['difficulty']) | (minutes != batch['minutes']) | (last_raise != batch['last_raise'])
+    )[0]
+    return [
+        (
+            int(batch['ids'][index]),
+            DIFFICULTY_ORDER[difficulty[index]],
+            int(minutes[index]),
+            int(last_raise[index]),
+            int(batch['base_minutes'][index]),
+        )
+        for index in changed
+    ]
+
+
+class PlanAdaptationService:
+    """
+    Service class for the nightly adaptive-plan run: streams active plans in
+    keyset chunks, evaluates their adaptation rules vectorized per chunk
+    (optionally in a process pool) and writes changes back in bulk
+    """
+
+    CHUNK_SIZE = 5000
+
+    @staticmethod
+    def load_chunk(after_id, chunk_size):
+        return list(
+            WellnessPlan.objects.filter(status='active', pk__gt=after_id).order_by('pk').values_list(
+                'id', 'difficulty_level', 'sessions_per_week', 'estimated_time_per_session',
+                'completed_sessions', 'adaptation_rules', 'personalization_factors',
+            )[:chunk_size]
+        )
+
+    @staticmethod
+    def recent_stats(plan_ids, now):
+        """
+        Average energy and session completion rate per plan over the lookback window (two grouped queries)
+        """
+        since = now - timedelta(days=LOOKBACK_DAYS)
+        energy = dict(
+            PlanProgress.objects.filter(
+                plan_id__in=plan_ids, date__gte=since.date(), energy_level__isnull=False,
+            ).values('plan_id').annotate(energy=Avg('energy_level')).order_by().values_list('plan_id', 'energy')
+        )
+        completion = {}
+        for plan_id, due, done in PlanSession.objects.filter(
+            plan_id__in=plan_ids, scheduled_date__gte=since, scheduled_date__lt=now,
+        ).exclude(status='cancelled').values('plan_id').annotate(
+            due=Count('id'), done=Count('id', filter=Q(status='completed')),
+        ).order_by().values_list('plan_id', 'due', 'done'):
+            completion[plan_id] = done / due
+        return energy, completion
+
+    @classmethod
+    def prepare(cls, rows, now):
+        rows = [
+            row for row in rows
+            if (not isinstance(row[5], dict) or row[5].get('enabled', DEFAULT_RULES['enabled']))
+            and not evaluated_on_or_after(row[6], now)
+        ]
+        energy, completion = cls.recent_stats([row[0] for row in rows], now)
+        return rows, energy, completion
+
+    @staticmethod
+    def apply(changes, factors_by_id, now):
+        """
+        Write one chunk's decisions: a bulk_update of the plans, and one
+        UPDATE per distinct new session length for their future sessions
+        """
+        if not changes:
+            return
+        plans = []
+        by_minutes = defaultdict(list)
+        for plan_id, difficulty, minutes, raised_at_week, base_minutes in changes:
+            factors = factors_by_id.get(plan_id)
+            factors = dict(factors) if isinstance(factors, dict) else {}
+            factors['adaptation'] = {
+                'version': ENGINE_VERSION,
+                'evaluated_at': now.isoformat(),
+                'raised_at_week': raised_at_week,
+                'base_minutes': base_minutes,
+            }
+            plans.append(WellnessPlan(
+                pk=plan_id, difficulty_level=difficulty, estimated_time_per_session=minutes,
+                personalization_factors=factors, updated_at=now,
+            ))
+            by_minutes[minutes].append(plan_id)
+
+        with transaction.atomic():
+            WellnessPlan.objects.bulk_update(
+                plans, ['difficulty_level', 'estimated_time_per_session', 'personalization_factors', 'updated_at'],
+            )
+            for minutes, plan_ids in by_minutes.items():
+                PlanSession.objects.filter(
+                    plan_id__in=plan_ids, status='scheduled', scheduled_date__gte=now,
+                ).exclude(duration_minutes=minutes).update(duration_minutes=minutes, updated_at=now)
+
+    @classmethod
+    def run(cls, chunk_size=None, workers=0, dry_run=False, now=None):
+        """
+        Evaluate every active plan. With workers > 1 rule evaluation runs in
+        a process pool while the next chunk is read from the database.
+        """
+        chunk_size = chunk_size or cls.CHUNK_SIZE
+        now = now or timezone.now()
+        started = timer.perf_counter()
+        stats = {'plans': 0, 'changed': 0}
+
+        def handle(changes, factors_by_id):
+            stats['changed'] += len(changes)
+            if not dry_run:
+                cls.apply(changes, factors_by_id, now)
+
+        executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+        pending = []
+        try:
+            after_id = 0
+            while True:
+                rows = cls.load_chunk(after_id, chunk_size)
+                if not rows:
+                    break
+                after_id = rows[-1][0]
+                stats['plans'] += len(rows)
+                rows, energy, completion = cls.prepare(rows, now)
+                factors_by_id = {row[0]: row[6] for row in rows}
+                if executor is None:
+                    handle(evaluate_rows(rows, energy, completion), factors_by_id)
+                    continue
+                pending.append((executor.submit(evaluate_rows, rows, energy, completion), factors_by_id))
+                # Keep at most one chunk per worker in flight
+                while len(pending) >= workers:
+                    future, factors = pending.pop(0)
+                    handle(future.result(), factors)
+            for future, factors in pending:
+                handle(future.result(), factors)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        elapsed = timer.perf_counter() - started
+        stats['seconds'] = round(elapsed, 3)
+        stats['plans_per_second'] = round(stats['plans'] / elapsed, 1) if elapsed else None
+        logger.info(f"Adaptive plan run: {stats['plans']} plans, {stats['changed']} changed in {elapsed:.1f} s")
+        return stats
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import WellnessPlan, PlanModule, PlanSession, PlanProgress
+from .models import WellnessPlan, PlanModule, PlanSession, PlanProgress, PlanTemplate, PlanTemplateModule
 
 
 @admin.register(WellnessPlan)
@@ -59,3 +59,18 @@ class PlanProgressAdmin(admin.ModelAdmin):
     search_fields = ['plan__title', 'plan__user__email']
     raw_id_fields = ['plan']
     ordering = ['-date']
+
+
+class PlanTemplateModuleInline(admin.TabularInline):
+    model = PlanTemplateModule
+    extra = 0
+    fields = ['order', 'title', 'module_type', 'is_mandatory', 'difficulty_multiplier']
+
+
+@admin.register(PlanTemplate)
+class PlanTemplateAdmin(admin.ModelAdmin):
+    list_display = ['title', 'specialist', 'plan_type', 'difficulty_level', 'duration_weeks', 'is_public']
+    list_filter = ['plan_type', 'difficulty_level', 'is_public']
+    search_fields = ['title', 'description']
+    raw_id_fields = ['specialist']
+    inlines = [PlanTemplateModuleInline]
@@ -0,0 +1,128 @@
+import logging
+
+import numpy as np
+
+from .models import PlanProgress
+
+
+logger = logging.getLogger(__name__)
+
+SERIES_METRICS = [
+    'weight', 'body_fat_percentage', 'muscle_mass', 'energy_level', 'sleep_quality', 'stress_level', 'mood_rating',
+]
+BUCKETS = ['week', 'month']
+# Weekly buckets are used until they would exceed this; 'auto' then falls back to months
+MAX_WEEKLY_BUCKETS = 156
+DEFAULT_WINDOW = 4
+
+
+def load_series(plan_id, metrics, start_date=None, end_date=None):
+    """
+    Columnar (dates, {metric: values}) for one plan; missing values are NaN
+    """
+    rows = PlanProgress.objects.filter(plan_id=plan_id)
+    if start_date:
+        rows = rows.filter(date__gte=start_date)
+    if end_date:
+        rows = rows.filter(date__lte=end_date)
+    rows = list(rows.order_by('date').values_list('date', *metrics))
+
+    dates = np.array([row[0] for row in rows], dtype='datetime64[D]')
+    columns = {
+        metric: np.array([np.nan if row[index] is None else row[index] for row in rows], dtype=np.float64)
+        for index, metric in enumerate(metrics, start=1)
+    }
+    return dates, columns
+
+
+def bucket_starts(dates, bucket):
+    """
+    Start date of the bucket each (sorted) date falls in
+    """
+    if bucket == 'month':
+        return dates.astype('datetime64[M]').astype('datetime64[D]')
+    # 1970-01-01 was a Thursday; shift so buckets start on Mondays
+    days = dates.astype(np.int64)
+    return (days - (days + 3) % 7).astype('datetime64[D]')
+
+
+def downsample(dates, values, bucket):
+    """
+    Per-bucket (starts, mean, min, max, count) of a sorted series, ignoring NaN
+    """
+    starts = bucket_starts(dates, bucket)
+    if not len(starts):
+        empty = np.zeros(0)
+        return starts, empty, empty, empty, np.zeros(0, dtype=np.int64)
+    keys, offsets = np.unique(starts, return_index=True)
+
+    present = ~np.isnan(values)
+    counts = np.add.reduceat(present.astype(np.int64), offsets)
+    sums = np.add.reduceat(np.where(present, values, 0.0), offsets)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = np.where(counts > 0, sums / counts, np.nan)
+    # fmin/fmax skip NaN unless a whole bucket is missing
+    minimums = np.fmin.reduceat(values, offsets)
+    maximums = np.fmax.reduceat(values, offsets)
+    return keys, means, minimums, maximums, counts
+
+
+def moving_average(means, window):
+    """
+    Trailing mean over up to ``window`` buckets, skipping empty buckets
+    """
+    if not len(means):
+        return means
+    present = ~np.isnan(means)
+    kernel = np.ones(window)
+    sums = np.convolve(np.where(present, means, 0.0), kernel)[:len(means)]
+    counts = np.convolve(present.astype(np.float64), kernel)[:len(means)]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts > 0, sums / counts, np.nan)
+
+
+def trend_per_week(dates, values):
+    """
+    Least-squares slope of the raw series, in units per week (None if undefined)
+    """
+    present = ~np.isnan(values)
+    if present.sum() < 2:
+        return None
+    days = dates[present].astype(np.int64).astype(np.float64)
+    points = values[present]
+    centered = days - days.mean()
+    denominator = (centered * centered).sum()
+    if not denominator:
+        return None
+    return float((centered * (points - points.mean())).sum() / denominator * 7)
+
+
+def _json_list(array, digits=2):
+    return [None if np.isnan(value) else round(float(value), digits) for value in array]
+
+
+def progress_series(plan_id, metrics=None, bucket='auto', window=DEFAULT_WINDOW, start_date=None, end_date=None):
+    """
+    Downsampled progress series for charts. Payload size depends on the
+    number of buckets, not on the number of progress entries.
+    """
+    metrics = metrics or SERIES_METRICS
+    dates, columns = load_series(plan_id, metrics, start_date, end_date)
+
+    if bucket == 'auto':
+        span_weeks = int((dates[-1] - dates[0]).astype(np.int64)) // 7 + 1 if len(dates) else 0
+        bucket = 'week' if span_weeks <= MAX_WEEKLY_BUCKETS else 'month'
+
+    result = {'bucket': bucket, 'entries': len(dates), 'buckets': [], 'metrics': {}}
+    for metric in metrics:
+        keys, means, minimums, maximums, counts = downsample(dates, columns[metric], bucket)
+        result['buckets'] = [str(key) for key in keys]
+        result['metrics'][metric] = {
+            'mean': _json_list(means),
+            'min': _json_list(minimums),
+            'max': _json_list(maximums),
+            'count': counts.tolist(),
+            'moving_average': _json_list(moving_average(means, window)),
+            'trend_per_week': trend_per_week(dates, columns[metric]),
+        }
+    return result
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class WellnessPlansConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'wellness_plans'
+
+    def ready(self):
+        from . import signals  # noqa: F401
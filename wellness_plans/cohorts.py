@@ -0,0 +1,324 @@
+import bisect
+import logging
+import threading
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Avg, Count, Q
+from django.utils import timezone
+
+from .models import (
+    CohortAggregate, PlanCohortMember, PlanCohortWeek, PlanProgress, ProjectionWatermark, WellnessPlan,
+)
+
+
+logger = logging.getLogger(__name__)
+
+WATERMARK_NAME = 'plan_cohorts'
+WATERMARK_SLACK_SECONDS = 300
+# ProjectionWatermark rows holding the leaderboard version: any refresh bumps
+# the first, refreshes that removed plans also bump the second
+VERSION_NAME = 'plan_leaderboard'
+EPOCH_NAME = 'plan_leaderboard_epoch'
+# Weeks of weight change tracked per plan
+COHORT_WEEKS = 12
+# Plans need this many sessions to rank, so 1/1 completed does not top the board
+MIN_RANKED_SESSIONS = 4
+RANKED_STATUSES = ['active', 'completed']
+LEADERBOARD_SIZE = 50
+
+
+def rank_key(completion_rate, completed_sessions, plan_id):
+    """Sort key, best first"""
+    return (-completion_rate, -completed_sessions, plan_id)
+
+
+class TopN:
+    """
+    The best ``capacity`` members of one plan type, kept as an exact prefix
+    of the full ranking while individual members change. ``exhausted``
+    means every ranked member is held; otherwise, once fewer than the
+    leaderboard size remain, the board has to be reloaded.
+    """
+
+    def __init__(self, capacity, rows=(), exhausted=False):
+        self.capacity = capacity
+        self.keys = {}
+        self.ranking = []
+        self.exhausted = exhausted
+        for plan_id, completion_rate, completed_sessions, user_id in rows:
+            self.keys[plan_id] = (rank_key(completion_rate, completed_sessions, plan_id), user_id)
+        self.ranking = sorted(key for key, _ in self.keys.values())
+
+    def remove(self, plan_id):
+        entry = self.keys.pop(plan_id, None)
+        if entry is not None:
+            del self.ranking[bisect.bisect_left(self.ranking, entry[0])]
+
+    def update(self, plan_id, completion_rate, completed_sessions, user_id, ranked):
+        self.remove(plan_id)
+        if not ranked:
+            return
+        key = rank_key(completion_rate, completed_sessions, plan_id)
+        if self.ranking and key > self.ranking[-1]:
+            # Below the weakest held member, unseen members could rank in between
+            if not self.exhausted:
+                return
+            if len(self.ranking) >= self.capacity:
+                self.exhausted = False
+                return
+        elif not self.ranking and not self.exhausted:
+            return
+        self.keys[plan_id] = (key, user_id)
+        bisect.insort(self.ranking, key)
+        if len(self.ranking) > self.capacity:
+            dropped = self.ranking.pop()
+            del self.keys[dropped[2]]
+            self.exhausted = False
+
+    def needs_reload(self, size):
+        return not self.exhausted and len(self.ranking) < size
+
+    def top(self, limit):
+        return [
+            {
+                'rank': index + 1,
+                'plan_id': key[2],
+                'user_id': self.keys[key[2]][1],
+                'completion_rate': round(-key[0], 4),
+                'completed_sessions': -key[1],
+            }
+            for index, key in enumerate(self.ranking[:limit])
+        ]
+
+
+class PlanLeaderboard:
+    """
+    In-process completion leaderboards per plan type, read from
+    PlanCohortMember. Refreshes bump a version held in ProjectionWatermark,
+    so bumps from the cron process reach every worker; readers compare it
+    with one query, then apply members computed since their watermark, or
+    reload fully after plans were deleted.
+    """
+
+    def __init__(self, size=LEADERBOARD_SIZE):
+        self.size = size
+        self.lock = threading.Lock()
+        self.version = None
+        self.watermark = None
+        self.boards = {}
+
+    @staticmethod
+    def _ranked():
+        return PlanCohortMember.objects.filter(status__in=RANKED_STATUSES, total_sessions__gte=MIN_RANKED_SESSIONS)
+
+    def _load(self, plan_type):
+        capacity = self.size * 2
+        rows = list(self._ranked().filter(plan_type=plan_type).order_by(
+            '-completion_rate', '-completed_sessions', 'plan',
+        ).values_list('plan_id', 'completion_rate', 'completed_sessions', 'plan__user_id')[:capacity])
+        self.boards[plan_type] = TopN(capacity, rows, exhausted=len(rows) < capacity)
+
+    def _apply(self, full):
+        if full:
+            self.boards = {}
+            self.watermark = None
+            for plan_type, _ in WellnessPlan.PLAN_TYPES:
+                self._load(plan_type)
+            self.watermark = PlanCohortMember.objects.order_by('-computed_at').values_list('computed_at', flat=True).first()
+            return
+
+        rows = PlanCohortMember.objects.all()
+        if self.watermark is not None:
+            rows = rows.filter(computed_at__gte=self.watermark - timedelta(seconds=WATERMARK_SLACK_SECONDS))
+        reload = set()
+        for plan_id, plan_type, status, total, completed, rate, user_id, computed_at in rows.values_list(
+            'plan_id', 'plan_type', 'status', 'total_sessions', 'completed_sessions', 'completion_rate',
+            'plan__user_id', 'computed_at',
+        ).iterator(chunk_size=5000):
+            ranked = status in RANKED_STATUSES and total >= MIN_RANKED_SESSIONS
+            # A plan may have moved to another type; only one board may hold it
+            for board_type, board in self.boards.items():
+                if board_type != plan_type:
+                    board.remove(plan_id)
+            if plan_type in self.boards:
+                self.boards[plan_type].update(plan_id, rate, completed, user_id, ranked)
+            if self.watermark is None or computed_at > self.watermark:
+                self.watermark = computed_at
+        for plan_type, board in self.boards.items():
+            if board.needs_reload(self.size):
+                reload.add(plan_type)
+        for plan_type in reload:
+            self._load(plan_type)
+
+    def ensure_fresh(self):
+        values = dict(ProjectionWatermark.objects.filter(name__in=[VERSION_NAME, EPOCH_NAME]).values_list('name', 'value'))
+        state = (values.get(VERSION_NAME), values.get(EPOCH_NAME))
+        if self.version == state:
+            return
+        with self.lock:
+            if self.version == state:
+                return
+            self._apply(full=self.version is None or self.version[1] != state[1])
+            self.version = state
+
+    def top(self, plan_type, limit=None):
+        self.ensure_fresh()
+        with self.lock:
+            board = self.boards.get(plan_type)
+            return board.top(min(limit or self.size, self.size)) if board else []
+
+
+leaderboard = PlanLeaderboard()
+
+
+class CohortAnalyticsService:
+    """
+    Service class to maintain the cohort projections (PlanCohortMember,
+    PlanCohortWeek, CohortAggregate) from plans and progress entries
+    changed since the last refresh
+    """
+
+    @staticmethod
+    def bump_version(removed=False):
+        now = timezone.now()
+        for name in (VERSION_NAME, EPOCH_NAME) if removed else (VERSION_NAME,):
+            ProjectionWatermark.objects.update_or_create(name=name, defaults={'value': now})
+
+    @staticmethod
+    def weekly_weight_change(rows):
+        """
+        {week: change} from (week_number, weight) rows in date order: the last
+        weigh-in of each week against the plan's first weigh-in
+        """
+        if not rows:
+            return None, {}
+        baseline = rows[0][1]
+        latest = {}
+        for week, weight in rows:
+            if 1 <= week <= COHORT_WEEKS:
+                latest[week] = weight
+        return baseline, {week: round(weight - baseline, 3) for week, weight in latest.items()}
+
+    @classmethod
+    def refresh_plans(cls, plan_ids, now):
+        """
+        Recompute the projections of the given plans. Returns the cohorts
+        ((plan_type, difficulty_level) pairs) whose aggregates are affected.
+        """
+        plan_ids = list(plan_ids)
+        cohorts = set(PlanCohortMember.objects.filter(plan_id__in=plan_ids).values_list('plan_type', 'difficulty_level'))
+        plans = list(WellnessPlan.objects.filter(pk__in=plan_ids).values_list(
+            'pk', 'plan_type', 'difficulty_level', 'status', 'total_sessions', 'completed_sessions',
+        ))
+        weights = {}
+        for plan_id, week, weight in PlanProgress.objects.filter(
+            plan_id__in=plan_ids, weight__isnull=False,
+        ).order_by('plan_id', 'date').values_list('plan_id', 'week_number', 'weight'):
+            weights.setdefault(plan_id, []).append((week, weight))
+
+        members, weeks = [], []
+        for plan_id, plan_type, difficulty, status, total, completed in plans:
+            baseline, changes = cls.weekly_weight_change(weights.get(plan_id, []))
+            members.append(PlanCohortMember(
+                plan_id=plan_id, plan_type=plan_type, difficulty_level=difficulty, status=status,
+                total_sessions=total, completed_sessions=completed,
+                completion_rate=completed / total if total else 0.0, baseline_weight=baseline, computed_at=now,
+            ))
+            weeks.extend(
+                PlanCohortWeek(plan_id=plan_id, plan_type=plan_type, difficulty_level=difficulty, week=week, weight_change=change)
+                for week, change in changes.items()
+            )
+            cohorts.add((plan_type, difficulty))
+
+        with transaction.atomic():
+            PlanCohortMember.objects.bulk_create(
+                members,
+                update_conflicts=True,
+                unique_fields=['plan'],
+                update_fields=[
+                    'plan_type', 'difficulty_level', 'status', 'total_sessions', 'completed_sessions',
+                    'completion_rate', 'baseline_weight', 'computed_at',
+                ],
+            )
+            PlanCohortWeek.objects.filter(plan_id__in=plan_ids).delete()
+            PlanCohortWeek.objects.bulk_create(weeks, batch_size=1000)
+        return cohorts
+
+    @staticmethod
+    def refresh_cohorts(cohorts):
+        """
+        Recompute the weekly aggregates of the given cohorts with one grouped query
+        """
+        cohorts = list(cohorts)
+        if not cohorts:
+            return 0
+        condition = Q()
+        for plan_type, difficulty in cohorts:
+            condition |= Q(plan_type=plan_type, difficulty_level=difficulty)
+        aggregates = [
+            CohortAggregate(
+                plan_type=row['plan_type'], difficulty_level=row['difficulty_level'], week=row['week'],
+                plan_count=row['plan_count'], average_weight_change=row['average'],
+            )
+            for row in PlanCohortWeek.objects.filter(condition).values('plan_type', 'difficulty_level', 'week').annotate(
+                plan_count=Count('plan_id'), average=Avg('weight_change'),
+            ).order_by()
+        ]
+        with transaction.atomic():
+            CohortAggregate.objects.filter(condition).delete()
+            CohortAggregate.objects.bulk_create(aggregates)
+        return len(aggregates)
+
+    @classmethod
+    def refresh_cohorts_on_commit(cls, cohorts):
+        cohorts = list(cohorts)
+        transaction.on_commit(lambda: cls.refresh_cohorts(cohorts))
+
+    @classmethod
+    def refresh(cls, full=False, batch_size=1000, now=None):
+        """
+        Reproject plans whose own row or progress entries changed since the
+        watermark (all plans with ``full``), then their cohorts' aggregates
+        """
+        now = now or timezone.now()
+        watermark = ProjectionWatermark.objects.filter(name=WATERMARK_NAME).first()
+        plans = WellnessPlan.objects.all()
+        progress = PlanProgress.objects.all()
+        if watermark and not full:
+            since = watermark.value - timedelta(seconds=WATERMARK_SLACK_SECONDS)
+            plans = plans.filter(updated_at__gte=since)
+            progress = progress.filter(updated_at__gte=since)
+        plan_ids = sorted(
+            set(plans.values_list('pk', flat=True)) | set(progress.values_list('plan_id', flat=True).distinct())
+        )
+
+        cohorts = set()
+        for start in range(0, len(plan_ids), batch_size):
+            cohorts |= cls.refresh_plans(plan_ids[start:start + batch_size], now)
+        aggregates = cls.refresh_cohorts(cohorts)
+        ProjectionWatermark.objects.update_or_create(name=WATERMARK_NAME, defaults={'value': now})
+        if plan_ids:
+            cls.bump_version(removed=full)
+
+        logger.info(f"Refreshed cohort projections for {len(plan_ids)} plans, {aggregates} cohort weeks")
+        return len(plan_ids)
+
+    @staticmethod
+    def cohort_series(plan_type=None, difficulty_level=None, weeks=COHORT_WEEKS):
+        """
+        {'<plan_type>/<difficulty_level>': [{week, plan_count, average_weight_change}, ...]} from the aggregates
+        """
+        aggregates = CohortAggregate.objects.filter(week__lte=weeks)
+        if plan_type:
+            aggregates = aggregates.filter(plan_type=plan_type)
+        if difficulty_level:
+            aggregates = aggregates.filter(difficulty_level=difficulty_level)
+        series = {}
+        for row in aggregates.values('plan_type', 'difficulty_level', 'week', 'plan_count', 'average_weight_change'):
+            series.setdefault(f"{row['plan_type']}/{row['difficulty_level']}", []).append({
+                'week': row['week'],
+                'plan_count': row['plan_count'],
+                'average_weight_change': round(row['average_weight_change'], 2),
+            })
+        return series
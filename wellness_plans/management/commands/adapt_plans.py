@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from wellness_plans.adaptation import PlanAdaptationService
+
+
+class Command(BaseCommand):
+    help = 'Nightly run: evaluate adaptation rules for all active plans and write back changes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=PlanAdaptationService.CHUNK_SIZE)
+        parser.add_argument('--workers', type=int, default=0, help='Process pool size for rule evaluation')
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        stats = PlanAdaptationService.run(
+            chunk_size=options['chunk_size'], workers=options['workers'], dry_run=options['dry_run'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"{stats['plans']} plans evaluated, {stats['changed']} adapted in {stats['seconds']:.2f} s "
+            f"({stats['plans_per_second']} plans/s)"
+        ))
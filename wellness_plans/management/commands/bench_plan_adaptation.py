@@ -0,0 +1,59 @@
+import time as timer
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from wellness_plans.adaptation import DIFFICULTY_ORDER, evaluate_rows
+
+
+def synthetic_chunk(start, size, seed):
+    """
+    Plan rows and recent stats shaped like PlanAdaptationService.prepare() output
+    """
+    random = np.random.default_rng(seed)
+    rows = []
+    energy = {}
+    completion = {}
+    for offset in range(size):
+        plan_id = start + offset
+        rules = {} if offset % 4 else {'raise_difficulty_after_weeks': 2, 'low_energy_threshold': 5}
+        factors = {} if offset % 3 else {'adaptation': {'raised_at_week': 2, 'base_minutes': 60}}
+        rows.append((
+            plan_id, DIFFICULTY_ORDER[offset % len(DIFFICULTY_ORDER)], int(random.integers(2, 6)),
+            int(random.integers(20, 61)), int(random.integers(0, 60)), rules, factors,
+        ))
+        if offset % 5:
+            energy[plan_id] = float(random.uniform(1, 10))
+        if offset % 7:
+            completion[plan_id] = float(random.uniform(0, 1))
+    return rows, energy, completion
+
+
+class Command(BaseCommand):
+    help = 'Benchmark adaptation rule evaluation on synthetic plans (no database access)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--plans', type=int, default=1000000)
+        parser.add_argument('--chunk-size', type=int, default=5000)
+        parser.add_argument('--workers', type=int, default=0)
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        chunks = [
+            synthetic_chunk(start, min(chunk_size, options['plans'] - start), start)
+            for start in range(0, options['plans'], chunk_size)
+        ]
+
+        started = timer.perf_counter()
+        if options['workers'] > 1:
+            with ProcessPoolExecutor(max_workers=options['workers']) as executor:
+                changed = sum(len(changes) for changes in executor.map(evaluate_rows, *zip(*chunks)))
+        else:
+            changed = sum(len(evaluate_rows(*chunk)) for chunk in chunks)
+        elapsed = timer.perf_counter() - started
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{options['plans']} plans evaluated in {elapsed:.2f} s ({options['plans'] / elapsed:.0f} plans/s), "
+            f"{changed} would change"
+        ))
@@ -0,0 +1,62 @@
+import time as timer
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from authentication.models import CustomUser
+from wellness_plans.models import PlanModule, PlanSession, WellnessPlan
+from wellness_plans.services import PlanScheduleService
+
+
+class Command(BaseCommand):
+    help = 'Benchmark bulk session generation for new plans (rolled back afterwards)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--plans', type=int, default=10000)
+        parser.add_argument('--weeks', type=int, default=12)
+        parser.add_argument('--sessions-per-week', type=int, default=3)
+        parser.add_argument('--modules', type=int, default=3)
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user = CustomUser.objects.create_user(
+                username='bench-plan-generation', email='bench-plan-generation@example.com', password=None,
+            )
+            started = timer.perf_counter()
+            plans = WellnessPlan.objects.bulk_create([
+                WellnessPlan(
+                    user=user, title=f'Plan {index}', description='Benchmark', plan_type='fitness',
+                    difficulty_level='beginner', status='active', duration_weeks=options['weeks'],
+                    sessions_per_week=options['sessions_per_week'], estimated_time_per_session=45,
+                    success_criteria='', start_date=date.today(), end_date=date.today(),
+                )
+                for index in range(options['plans'])
+            ], batch_size=options['batch_size'])
+            if not all(plan.pk for plan in plans):
+                # Backends without RETURNING from bulk inserts
+                plans = list(WellnessPlan.objects.filter(user=user))
+            PlanModule.objects.bulk_create([
+                PlanModule(
+                    plan=plan, title=f'Module {order}', description='', module_type='fitness', order=order,
+                    is_mandatory=order != options['modules'], instructions='',
+                )
+                for plan in plans
+                for order in range(1, options['modules'] + 1)
+            ], batch_size=options['batch_size'])
+            setup = timer.perf_counter() - started
+
+            started = timer.perf_counter()
+            created = 0
+            for start in range(0, len(plans), options['batch_size']):
+                created += PlanScheduleService.generate_many(plans[start:start + options['batch_size']])
+            elapsed = timer.perf_counter() - started
+
+            assert PlanSession.objects.filter(plan__user=user).count() == created
+            transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{options['plans']} plans: setup {setup:.2f} s, {created} sessions generated in {elapsed:.2f} s "
+            f"({elapsed / max(options['plans'], 1) * 1000:.3f} ms per plan)"
+        ))
@@ -0,0 +1,56 @@
+import time as timer
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from authentication.models import CustomUser
+from wellness_plans.models import PlanSession, PlanTemplate, PlanTemplateModule
+from wellness_plans.services import PlanTemplateService
+
+
+class Command(BaseCommand):
+    help = 'Benchmark cloning one plan template for many clients (rolled back afterwards)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=1000)
+        parser.add_argument('--weeks', type=int, default=12)
+        parser.add_argument('--sessions-per-week', type=int, default=3)
+        parser.add_argument('--modules', type=int, default=4)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            users = CustomUser.objects.bulk_create([
+                CustomUser(username=f'bench-clone-{index}', email=f'bench-clone-{index}@example.com')
+                for index in range(options['clients'])
+            ])
+            if not all(user.pk for user in users):
+                # Backends without RETURNING from bulk inserts
+                users = list(CustomUser.objects.filter(username__startswith='bench-clone-'))
+            template = PlanTemplate.objects.create(
+                title='Benchmark', plan_type='fitness', difficulty_level='beginner',
+                duration_weeks=options['weeks'], sessions_per_week=options['sessions_per_week'],
+                estimated_time_per_session=45,
+            )
+            PlanTemplateModule.objects.bulk_create([
+                PlanTemplateModule(
+                    template=template, title=f'Module {order}', module_type='fitness', order=order,
+                    is_mandatory=order != options['modules'],
+                    exercises=[{'name': f'Exercise {index}', 'sets': 3, 'reps': 10} for index in range(8)],
+                )
+                for order in range(1, options['modules'] + 1)
+            ])
+
+            started = timer.perf_counter()
+            with CaptureQueriesContext(connection) as queries:
+                plans = PlanTemplateService.clone(template, users, date.today())
+            elapsed = timer.perf_counter() - started
+
+            sessions = PlanSession.objects.filter(plan__template=template).count()
+            transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(plans)} plans with {sessions} sessions cloned in {elapsed:.2f} s "
+            f"({elapsed / max(len(plans), 1) * 1000:.3f} ms per plan, {len(queries)} queries)"
+        ))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from wellness_plans.metrics import PlanMetricsService, parse_metric_condition
+
+
+class Command(BaseCommand):
+    help = 'Print the query plan of a metrics query, to check which indexes it uses'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--goal', action='append', default=[])
+        parser.add_argument('--achievement', action='append', default=[])
+        parser.add_argument('--metric', action='append', default=[], help='e.g. strength.squat:gt:100')
+        parser.add_argument('--analyze', action='store_true', help='Run the query (EXPLAIN ANALYZE, Postgres)')
+
+    def handle(self, *args, **options):
+        try:
+            metrics = [parse_metric_condition(text) for text in options['metric']]
+        except ValueError as e:
+            raise CommandError(str(e))
+        plans = PlanMetricsService.plans(goals=options['goal'], achievements=options['achievement'], metrics=metrics)
+        explain_options = {'analyze': True} if options['analyze'] else {}
+        self.stdout.write(str(plans.values('pk').query))
+        self.stdout.write(plans.values('pk').explain(**explain_options))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from wellness_plans.metrics import PlanMetricsService
+
+
+class Command(BaseCommand):
+    help = 'Re-extract numeric metric values from all progress entries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        extracted = PlanMetricsService.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Extracted {extracted} metric values'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from wellness_plans.services import PlanProgressService
+
+
+class Command(BaseCommand):
+    help = 'Recompute plan session counters, progress and current week from session rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        reconciled = PlanProgressService.reconcile(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Reconciled progress for {reconciled} plans'))
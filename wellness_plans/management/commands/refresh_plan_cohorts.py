@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from wellness_plans.cohorts import CohortAnalyticsService
+
+
+class Command(BaseCommand):
+    help = 'Refresh cohort aggregates and leaderboard data for plans changed since the last run'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Reproject every plan, ignoring the watermark')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        refreshed = CohortAnalyticsService.refresh(full=options['full'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Refreshed cohort projections for {refreshed} plans'))
@@ -0,0 +1,163 @@
+import logging
+
+from django.db import connection, transaction
+from django.db.models import BooleanField, Exists, F, Func, OuterRef, Q, Value
+
+from .models import PlanMetricValue, PlanProgress, WellnessPlan
+
+
+logger = logging.getLogger(__name__)
+
+# Metric category -> PlanProgress JSON field its numeric keys are extracted from
+METRIC_FIELDS = {
+    'strength': 'strength_metrics',
+    'endurance': 'endurance_metrics',
+    'flexibility': 'flexibility_metrics',
+}
+COMPARISONS = ['gt', 'gte', 'lt', 'lte', 'exact']
+
+
+def normalize_metric(name):
+    """
+    'strength.squat' from 'Strength. Squat', the form metric names are stored in
+    """
+    category, _, key = str(name).partition('.')
+    return f'{category.strip().lower()}.{key.strip().lower()}'[:100]
+
+
+def extract_metrics(progress):
+    """
+    {'<category>.<key>': value} for the numeric top-level entries of a progress entry's metric blobs
+    """
+    values = {}
+    for category, field in METRIC_FIELDS.items():
+        blob = getattr(progress, field)
+        if not isinstance(blob, dict):
+            continue
+        for key, value in blob.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                values[normalize_metric(f'{category}.{key}')] = float(value)
+    return values
+
+
+def parse_metric_condition(text):
+    """
+    ('strength.squat', 'gt', 100.0) from 'strength.squat:gt:100'
+    """
+    try:
+        metric, comparison, value = text.rsplit(':', 2)
+        value = float(value)
+    except ValueError:
+        raise ValueError(f'metric condition must look like strength.squat:gt:100, got {text!r}')
+    if comparison not in COMPARISONS:
+        raise ValueError(f'comparison must be one of: {", ".join(COMPARISONS)}')
+    return metric, comparison, value
+
+
+class JSONHasElement(Func):
+    """
+    SQLite: whether a JSON array column has ``element`` as one of its items
+    """
+    output_field = BooleanField()
+
+    def as_sql(self, compiler, connection, **extra_context):
+        column, column_params = compiler.compile(self.source_expressions[0])
+        element, element_params = compiler.compile(self.source_expressions[1])
+        sql = f'EXISTS (SELECT 1 FROM json_each({column}) WHERE json_each.value = {element})'
+        return sql, (*column_params, *element_params)
+
+
+def json_contains(queryset, field, value):
+    """
+    Filter ``queryset`` to rows whose JSON ``field`` contains ``value`` (a
+    list of elements or a dict of key/values). On Postgres this is @> and
+    uses the jsonb_path_ops GIN indexes.
+    """
+    if connection.features.supports_json_field_contains:
+        return queryset.filter(**{f'{field}__contains': value})
+    # SQLite (tests, local development): key lookups and json_each, unindexed
+    if isinstance(value, dict):
+        return queryset.filter(**{f'{field}__{key}': item for key, item in value.items()})
+    for element in value:
+        queryset = queryset.filter(JSONHasElement(F(field), Value(element)))
+    return queryset
+
+
+class PlanMetricsService:
+    """
+    Service class to keep PlanMetricValue in step with PlanProgress and to
+    query plans by goals, targets, achievements and extracted metric values
+    """
+
+    @staticmethod
+    def refresh(progress_ids):
+        """
+        Re-extract the metric values of the given progress entries. Values
+        are upserted, so refreshes of the same entry from concurrent saves
+        do not collide on (progress, metric); keys no longer present are
+        deleted afterwards.
+        """
+        entries = list(PlanProgress.objects.filter(pk__in=list(progress_ids)).only(
+            'pk', 'plan_id', 'date', *METRIC_FIELDS.values(),
+        ))
+        values = [
+            PlanMetricValue(plan_id=entry.plan_id, progress_id=entry.pk, metric=metric, date=entry.date, value=value)
+            for entry in entries
+            for metric, value in extract_metrics(entry).items()
+        ]
+        with transaction.atomic():
+            PlanMetricValue.objects.bulk_create(
+                values, batch_size=1000, update_conflicts=True,
+                unique_fields=['progress', 'metric'], update_fields=['plan', 'date', 'value'],
+            )
+            current = {(value.progress_id, value.metric) for value in values}
+            stale = [
+                pk for pk, progress_id, metric in PlanMetricValue.objects.filter(
+                    progress_id__in=[entry.pk for entry in entries],
+                ).values_list('pk', 'progress_id', 'metric')
+                if (progress_id, metric) not in current
+            ]
+            PlanMetricValue.objects.filter(pk__in=stale).delete()
+        return len(values)
+
+    @classmethod
+    def refresh_on_commit(cls, progress_ids):
+        progress_ids = list(progress_ids)
+        transaction.on_commit(lambda: cls.refresh(progress_ids))
+
+    @classmethod
+    def rebuild(cls, batch_size=1000):
+        ids = list(PlanProgress.objects.order_by('pk').values_list('pk', flat=True))
+        extracted = 0
+        for start in range(0, len(ids), batch_size):
+            extracted += cls.refresh(ids[start:start + batch_size])
+        logger.info(f"Extracted {extracted} metric values from {len(ids)} progress entries")
+        return extracted
+
+    @staticmethod
+    def plans(queryset=None, goals=(), targets=None, achievements=(), metrics=()):
+        """
+        Plans matching every condition:
+
+        goals: values primary_goals must all contain
+        targets: {key: value} target_metrics must contain
+        achievements: values one progress entry's achievements must contain
+        metrics: (metric, comparison, value) tuples, e.g. ('strength.squat', 'gt', 100),
+            met by at least one recorded value, i.e. compared against the best
+            (or worst) value on record; metric names are case-insensitive
+        """
+        plans = WellnessPlan.objects.all() if queryset is None else queryset
+        if goals:
+            plans = json_contains(plans, 'primary_goals', list(goals))
+        if targets:
+            plans = json_contains(plans, 'target_metrics', targets)
+        if achievements:
+            entries = json_contains(PlanProgress.objects.filter(plan=OuterRef('pk')), 'achievements', list(achievements))
+            plans = plans.filter(Exists(entries))
+        for metric, comparison, value in metrics:
+            if comparison not in COMPARISONS:
+                raise ValueError(f'comparison must be one of: {", ".join(COMPARISONS)}')
+            plans = plans.filter(Exists(PlanMetricValue.objects.filter(
+                Q(**{f'value__{comparison}': value}), plan=OuterRef('pk'), metric=normalize_metric(metric),
+            )))
+        return plans
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-19 02:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wellness_plans', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='wellnessplan',
+            name='completed_sessions',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='wellnessplan',
+            name='skipped_sessions',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='wellnessplan',
+            name='total_sessions',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
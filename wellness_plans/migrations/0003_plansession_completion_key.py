@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 02:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wellness_plans', '0002_plan_session_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='plansession',
+            name='completion_key',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 02:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wellness_plans', '0003_plansession_completion_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='wellnessplan',
+            name='paused_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.8 on 2026-10-19 02:38
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('specialists', '0008_schedule_projections'),
+        ('wellness_plans', '0004_wellnessplan_paused_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlanTemplate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=200)),
+                ('description', models.TextField(blank=True)),
+                ('plan_type', models.CharField(choices=[('comprehensive', 'Comprehensive Wellness'), ('fitness', 'Fitness Focus'), ('nutrition', 'Nutrition Focus'), ('mental_wellness', 'Mental Wellness'), ('longevity', 'Longevity & Anti-aging'), ('recovery', 'Recovery & Rehabilitation'), ('performance', 'Performance Optimization')], max_length=20)),
+                ('difficulty_level', models.CharField(choices=[('beginner', 'Beginner'), ('intermediate', 'Intermediate'), ('advanced', 'Advanced'), ('expert', 'Expert')], max_length=15)),
+                ('duration_weeks', models.PositiveIntegerField()),
+                ('sessions_per_week', models.PositiveIntegerField()),
+                ('estimated_time_per_session', models.PositiveIntegerField(help_text='Minutes per session')),
+                ('primary_goals', models.JSONField(default=list)),
+                ('target_metrics', models.JSONField(default=dict)),
+                ('success_criteria', models.TextField(blank=True)),
+                ('adaptation_rules', models.JSONField(default=dict)),
+                ('is_public', models.BooleanField(default=False, help_text='Visible to all users, not only its author')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('specialist', models.ForeignKey(blank=True, help_text='Author; empty for platform templates', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='plan_templates', to='specialists.specialist')),
+            ],
+            options={
+                'ordering': ['title'],
+            },
+        ),
+        migrations.AddField(
+            model_name='wellnessplan',
+            name='template',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='plans', to='wellness_plans.plantemplate'),
+        ),
+        migrations.CreateModel(
+            name='PlanTemplateModule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=200)),
+                ('description', models.TextField(blank=True)),
+                ('module_type', models.CharField(choices=[('fitness', 'Fitness Training'), ('nutrition', 'Nutrition Plan'), ('mindfulness', 'Mindfulness & Meditation'), ('recovery', 'Recovery & Rest'), ('lifestyle', 'Lifestyle Changes'), ('supplementation', 'Supplementation'), ('monitoring', 'Health Monitoring')], max_length=20)),
+                ('order', models.PositiveIntegerField(default=1)),
+                ('is_mandatory', models.BooleanField(default=True)),
+                ('difficulty_multiplier', models.DecimalField(decimal_places=2, default=1.0, max_digits=3)),
+                ('instructions', models.TextField(blank=True)),
+                ('resources', models.JSONField(default=list)),
+                ('exercises', models.JSONField(default=list)),
+                ('template', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='modules', to='wellness_plans.plantemplate')),
+            ],
+            options={
+                'ordering': ['order'],
+            },
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.8 on 2026-10-19 02:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+JSON_INDEXES = {
+    'plan_goals_gin_idx': ('wellness_plans_wellnessplan', 'primary_goals'),
+    'plan_targets_gin_idx': ('wellness_plans_wellnessplan', 'target_metrics'),
+    'progress_strength_gin_idx': ('wellness_plans_planprogress', 'strength_metrics'),
+    'progress_endurance_gin_idx': ('wellness_plans_planprogress', 'endurance_metrics'),
+    'progress_flexibility_gin_idx': ('wellness_plans_planprogress', 'flexibility_metrics'),
+    'progress_achievements_gin_idx': ('wellness_plans_planprogress', 'achievements'),
+    'progress_challenges_gin_idx': ('wellness_plans_planprogress', 'challenges'),
+}
+
+
+def create_json_indexes(apps, schema_editor):
+    # jsonb_path_ops GIN indexes serve @> containment; other backends have no equivalent
+    if schema_editor.connection.vendor == 'postgresql':
+        for name, (table, column) in JSON_INDEXES.items():
+            schema_editor.execute(f'CREATE INDEX {name} ON {table} USING gin ({column} jsonb_path_ops)')
+
+
+def drop_json_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for name in JSON_INDEXES:
+            schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wellness_plans', '0005_plan_templates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlanMetricValue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metric', models.CharField(help_text='<category>.<key>, e.g. strength.squat', max_length=100)),
+                ('date', models.DateField()),
+                ('value', models.FloatField()),
+                ('plan', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='metric_values', to='wellness_plans.wellnessplan')),
+                ('progress', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='metric_values', to='wellness_plans.planprogress')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['metric', 'value', 'plan'], name='plan_metric_value_idx'), models.Index(fields=['plan', 'metric', 'date'], name='plan_metric_series_idx')],
+                'unique_together': {('progress', 'metric')},
+            },
+        ),
+        migrations.RunPython(create_json_indexes, drop_json_indexes),
+    ]
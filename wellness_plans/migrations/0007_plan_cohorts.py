@@ -0,0 +1,79 @@
+# Generated by Django 5.2.8 on 2026-10-19 02:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wellness_plans', '0006_plan_metric_values'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectionWatermark',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('value', models.DateTimeField()),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='planprogress',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='wellnessplan',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.CreateModel(
+            name='CohortAggregate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('plan_type', models.CharField(max_length=20)),
+                ('difficulty_level', models.CharField(max_length=15)),
+                ('week', models.PositiveIntegerField()),
+                ('plan_count', models.PositiveIntegerField(default=0)),
+                ('average_weight_change', models.FloatField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['plan_type', 'difficulty_level', 'week'],
+                'unique_together': {('plan_type', 'difficulty_level', 'week')},
+            },
+        ),
+        migrations.CreateModel(
+            name='PlanCohortMember',
+            fields=[
+                ('plan', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='cohort_member', serialize=False, to='wellness_plans.wellnessplan')),
+                ('plan_type', models.CharField(max_length=20)),
+                ('difficulty_level', models.CharField(max_length=15)),
+                ('status', models.CharField(max_length=15)),
+                ('total_sessions', models.PositiveIntegerField(default=0)),
+                ('completed_sessions', models.PositiveIntegerField(default=0)),
+                ('completion_rate', models.FloatField(default=0)),
+                ('baseline_weight', models.FloatField(blank=True, null=True)),
+                ('computed_at', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'indexes': [models.Index(models.F('plan_type'), models.OrderBy(models.F('completion_rate'), descending=True), models.OrderBy(models.F('completed_sessions'), descending=True), models.F('plan'), name='plan_cohort_rank_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='PlanCohortWeek',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('plan_type', models.CharField(max_length=20)),
+                ('difficulty_level', models.CharField(max_length=15)),
+                ('week', models.PositiveIntegerField()),
+                ('weight_change', models.FloatField()),
+                ('plan', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cohort_weeks', to='wellness_plans.wellnessplan')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['plan_type', 'difficulty_level', 'week'], name='plan_cohort_week_idx')],
+                'unique_together': {('plan', 'week')},
+            },
+        ),
+    ]
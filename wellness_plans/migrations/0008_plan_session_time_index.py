@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-19 02:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wellness_plans', '0007_plan_cohorts'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='plansession',
+            index=models.Index(fields=['plan', 'scheduled_date'], name='plan_session_time_idx'),
+        ),
+    ]
@@ -61,16 +61,25 @@ class WellnessPlan(models.Model):
     current_week = models.PositiveIntegerField(default=1)
     last_activity_date = models.DateTimeField(blank=True, null=True)
     
+    # Session counters, maintained by PlanProgressService (cancelled sessions are not counted)
+    total_sessions = models.PositiveIntegerField(default=0)
+    completed_sessions = models.PositiveIntegerField(default=0)
+    skipped_sessions = models.PositiveIntegerField(default=0)
+    
     # Dates
     start_date = models.DateField()
     end_date = models.DateField()
+    paused_at = models.DateTimeField(blank=True, null=True)
+    template = models.ForeignKey('PlanTemplate', on_delete=models.SET_NULL, blank=True, null=True, related_name='plans')
     created_at = models.DateTimeField(default=django_timezone.now)
-    updated_at = models.DateTimeField(auto_now=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     
     def __str__(self):
         return f"{self.title} - {self.user.get_full_name()}"
     
     def get_progress_percentage(self):
+        if self.total_sessions:
+            return float(self.progress_percentage)
         return min(100, (self.current_week / self.duration_weeks) * 100)
 
 
@@ -145,6 +154,8 @@ class PlanSession(models.Model):
     completed_at = models.DateTimeField(blank=True, null=True)
     completion_notes = models.TextField(blank=True)
     user_rating = models.IntegerField(choices=[(i, str(i)) for i in range(1, 6)], blank=True, null=True)
+    # Client idempotency key of the completion, so offline sync replays are no-ops
+    completion_key = models.CharField(max_length=64, blank=True)
     
     created_at = models.DateTimeField(default=django_timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
@@ -152,6 +163,10 @@ class PlanSession(models.Model):
     class Meta:
         ordering = ['week_number', 'session_number']
         unique_together = ['plan', 'week_number', 'session_number']
+        indexes = [
+            # Range scans of a plan's sessions by time, e.g. for calendar feeds
+            models.Index(fields=['plan', 'scheduled_date'], name='plan_session_time_idx'),
+        ]
     
     def __str__(self):
         return f"{self.plan.title} - Week {self.week_number}, Session {self.session_number}"
@@ -186,7 +201,7 @@ class PlanProgress(models.Model):
     challenges = models.JSONField(default=list, blank=True)
     
     created_at = models.DateTimeField(default=django_timezone.now)
-    updated_at = models.DateTimeField(auto_now=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     
     class Meta:
         unique_together = ['plan', 'date']
@@ -194,3 +209,141 @@ class PlanProgress(models.Model):
     
     def __str__(self):
         return f"{self.plan.title} - Progress {self.date}"
+
+
+class PlanTemplate(models.Model):
+    """Reusable plan structure that specialists clone for their clients"""
+    specialist = models.ForeignKey(
+        Specialist, on_delete=models.CASCADE, blank=True, null=True, related_name='plan_templates',
+        help_text="Author; empty for platform templates",
+    )
+    
+    title = models.CharField(max_length=200)
+    description = models.TextField(blank=True)
+    plan_type = models.CharField(max_length=20, choices=WellnessPlan.PLAN_TYPES)
+    difficulty_level = models.CharField(max_length=15, choices=WellnessPlan.DIFFICULTY_LEVELS)
+    duration_weeks = models.PositiveIntegerField()
+    sessions_per_week = models.PositiveIntegerField()
+    estimated_time_per_session = models.PositiveIntegerField(help_text="Minutes per session")
+    primary_goals = models.JSONField(default=list)
+    target_metrics = models.JSONField(default=dict)
+    success_criteria = models.TextField(blank=True)
+    adaptation_rules = models.JSONField(default=dict)
+    
+    is_public = models.BooleanField(default=False, help_text="Visible to all users, not only its author")
+    created_at = models.DateTimeField(default=django_timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['title']
+    
+    def __str__(self):
+        return self.title
+
+
+class PlanTemplateModule(models.Model):
+    """Module of a plan template, copied into each cloned plan"""
+    template = models.ForeignKey(PlanTemplate, on_delete=models.CASCADE, related_name='modules')
+    
+    title = models.CharField(max_length=200)
+    description = models.TextField(blank=True)
+    module_type = models.CharField(max_length=20, choices=PlanModule.MODULE_TYPES)
+    order = models.PositiveIntegerField(default=1)
+    is_mandatory = models.BooleanField(default=True)
+    difficulty_multiplier = models.DecimalField(max_digits=3, decimal_places=2, default=1.00)
+    instructions = models.TextField(blank=True)
+    resources = models.JSONField(default=list)
+    exercises = models.JSONField(default=list)
+    
+    class Meta:
+        ordering = ['order']
+    
+    def __str__(self):
+        return f"{self.template.title} - {self.title}"
+
+
+class PlanMetricValue(models.Model):
+    """Numeric value extracted from a progress entry's JSON metrics, for indexed filtering and charts"""
+    plan = models.ForeignKey(WellnessPlan, on_delete=models.CASCADE, related_name='metric_values')
+    progress = models.ForeignKey(PlanProgress, on_delete=models.CASCADE, related_name='metric_values')
+    
+    metric = models.CharField(max_length=100, help_text="<category>.<key>, e.g. strength.squat")
+    date = models.DateField()
+    value = models.FloatField()
+    
+    class Meta:
+        unique_together = ['progress', 'metric']
+        indexes = [
+            models.Index(fields=['metric', 'value', 'plan'], name='plan_metric_value_idx'),
+            models.Index(fields=['plan', 'metric', 'date'], name='plan_metric_series_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.metric} = {self.value} ({self.date})"
+
+
+class ProjectionWatermark(models.Model):
+    """Last time an incrementally refreshed projection scanned its sources"""
+    name = models.CharField(max_length=50, primary_key=True)
+    value = models.DateTimeField()
+    
+    def __str__(self):
+        return f"{self.name} @ {self.value}"
+
+
+class PlanCohortMember(models.Model):
+    """Per-plan cohort keys and completion figures, read by leaderboards"""
+    plan = models.OneToOneField(WellnessPlan, on_delete=models.CASCADE, primary_key=True, related_name='cohort_member')
+    
+    plan_type = models.CharField(max_length=20)
+    difficulty_level = models.CharField(max_length=15)
+    status = models.CharField(max_length=15)
+    total_sessions = models.PositiveIntegerField(default=0)
+    completed_sessions = models.PositiveIntegerField(default=0)
+    completion_rate = models.FloatField(default=0)
+    baseline_weight = models.FloatField(blank=True, null=True)
+    computed_at = models.DateTimeField(db_index=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(
+                'plan_type', models.F('completion_rate').desc(), models.F('completed_sessions').desc(), 'plan',
+                name='plan_cohort_rank_idx',
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.plan_id} ({self.plan_type}/{self.difficulty_level})"
+
+
+class PlanCohortWeek(models.Model):
+    """A plan's weight change since its first weigh-in, per plan week"""
+    plan = models.ForeignKey(WellnessPlan, on_delete=models.CASCADE, related_name='cohort_weeks')
+    plan_type = models.CharField(max_length=20)
+    difficulty_level = models.CharField(max_length=15)
+    week = models.PositiveIntegerField()
+    weight_change = models.FloatField()
+    
+    class Meta:
+        unique_together = ['plan', 'week']
+        indexes = [models.Index(fields=['plan_type', 'difficulty_level', 'week'], name='plan_cohort_week_idx')]
+    
+    def __str__(self):
+        return f"{self.plan_id} week {self.week}: {self.weight_change:+.1f}"
+
+
+class CohortAggregate(models.Model):
+    """Average weekly weight change of a plan_type/difficulty_level cohort"""
+    plan_type = models.CharField(max_length=20)
+    difficulty_level = models.CharField(max_length=15)
+    week = models.PositiveIntegerField()
+    plan_count = models.PositiveIntegerField(default=0)
+    average_weight_change = models.FloatField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ['plan_type', 'difficulty_level', 'week']
+        ordering = ['plan_type', 'difficulty_level', 'week']
+    
+    def __str__(self):
+        return f"{self.plan_type}/{self.difficulty_level} week {self.week}"
@@ -0,0 +1,720 @@
+import logging
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, Max, Prefetch, Q, Value
+from django.db.models.functions import Coalesce, Greatest, Least, Round
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from specialists.models import Specialist
+from .models import PlanModule, PlanProgress, PlanSession, PlanTemplate, PlanTemplateModule, WellnessPlan
+
+
+logger = logging.getLogger(__name__)
+
+
+class PlanScheduleService:
+    """
+    Service class to materialize a plan's PlanSession rows from its duration,
+    weekly frequency and modules
+    """
+
+    # Local time of day sessions are scheduled at
+    SESSION_TIME = time(9)
+    BATCH_SIZE = 2000
+
+    @staticmethod
+    def module_rotation(modules, count):
+        """
+        Module for each of ``count`` consecutive sessions.
+
+        Active modules are cycled by ``order``. Mandatory modules appear in
+        every pass; optional ones only in every second pass, unless the plan
+        has no mandatory modules at all.
+        """
+        active = sorted((module for module in modules if module.is_active), key=lambda module: (module.order, module.pk))
+        mandatory = [module for module in active if module.is_mandatory]
+        optional = [module for module in active if not module.is_mandatory]
+        if not active:
+            return []
+        if not mandatory:
+            mandatory, optional = optional, []
+
+        rotation, cycle = [], 0
+        while len(rotation) < count:
+            rotation.extend(mandatory)
+            if cycle % 2 == 1:
+                rotation.extend(optional)
+            cycle += 1
+        return rotation[:count]
+
+    @staticmethod
+    def day_offsets(sessions_per_week):
+        """
+        Day of the week (0-6, relative to the plan start) for each weekly
+        session, spread as evenly as possible
+        """
+        return [index * 7 // sessions_per_week for index in range(sessions_per_week)]
+
+    @classmethod
+    def build_sessions(cls, plan, modules, zone=None):
+        """
+        Unsaved PlanSession objects for the whole plan, in schedule order
+        """
+        per_week = plan.sessions_per_week
+        if not per_week or not plan.duration_weeks:
+            return []
+        zone = zone or timezone.get_current_timezone()
+        offsets = cls.day_offsets(per_week)
+        rotation = cls.module_rotation(modules, plan.duration_weeks * per_week)
+        if not rotation:
+            return []
+
+        sessions = []
+        for index, module in enumerate(rotation):
+            week_number, slot = divmod(index, per_week)
+            day = plan.start_date + timedelta(days=week_number * 7 + offsets[slot])
+            sessions.append(PlanSession(
+                plan_id=plan.pk,
+                module_id=module.pk,
+                title=f'{module.title} - Week {week_number + 1}',
+                description=module.description,
+                week_number=week_number + 1,
+                session_number=slot + 1,
+                scheduled_date=datetime.combine(day, cls.SESSION_TIME, tzinfo=zone),
+                duration_minutes=plan.estimated_time_per_session,
+                instructions=module.instructions,
+                exercises=module.exercises,
+                materials_needed=module.resources,
+            ))
+        return sessions
+
+    @classmethod
+    def generate(cls, plan):
+        """
+        Create every session of a plan that has none yet, in one bulk insert
+        """
+        modules = list(plan.modules.all())
+        sessions = cls.build_sessions(plan, modules)
+        with transaction.atomic():
+            # Lock the plan so concurrent calls cannot both see no sessions and insert them
+            WellnessPlan.objects.select_for_update().filter(pk=plan.pk).exists()
+            if PlanSession.objects.filter(plan=plan).exists():
+                return 0
+            PlanSession.objects.bulk_create(sessions, batch_size=cls.BATCH_SIZE)
+            PlanProgressService.adjust_total(plan, len(sessions))
+        return len(sessions)
+
+    @classmethod
+    def generate_many(cls, plans):
+        """
+        Create sessions for many new plans with one module query and batched inserts
+        """
+        plans = list(
+            WellnessPlan.objects.filter(pk__in=[plan.pk for plan in plans]).prefetch_related(
+                Prefetch('modules', queryset=PlanModule.objects.only(
+                    'id', 'plan_id', 'title', 'description', 'order', 'is_mandatory', 'is_active',
+                    'instructions', 'exercises', 'resources',
+                )),
+            )
+        )
+        zone = timezone.get_current_timezone()
+        sessions = []
+        for plan in plans:
+            sessions.extend(cls.build_sessions(plan, plan.modules.all(), zone=zone))
+        with transaction.atomic():
+            PlanSession.objects.bulk_create(sessions, batch_size=cls.BATCH_SIZE)
+            PlanProgressService.reconcile([plan.pk for plan in plans])
+        return len(sessions)
+
+    @classmethod
+    def regenerate_future(cls, plan, now=None):
+        """
+        Rebuild the plan's sessions that are still scheduled in the future,
+        e.g. after its modules or frequency changed. Past sessions and any
+        session already started, completed, skipped or cancelled are kept.
+        """
+        now = now or timezone.now()
+        modules = list(plan.modules.all())
+        with transaction.atomic():
+            # Lock the plan so concurrent regenerations do not interleave
+            WellnessPlan.objects.select_for_update().filter(pk=plan.pk).exists()
+            removed, _ = PlanSession.objects.filter(plan=plan, status='scheduled', scheduled_date__gte=now).delete()
+            kept = set(PlanSession.objects.filter(plan=plan).values_list('week_number', 'session_number'))
+            # Sessions left beyond the new schedule (e.g. fewer weeks) keep their numbers
+            sessions = [
+                session for session in cls.build_sessions(plan, modules)
+                if session.scheduled_date >= now and (session.week_number, session.session_number) not in kept
+            ]
+            PlanSession.objects.bulk_create(sessions, batch_size=cls.BATCH_SIZE)
+            PlanProgressService.adjust_total(plan, len(sessions) - removed)
+        return len(sessions)
+
+
+class PlanProgressService:
+    """
+    Service class to keep WellnessPlan's session counters, progress
+    percentage and current week in step with session status changes
+    """
+
+    OPEN_STATUSES = ['scheduled', 'in_progress']
+    FINAL_STATUSES = ['completed', 'skipped', 'cancelled']
+
+    @staticmethod
+    def percentage(completed, total):
+        """
+        SQL expression for completed / total as a percentage, capped at 100
+        """
+        return Round(
+            Least(Value(100.0), completed * Value(100.0) / Greatest(total, Value(1))),
+            2,
+            output_field=DecimalField(max_digits=5, decimal_places=2),
+        )
+
+    COUNTER_FIELDS = ['total_sessions', 'completed_sessions', 'skipped_sessions', 'current_week', 'progress_percentage']
+
+    @classmethod
+    def adjust_total(cls, plan, delta):
+        """
+        Add ``delta`` scheduled sessions to the plan, refreshing the instance's
+        counters so a later save() of it does not write stale values back
+        """
+        if not delta:
+            return
+        total = F('total_sessions') + delta
+        WellnessPlan.objects.filter(pk=plan.pk).update(
+            total_sessions=total,
+            progress_percentage=cls.percentage(F('completed_sessions'), total),
+            updated_at=timezone.now(),
+        )
+        plan.refresh_from_db(fields=cls.COUNTER_FIELDS)
+
+    @classmethod
+    def transition(cls, user, session_id, new_status, notes=None, rating=None, now=None):
+        """
+        Move an open session to completed, skipped or cancelled and update the
+        plan's counters, each with a single conditional UPDATE
+        """
+        if new_status not in cls.FINAL_STATUSES:
+            raise ValueError(f'Unsupported session status: {new_status}')
+        now = now or timezone.now()
+
+        with transaction.atomic():
+            session = PlanSession.objects.filter(pk=session_id, plan__user=user).only(
+                'pk', 'plan_id', 'week_number', 'status',
+            ).first()
+            if session is None:
+                return {
+                    'success': False,
+                    'message': 'Session not found',
+                    'error_code': 'NOT_FOUND'
+                }
+
+            changes = {'status': new_status, 'updated_at': now}
+            if new_status == 'completed':
+                changes['completed_at'] = now
+            if notes is not None:
+                changes['completion_notes'] = notes
+            if rating is not None:
+                changes['user_rating'] = rating
+            # Only an open session can move; a concurrent or repeated request updates nothing
+            if not PlanSession.objects.filter(pk=session.pk, status__in=cls.OPEN_STATUSES).update(**changes):
+                return {
+                    'success': False,
+                    'message': 'Session is already closed',
+                    'error_code': 'ALREADY_CLOSED'
+                }
+
+            completed = F('completed_sessions') + (1 if new_status == 'completed' else 0)
+            total = F('total_sessions') - (1 if new_status == 'cancelled' else 0)
+            plan_changes = {
+                'completed_sessions': completed,
+                'total_sessions': total,
+                'skipped_sessions': F('skipped_sessions') + (1 if new_status == 'skipped' else 0),
+                'progress_percentage': cls.percentage(completed, total),
+                'updated_at': now,
+            }
+            if new_status != 'cancelled':
+                plan_changes['current_week'] = Greatest(F('current_week'), Value(session.week_number))
+                plan_changes['last_activity_date'] = now
+            WellnessPlan.objects.filter(pk=session.plan_id).update(**plan_changes)
+
+        return {
+            'success': True,
+            'message': f'Session {new_status}'
+        }
+
+    MAX_BULK_COMPLETIONS = 200
+    BULK_SESSION_FIELDS = ['status', 'completed_at', 'completion_notes', 'user_rating', 'completion_key', 'updated_at']
+
+    @staticmethod
+    def parse_completion(item, now):
+        """
+        Validate one offline completion; returns (session_id, key, completed_at, rating, notes) or None
+        """
+        if not isinstance(item, dict):
+            return None
+        session_id, key = item.get('session_id'), item.get('idempotency_key')
+        if not isinstance(session_id, int) or isinstance(session_id, bool) or session_id < 1:
+            return None
+        if not isinstance(key, str) or not 0 < len(key) <= 64:
+            return None
+
+        completed_at = now
+        if item.get('completed_at') is not None:
+            try:
+                completed_at = parse_datetime(str(item['completed_at']))
+            except ValueError:
+                completed_at = None
+            if completed_at is None:
+                return None
+            if timezone.is_naive(completed_at):
+                completed_at = timezone.make_aware(completed_at)
+            # Device clocks drift; a completion cannot be in the future
+            completed_at = min(completed_at, now)
+
+        rating = item.get('rating')
+        if rating is not None and (not isinstance(rating, int) or isinstance(rating, bool) or not 1 <= rating <= 5):
+            return None
+        notes = item.get('notes')
+        if notes is not None and not isinstance(notes, str):
+            return None
+        return session_id, key, completed_at, rating, notes
+
+    @classmethod
+    def complete_many(cls, user, completions, now=None):
+        """
+        Apply a batch of offline completions: one query to load and lock the
+        user's sessions, one bulk_update and one counter UPDATE per plan.
+        A completion whose idempotency key is already recorded on its session
+        is reported as a duplicate without writing anything.
+        """
+        if not isinstance(completions, list) or not 0 < len(completions) <= cls.MAX_BULK_COMPLETIONS:
+            return {
+                'success': False,
+                'message': f'completions must be a list of 1 to {cls.MAX_BULK_COMPLETIONS} items',
+                'error_code': 'INVALID_BATCH'
+            }
+        now = now or timezone.now()
+        parsed = [cls.parse_completion(item, now) for item in completions]
+        results = [
+            {'session_id': item.get('session_id') if isinstance(item, dict) else None, 'status': 'invalid'}
+            for item in completions
+        ]
+
+        with transaction.atomic():
+            sessions = {
+                session.pk: session
+                for session in PlanSession.objects.select_for_update().filter(
+                    pk__in={entry[0] for entry in parsed if entry}, plan__user=user,
+                ).only('pk', 'plan_id', 'week_number', 'status', 'completion_key')
+            }
+            updated = []
+            for index, entry in enumerate(parsed):
+                if entry is None:
+                    continue
+                session_id, key, completed_at, rating, notes = entry
+                session = sessions.get(session_id)
+                if session is None:
+                    status = 'not_found'
+                elif session.completion_key == key:
+                    status = 'duplicate'
+                elif session.status not in cls.OPEN_STATUSES:
+                    status = 'already_closed'
+                else:
+                    status = 'completed'
+                    session.status = 'completed'
+                    session.completed_at = completed_at
+                    session.completion_notes = notes or ''
+                    session.user_rating = rating
+                    session.completion_key = key
+                    session.updated_at = now
+                    updated.append(session)
+                results[index]['status'] = status
+
+            if updated:
+                PlanSession.objects.bulk_update(updated, cls.BULK_SESSION_FIELDS)
+                by_plan = {}
+                for session in updated:
+                    by_plan.setdefault(session.plan_id, []).append(session)
+                for plan_id, plan_sessions in by_plan.items():
+                    completed = F('completed_sessions') + len(plan_sessions)
+                    latest = Value(max(session.completed_at for session in plan_sessions))
+                    WellnessPlan.objects.filter(pk=plan_id).update(
+                        completed_sessions=completed,
+                        progress_percentage=cls.percentage(completed, F('total_sessions')),
+                        current_week=Greatest(
+                            F('current_week'), Value(max(session.week_number for session in plan_sessions)),
+                        ),
+                        # Older offline completions must not move last activity backwards
+                        last_activity_date=Greatest(Coalesce(F('last_activity_date'), latest), latest),
+                        updated_at=now,
+                    )
+
+        return {
+            'success': True,
+            'message': f'{len(updated)} sessions completed',
+            'completed': len(updated),
+            'results': results,
+        }
+
+    @classmethod
+    def reconcile(cls, plan_ids=None, batch_size=1000):
+        """
+        Recompute counters from the sessions themselves, for backfill and repair
+        """
+        plans = WellnessPlan.objects.order_by('pk')
+        if plan_ids is not None:
+            plans = plans.filter(pk__in=plan_ids)
+        ids = list(plans.values_list('pk', flat=True))
+
+        reconciled = 0
+        for start in range(0, len(ids), batch_size):
+            batch = ids[start:start + batch_size]
+            counts = {
+                row['plan_id']: row
+                for row in PlanSession.objects.filter(plan_id__in=batch).values('plan_id').annotate(
+                    total=Count('id', filter=~Q(status='cancelled')),
+                    completed=Count('id', filter=Q(status='completed')),
+                    skipped=Count('id', filter=Q(status='skipped')),
+                    week=Max('week_number', filter=Q(status__in=['completed', 'skipped'])),
+                    last_activity=Max('completed_at'),
+                ).order_by()
+            }
+            updated = []
+            for plan in WellnessPlan.objects.filter(pk__in=batch).only('pk', 'last_activity_date'):
+                row = counts.get(plan.pk, {})
+                plan.total_sessions = row.get('total', 0)
+                plan.completed_sessions = row.get('completed', 0)
+                plan.skipped_sessions = row.get('skipped', 0)
+                plan.current_week = row.get('week') or 1
+                plan.progress_percentage = min(
+                    Decimal(100), Decimal(plan.completed_sessions * 100) / max(plan.total_sessions, 1),
+                ).quantize(Decimal('0.01'))
+                plan.last_activity_date = row.get('last_activity') or plan.last_activity_date
+                plan.updated_at = timezone.now()
+                updated.append(plan)
+            WellnessPlan.objects.bulk_update(updated, [*cls.COUNTER_FIELDS, 'last_activity_date', 'updated_at'])
+            reconciled += len(updated)
+        return reconciled
+
+
+class PlanPauseService:
+    """
+    Service class to pause and resume plans. Resuming shifts the plan's
+    remaining sessions and end date by the number of days it was paused.
+    """
+
+    @staticmethod
+    def pause(user, plan_id, now=None):
+        now = now or timezone.now()
+        if not WellnessPlan.objects.filter(pk=plan_id, user=user, status='active').update(
+            status='paused', paused_at=now, updated_at=now,
+        ):
+            return {
+                'success': False,
+                'message': 'Only an active plan can be paused',
+                'error_code': 'INVALID_STATUS'
+            }
+        return {
+            'success': True,
+            'message': 'Plan paused'
+        }
+
+    @staticmethod
+    def resume(user, plan_id, now=None):
+        """
+        Reactivate a paused plan. Sessions still scheduled from the moment of
+        pausing onwards move by whole days, keeping their time of day, in one
+        UPDATE; week and session numbers are left alone, so the
+        (plan, week_number, session_number) constraint is never touched.
+        """
+        now = now or timezone.now()
+        with transaction.atomic():
+            plan = WellnessPlan.objects.select_for_update().filter(
+                pk=plan_id, user=user, status='paused',
+            ).only('pk', 'end_date', 'paused_at').first()
+            if plan is None:
+                return {
+                    'success': False,
+                    'message': 'Only a paused plan can be resumed',
+                    'error_code': 'INVALID_STATUS'
+                }
+
+            days = (timezone.localdate(now) - timezone.localdate(plan.paused_at)).days if plan.paused_at else 0
+            shifted = 0
+            if days > 0:
+                shifted = PlanSession.objects.filter(
+                    plan_id=plan.pk, status='scheduled', scheduled_date__gte=plan.paused_at,
+                ).update(scheduled_date=F('scheduled_date') + timedelta(days=days), updated_at=now)
+            WellnessPlan.objects.filter(pk=plan.pk).update(
+                status='active', paused_at=None, end_date=plan.end_date + timedelta(days=days), updated_at=now,
+            )
+
+        logger.info(f"Resumed plan {plan.pk} after {days} days, {shifted} sessions rescheduled")
+        return {
+            'success': True,
+            'message': 'Plan resumed',
+            'paused_days': days,
+            'rescheduled_sessions': shifted,
+        }
+
+
+class PlanOverviewLoader:
+    """
+    Load everything the plan screen needs as plain dicts: the plan, its
+    modules, the sessions of the current week window, the latest progress
+    entries and the assigned specialists.
+
+    Every query selects only the serialized columns with values(), so no
+    model instances are built, and the total is a fixed QUERY_COUNT
+    regardless of plan size.
+    """
+
+    QUERY_COUNT = 5
+    WINDOW_WEEKS = 2
+    PROGRESS_ENTRIES = 10
+
+    PLAN_FIELDS = [
+        'id', 'title', 'description', 'plan_type', 'difficulty_level', 'status', 'duration_weeks',
+        'sessions_per_week', 'estimated_time_per_session', 'primary_goals', 'progress_percentage',
+        'current_week', 'total_sessions', 'completed_sessions', 'skipped_sessions', 'last_activity_date',
+        'start_date', 'end_date',
+    ]
+    MODULE_FIELDS = ['id', 'title', 'module_type', 'order', 'is_mandatory', 'is_active']
+    SESSION_FIELDS = [
+        'id', 'module_id', 'title', 'week_number', 'session_number', 'status', 'scheduled_date',
+        'duration_minutes', 'completed_at', 'user_rating',
+    ]
+    PROGRESS_FIELDS = [
+        'date', 'week_number', 'weight', 'body_fat_percentage', 'muscle_mass',
+        'energy_level', 'sleep_quality', 'stress_level', 'mood_rating',
+    ]
+
+    @classmethod
+    def load(cls, user, plan_id, week=None):
+        """
+        Plan overview dict, or None when the user has no such plan
+        """
+        plan = WellnessPlan.objects.filter(pk=plan_id, user=user).values(*cls.PLAN_FIELDS).first()
+        if plan is None:
+            return None
+
+        first_week = week or plan['current_week']
+        last_week = first_week + cls.WINDOW_WEEKS - 1
+        plan['modules'] = list(PlanModule.objects.filter(plan_id=plan_id).values(*cls.MODULE_FIELDS))
+        plan['sessions'] = {
+            'from_week': first_week,
+            'to_week': last_week,
+            'results': list(
+                PlanSession.objects.filter(
+                    plan_id=plan_id, week_number__gte=first_week, week_number__lte=last_week,
+                ).order_by('week_number', 'session_number').values(*cls.SESSION_FIELDS)
+            ),
+        }
+        plan['progress_entries'] = list(
+            PlanProgress.objects.filter(plan_id=plan_id).order_by('-date').values(*cls.PROGRESS_FIELDS)[:cls.PROGRESS_ENTRIES]
+        )
+        plan['specialists'] = [
+            {
+                'id': row['id'],
+                'name': f"{row['title']} {row['user__first_name']} {row['user__last_name']}".strip(),
+                'tier': row['tier'],
+                'average_rating': row['average_rating'],
+            }
+            for row in Specialist.objects.filter(assigned_plans=plan_id).values(
+                'id', 'title', 'user__first_name', 'user__last_name', 'tier', 'average_rating',
+            )
+        ]
+        return plan
+
+
+class WellnessPlanService:
+    """
+    Service class to create wellness plans
+    """
+
+    MAX_DURATION_WEEKS = 104
+    MAX_SESSIONS_PER_WEEK = 14
+    MAX_MODULE_ORDER = 1000
+    TITLE_LENGTH = 200
+
+    @staticmethod
+    def _positive_int(data, key, maximum):
+        try:
+            value = int(data.get(key))
+        except (TypeError, ValueError):
+            raise ValueError(f'{key} must be an integer')
+        if not 1 <= value <= maximum:
+            raise ValueError(f'{key} must be between 1 and {maximum}')
+        return value
+
+    @classmethod
+    def create_plan(cls, user, data):
+        """
+        Create an active plan with its modules and its full session schedule
+        """
+        try:
+            plan_types = {choice for choice, _ in WellnessPlan.PLAN_TYPES}
+            difficulty_levels = {choice for choice, _ in WellnessPlan.DIFFICULTY_LEVELS}
+            if not data.get('title') or not isinstance(data['title'], str):
+                raise ValueError('title is required')
+            if len(data['title']) > cls.TITLE_LENGTH:
+                raise ValueError(f'title must be at most {cls.TITLE_LENGTH} characters')
+            if not isinstance(data.get('plan_type'), str) or data['plan_type'] not in plan_types:
+                raise ValueError(f'plan_type must be one of: {", ".join(sorted(plan_types))}')
+            difficulty = data.get('difficulty_level') or 'beginner'
+            if not isinstance(difficulty, str) or difficulty not in difficulty_levels:
+                raise ValueError(f'difficulty_level must be one of: {", ".join(sorted(difficulty_levels))}')
+            duration_weeks = cls._positive_int(data, 'duration_weeks', cls.MAX_DURATION_WEEKS)
+            sessions_per_week = cls._positive_int(data, 'sessions_per_week', cls.MAX_SESSIONS_PER_WEEK)
+            minutes = cls._positive_int(data, 'estimated_time_per_session', 600)
+            start_date = parse_date(str(data.get('start_date') or '')) if data.get('start_date') else timezone.localdate()
+            if start_date is None:
+                raise ValueError('start_date must be YYYY-MM-DD')
+            module_types = {choice for choice, _ in PlanModule.MODULE_TYPES}
+            modules = data.get('modules') or [{
+                'title': data['title'],
+                'module_type': data['plan_type'] if data['plan_type'] in module_types else 'lifestyle',
+            }]
+            if not isinstance(modules, list) or not all(isinstance(module, dict) for module in modules):
+                raise ValueError('modules must be a list of objects')
+            rows = []
+            for index, module in enumerate(modules):
+                if not isinstance(module.get('module_type'), str) or module['module_type'] not in module_types:
+                    raise ValueError(f'module_type must be one of: {", ".join(sorted(module_types))}')
+                title = module.get('title') or data['title']
+                if not isinstance(title, str) or len(title) > cls.TITLE_LENGTH:
+                    raise ValueError(f'module title must be text of at most {cls.TITLE_LENGTH} characters')
+                is_mandatory = module.get('is_mandatory', True)
+                if not isinstance(is_mandatory, bool):
+                    raise ValueError('module is_mandatory must be true or false')
+                rows.append({
+                    'title': title,
+                    'module_type': module['module_type'],
+                    'order': cls._positive_int({'order': module.get('order', index + 1)}, 'order', cls.MAX_MODULE_ORDER),
+                    'is_mandatory': is_mandatory,
+                    'description': module.get('description', ''),
+                    'instructions': module.get('instructions', ''),
+                    'exercises': module.get('exercises') or [],
+                    'resources': module.get('resources') or [],
+                })
+        except ValueError as e:
+            return {
+                'success': False,
+                'message': str(e),
+                'error_code': 'INVALID_PLAN'
+            }
+
+        with transaction.atomic():
+            plan = WellnessPlan.objects.create(
+                user=user,
+                title=data['title'],
+                description=data.get('description', ''),
+                plan_type=data['plan_type'],
+                difficulty_level=difficulty,
+                status='active',
+                duration_weeks=duration_weeks,
+                sessions_per_week=sessions_per_week,
+                estimated_time_per_session=minutes,
+                primary_goals=data.get('primary_goals') or [],
+                success_criteria=data.get('success_criteria', ''),
+                start_date=start_date,
+                end_date=start_date + timedelta(weeks=duration_weeks, days=-1),
+            )
+            PlanModule.objects.bulk_create([PlanModule(plan=plan, **row) for row in rows])
+            session_count = PlanScheduleService.generate(plan)
+
+        logger.info(f"Created plan {plan.pk} with {session_count} sessions for user {user.pk}")
+        return {
+            'success': True,
+            'message': 'Your wellness plan has been created!',
+            'plan': plan,
+            'session_count': session_count,
+        }
+
+
+class PlanTemplateService:
+    """
+    Service class for the plan template library: saving a plan's structure
+    as a template and cloning templates into new plans for many users
+    """
+
+    PLAN_FIELDS = [
+        'title', 'description', 'plan_type', 'difficulty_level', 'duration_weeks', 'sessions_per_week',
+        'estimated_time_per_session', 'primary_goals', 'target_metrics', 'success_criteria', 'adaptation_rules',
+    ]
+    MODULE_FIELDS = [
+        'title', 'description', 'module_type', 'order', 'is_mandatory', 'difficulty_multiplier',
+        'instructions', 'resources', 'exercises',
+    ]
+    MAX_CLONE_USERS = 1000
+
+    @staticmethod
+    def visible_to(user):
+        return PlanTemplate.objects.filter(Q(is_public=True) | Q(specialist__user=user))
+
+    @classmethod
+    def from_plan(cls, plan, specialist=None, is_public=False):
+        """
+        Save a plan's settings and active modules as a new template
+        """
+        with transaction.atomic():
+            template = PlanTemplate.objects.create(
+                specialist=specialist, is_public=is_public, **{field: getattr(plan, field) for field in cls.PLAN_FIELDS},
+            )
+            PlanTemplateModule.objects.bulk_create([
+                PlanTemplateModule(template=template, **{field: getattr(module, field) for field in cls.MODULE_FIELDS})
+                for module in plan.modules.filter(is_active=True)
+            ])
+        return template
+
+    @classmethod
+    def clone(cls, template, users, start_date, specialists=()):
+        """
+        Create an active plan per user from the template, with its modules,
+        full session schedule and assigned specialists. Always four
+        bulk_create calls (plans, modules, sessions, specialist links) however
+        many users, modules or sessions are involved; inserts are only split
+        into batches of PlanScheduleService.BATCH_SIZE rows.
+        """
+        template_modules = list(template.modules.all())
+        session_count = template.duration_weeks * template.sessions_per_week if template_modules else 0
+        fields = {field: getattr(template, field) for field in cls.PLAN_FIELDS}
+        end_date = start_date + timedelta(weeks=template.duration_weeks, days=-1)
+
+        with transaction.atomic():
+            # Counters are known up front, so no reconcile pass is needed afterwards
+            plans = WellnessPlan.objects.bulk_create([
+                WellnessPlan(
+                    user=user, template=template, status='active', start_date=start_date, end_date=end_date,
+                    total_sessions=session_count, **fields,
+                )
+                for user in users
+            ], batch_size=PlanScheduleService.BATCH_SIZE)
+            modules = PlanModule.objects.bulk_create([
+                PlanModule(plan=plan, **{field: getattr(module, field) for field in cls.MODULE_FIELDS})
+                for plan in plans
+                for module in template_modules
+            ], batch_size=PlanScheduleService.BATCH_SIZE)
+
+            zone = timezone.get_current_timezone()
+            per_plan = len(template_modules)
+            sessions = []
+            for index, plan in enumerate(plans):
+                sessions.extend(PlanScheduleService.build_sessions(
+                    plan, modules[index * per_plan:(index + 1) * per_plan], zone=zone,
+                ))
+            PlanSession.objects.bulk_create(sessions, batch_size=PlanScheduleService.BATCH_SIZE)
+
+            Assignment = WellnessPlan.specialists.through
+            Assignment.objects.bulk_create([
+                Assignment(wellnessplan_id=plan.pk, specialist_id=specialist.pk)
+                for plan in plans
+                for specialist in specialists
+            ], batch_size=PlanScheduleService.BATCH_SIZE)
+
+        logger.info(f"Cloned template {template.pk} into {len(plans)} plans with {len(sessions)} sessions")
+        return plans
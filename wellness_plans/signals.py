@@ -0,0 +1,21 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cohorts import CohortAnalyticsService
+from .metrics import PlanMetricsService
+from .models import PlanProgress, WellnessPlan
+
+
+@receiver(post_save, sender=PlanProgress)
+def refresh_metric_values(sender, instance, raw=False, **kwargs):
+    """Extracted values are removed with the entry by cascade; saves re-extract them"""
+    if not raw:
+        PlanMetricsService.refresh_on_commit([instance.pk])
+
+
+@receiver(post_delete, sender=WellnessPlan)
+def remove_plan_from_cohorts(sender, instance, **kwargs):
+    """Projection rows go by cascade; the cohort averages and leaderboards need recomputing"""
+    CohortAnalyticsService.refresh_cohorts_on_commit([(instance.plan_type, instance.difficulty_level)])
+    transaction.on_commit(lambda: CohortAnalyticsService.bump_version(removed=True))
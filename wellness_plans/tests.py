@@ -1,3 +1,609 @@
-from django.test import TestCase
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from io import StringIO
+from unittest import skipUnless
 
-# Create your tests here.
+from django.core.management import call_command
+from django.db import connection
+import numpy as np
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from authentication.models import CustomUser
+from specialists.models import Specialist
+from .models import PlanCohortMember, PlanMetricValue, PlanModule, PlanProgress, PlanSession, ProjectionWatermark, WellnessPlan
+from .adaptation import PlanAdaptationService
+from .analytics import downsample, progress_series
+from .cohorts import CohortAnalyticsService, PlanLeaderboard, TopN, leaderboard
+from .metrics import PlanMetricsService
+from .services import (
+    PlanOverviewLoader, PlanPauseService, PlanProgressService, PlanScheduleService, PlanTemplateService,
+    WellnessPlanService,
+)
+
+
+def create_plan(user, modules=(('Strength', True), ('Cardio', True), ('Stretching', False)), **overrides):
+    fields = {
+        'title': 'Plan', 'description': 'Plan', 'plan_type': 'fitness', 'difficulty_level': 'beginner',
+        'status': 'active', 'duration_weeks': 4, 'sessions_per_week': 3, 'estimated_time_per_session': 45,
+        'success_criteria': '', 'start_date': date(2030, 1, 7), 'end_date': date(2030, 2, 3),
+    }
+    fields.update(overrides)
+    plan = WellnessPlan.objects.create(user=user, **fields)
+    for order, (title, is_mandatory) in enumerate(modules, start=1):
+        PlanModule.objects.create(
+            plan=plan, title=title, description=title, module_type='fitness', order=order,
+            is_mandatory=is_mandatory, instructions=title,
+        )
+    return plan
+
+
+class PlanScheduleTests(TestCase):
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='member', email='member@example.com', password='password')
+
+    def test_generates_full_schedule_in_one_insert(self):
+        plan = create_plan(self.user, duration_weeks=52, sessions_per_week=5)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(PlanScheduleService.generate(plan), 260)
+        # One INSERT on Postgres; SQLite splits it by its bound-parameter limit
+        inserts = [query for query in queries.captured_queries if query['sql'].startswith('INSERT')]
+        self.assertLessEqual(len(inserts), 260 // 20)
+
+        sessions = list(PlanSession.objects.filter(plan=plan).select_related('module'))
+        self.assertEqual(sessions[-1].week_number, 52)
+        self.assertEqual(
+            [session.scheduled_date.date() for session in sessions[:5]],
+            [date(2030, 1, 7), date(2030, 1, 8), date(2030, 1, 9), date(2030, 1, 11), date(2030, 1, 12)],
+        )
+        # Optional modules join every second pass through the mandatory ones
+        self.assertEqual(
+            [session.module.title for session in sessions[:7]],
+            ['Strength', 'Cardio', 'Strength', 'Cardio', 'Stretching', 'Strength', 'Cardio'],
+        )
+        self.assertEqual(PlanScheduleService.generate(plan), 0)
+
+    def test_regenerate_future_keeps_history(self):
+        plan = create_plan(self.user)
+        PlanScheduleService.generate(plan)
+        first = PlanSession.objects.filter(plan=plan).first()
+        first.status = 'completed'
+        first.save()
+
+        plan.sessions_per_week = 2
+        plan.save()
+        now = datetime.combine(date(2030, 1, 14), time(0), tzinfo=dt_timezone.utc)
+        PlanScheduleService.regenerate_future(plan, now=now)
+
+        sessions = PlanSession.objects.filter(plan=plan)
+        self.assertEqual(sessions.filter(scheduled_date__lt=now).count(), 3)
+        self.assertEqual(sessions.filter(scheduled_date__gte=now).count(), 6)
+        self.assertEqual(sessions.get(pk=first.pk).status, 'completed')
+
+    def test_create_plan_builds_modules_and_sessions(self):
+        result = WellnessPlanService.create_plan(self.user, {
+            'title': 'Get strong', 'plan_type': 'fitness', 'duration_weeks': '8', 'sessions_per_week': '3',
+            'estimated_time_per_session': '40', 'start_date': '2030-01-07',
+        })
+        self.assertTrue(result['success'])
+        self.assertEqual(result['session_count'], 24)
+        self.assertEqual(result['plan'].end_date, date(2030, 3, 3))
+        invalid = WellnessPlanService.create_plan(self.user, {'title': 'x', 'plan_type': 'fitness', 'duration_weeks': 0})
+        self.assertEqual(invalid['error_code'], 'INVALID_PLAN')
+        valid = {'title': 'x', 'plan_type': 'fitness', 'duration_weeks': 1, 'sessions_per_week': 1, 'estimated_time_per_session': 30}
+        for modules in ('strength', {'title': 'Strength'}, ['strength']):
+            invalid = WellnessPlanService.create_plan(self.user, {**valid, 'modules': modules})
+            self.assertEqual(invalid['message'], 'modules must be a list of objects')
+        for changes in ({'order': 'abc'}, {'order': 0}, {'is_mandatory': 'maybe'}, {'title': 'x' * 201}, {'module_type': ['fitness']}):
+            invalid = WellnessPlanService.create_plan(self.user, {**valid, 'modules': [{'module_type': 'fitness', **changes}]})
+            self.assertEqual(invalid['error_code'], 'INVALID_PLAN')
+        for changes in ({'plan_type': ['fitness']}, {'difficulty_level': ['beginner']}, {'title': 'x' * 201}):
+            self.assertEqual(WellnessPlanService.create_plan(self.user, {**valid, **changes})['error_code'], 'INVALID_PLAN')
+        # A repeated call leaves the schedule alone
+        self.assertEqual(PlanScheduleService.generate(result['plan']), 0)
+
+
+class PlanProgressTests(TestCase):
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='member', email='member@example.com', password='password')
+        self.plan = create_plan(self.user, duration_weeks=2, sessions_per_week=2)
+        PlanScheduleService.generate(self.plan)
+        self.sessions = list(PlanSession.objects.filter(plan=self.plan))
+
+    def counters(self):
+        plan = WellnessPlan.objects.get(pk=self.plan.pk)
+        return plan.total_sessions, plan.completed_sessions, plan.skipped_sessions, plan.current_week, plan.progress_percentage
+
+    def test_transitions_update_counters_once(self):
+        self.assertEqual(self.counters(), (4, 0, 0, 1, Decimal('0.00')))
+        with self.assertNumQueries(5):
+            # savepoint, session lookup, session update, plan update, release
+            result = PlanProgressService.transition(self.user, self.sessions[2].pk, 'completed')
+        self.assertTrue(result['success'])
+        self.assertEqual(self.counters(), (4, 1, 0, 2, Decimal('25.00')))
+
+        repeated = PlanProgressService.transition(self.user, self.sessions[2].pk, 'skipped')
+        self.assertEqual(repeated['error_code'], 'ALREADY_CLOSED')
+        PlanProgressService.transition(self.user, self.sessions[0].pk, 'skipped')
+        PlanProgressService.transition(self.user, self.sessions[3].pk, 'cancelled')
+        self.assertEqual(self.counters(), (3, 1, 1, 2, Decimal('33.33')))
+        self.assertIsNotNone(PlanSession.objects.get(pk=self.sessions[2].pk).completed_at)
+
+        other = CustomUser.objects.create_user(username='other', email='other@example.com', password='password')
+        self.assertEqual(PlanProgressService.transition(other, self.sessions[1].pk, 'completed')['error_code'], 'NOT_FOUND')
+
+    def test_reconcile_matches_incremental_counters(self):
+        PlanProgressService.transition(self.user, self.sessions[0].pk, 'completed')
+        PlanProgressService.transition(self.user, self.sessions[1].pk, 'cancelled')
+        expected = self.counters()
+        WellnessPlan.objects.update(total_sessions=0, completed_sessions=0, current_week=1, progress_percentage=0)
+        call_command('reconcile_plan_progress', stdout=StringIO())
+        self.assertEqual(self.counters(), expected)
+
+
+class PlanOverviewTests(TestCase):
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='member', email='member@example.com', password='password')
+
+    def build_plan(self, weeks, specialists):
+        plan = create_plan(self.user, duration_weeks=weeks, sessions_per_week=3)
+        PlanScheduleService.generate(plan)
+        for index in range(weeks):
+            PlanProgress.objects.create(plan=plan, date=date(2030, 1, 7 + index), week_number=index + 1, weight=80 - index)
+        for index in range(specialists):
+            coach = CustomUser.objects.create_user(
+                username=f'coach{plan.pk}-{index}', email=f'coach{plan.pk}-{index}@example.com', password='password',
+            )
+            plan.specialists.add(Specialist.objects.create(
+                user=coach, title='Coach', professional_summary='', years_experience=1, certifications='',
+                education='', specializations='', hourly_rate=100, consultation_rate=50,
+            ))
+        return plan
+
+    def test_query_budget_is_fixed(self):
+        small = self.build_plan(weeks=2, specialists=1)
+        large = self.build_plan(weeks=20, specialists=4)
+        with self.assertNumQueries(PlanOverviewLoader.QUERY_COUNT):
+            PlanOverviewLoader.load(self.user, small.pk)
+        with self.assertNumQueries(PlanOverviewLoader.QUERY_COUNT):
+            overview = PlanOverviewLoader.load(self.user, large.pk, week=5)
+
+        self.assertEqual(len(overview['modules']), 3)
+        self.assertEqual([row['week_number'] for row in overview['sessions']['results']], [5, 5, 5, 6, 6, 6])
+        self.assertEqual(len(overview['progress_entries']), PlanOverviewLoader.PROGRESS_ENTRIES)
+        self.assertEqual(overview['progress_entries'][0]['week_number'], 20)
+        self.assertEqual(len(overview['specialists']), 4)
+
+    def test_endpoint_serializes_and_scopes_to_owner(self):
+        plan = self.build_plan(weeks=2, specialists=1)
+        self.client.force_login(self.user)
+        response = self.client.get(f'/api/wellness-plans/{plan.pk}/overview/', HTTP_HOST='localhost')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['plan']['sessions']['results'][0]['scheduled_date'][:10], '2030-01-07')
+
+        other = CustomUser.objects.create_user(username='other', email='other@example.com', password='password')
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(f'/api/wellness-plans/{plan.pk}/overview/', HTTP_HOST='localhost').status_code, 404)
+
+
+class ProgressSeriesTests(TestCase):
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='member', email='member@example.com', password='password')
+        self.plan = create_plan(self.user)
+
+    def test_downsample_ignores_missing_values(self):
+        dates = np.array(['2030-01-07', '2030-01-08', '2030-01-14', '2030-02-01'], dtype='datetime64[D]')
+        values = np.array([80.0, np.nan, 78.0, 76.0])
+        starts, means, minimums, maximums, counts = downsample(dates, values, 'week')
+        self.assertEqual([str(start) for start in starts], ['2030-01-07', '2030-01-14', '2030-01-28'])
+        self.assertEqual(means.tolist(), [80.0, 78.0, 76.0])
+        self.assertEqual(counts.tolist(), [1, 1, 1])
+        starts, means, _, _, _ = downsample(dates, values, 'month')
+        self.assertEqual([str(start) for start in starts], ['2030-01-01', '2030-02-01'])
+        self.assertEqual(means.tolist(), [79.0, 76.0])
+
+    def test_multi_year_history_is_bounded_and_trended(self):
+        start = date(2028, 1, 3)
+        PlanProgress.objects.bulk_create([
+            PlanProgress(
+                plan=self.plan, date=start + timedelta(days=day), week_number=day // 7 + 1,
+                weight=90 - day / 70, energy_level=None if day % 3 else 7,
+            )
+            for day in range(2 * 365)
+        ])
+        with self.assertNumQueries(1):
+            series = progress_series(self.plan.pk, ['weight', 'energy_level'])
+        self.assertEqual(series['bucket'], 'week')
+        self.assertEqual(len(series['buckets']), 105)
+        self.assertAlmostEqual(series['metrics']['weight']['trend_per_week'], -0.1)
+        self.assertEqual(series['metrics']['energy_level']['trend_per_week'], 0.0)
+
+        monthly = progress_series(self.plan.pk, ['weight'], bucket='month')
+        self.assertEqual(len(monthly['buckets']), 25)
+        self.assertEqual(monthly['metrics']['weight']['max'][0], 90.0)
+
+    def test_endpoint_validates_and_scopes_to_owner(self):
+        self.client.force_login(self.user)
+        url = f'/api/wellness-plans/{self.plan.pk}/progress/series/'
+        self.assertEqual(self.client.get(url, {'metrics': 'weight'}, HTTP_HOST='localhost').json()['entries'], 0)
+        self.assertEqual(self.client.get(url, {'metrics': 'height'}, HTTP_HOST='localhost').status_code, 400)
+        for params in ({'start': '2030-02-30'}, {'end': 'last week'}):
+            response = self.client.get(url, params, HTTP_HOST='localhost')
+            self.assertEqual((response.status_code, response.json()['message']), (400, f'{next(iter(params))} must be YYYY-MM-DD'))
+        other = CustomUser.objects.create_user(username='other', email='other@example.com', password='password')
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(url, HTTP_HOST='localhost').status_code, 404)
+
+
+class PlanAdaptationTests(TestCase):
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='member', email='member@example.com', password='password')
+        self.now = datetime.combine(date(2030, 2, 4), time(0), tzinfo=dt_timezone.utc)
+
+    def test_rules_are_evaluated_in_chunks(self):
+        steady = create_plan(self.user, completed_sessions=12, total_sessions=24)
+        tired = create_plan(self.user, estimated_time_per_session=40)
+        custom = create_plan(self.user, completed_sessions=6, adaptation_rules={'raise_difficulty_after_weeks': 2})
+        disabled = create_plan(self.user, completed_sessions=30, adaptation_rules={'enabled': False})
+        paused = create_plan(self.user, completed_sessions=30, status='paused')
+        PlanScheduleService.generate(tired)
+        for day in range(3):
+            PlanProgress.objects.create(plan=tired, date=date(2030, 2, 1 + day), week_number=4, energy_level=2)
+            PlanProgress.objects.create(plan=steady, date=date(2030, 2, 1 + day), week_number=4, energy_level=8)
+
+        stats = PlanAdaptationService.run(chunk_size=2, now=self.now)
+        self.assertEqual((stats['plans'], stats['changed']), (4, 3))
+
+        plans = {plan.pk: plan for plan in WellnessPlan.objects.all()}
+        self.assertEqual(plans[steady.pk].difficulty_level, 'intermediate')
+        self.assertEqual(plans[steady.pk].personalization_factors['adaptation']['raised_at_week'], 4)
+        self.assertEqual(plans[custom.pk].difficulty_level, 'intermediate')
+        self.assertEqual(plans[tired.pk].difficulty_level, 'beginner')
+        self.assertEqual(plans[tired.pk].estimated_time_per_session, 32)
+        self.assertEqual(plans[disabled.pk].difficulty_level, 'beginner')
+        self.assertEqual(plans[paused.pk].difficulty_level, 'beginner')
+        sessions = PlanSession.objects.filter(plan=tired)
+        self.assertFalse(sessions.filter(scheduled_date__gte=self.now).exclude(duration_minutes=32).exists())
+        self.assertTrue(sessions.filter(scheduled_date__lt=self.now, duration_minutes=40).exists())
+
+        # A repeated run the same night changes nothing
+        self.assertEqual(PlanAdaptationService.run(now=self.now + timedelta(hours=3))['changed'], 0)
+        self.assertEqual(WellnessPlan.objects.get(pk=tired.pk).estimated_time_per_session, 32)
+
+        # The next night the plan is still tired and is cut again
+        self.assertEqual(PlanAdaptationService.run(now=self.now + timedelta(days=1))['changed'], 1)
+        self.assertEqual(WellnessPlan.objects.get(pk=tired.pk).estimated_time_per_session, 26)
+
+    def test_volume_is_restored_when_energy_recovers(self):
+        plan = create_plan(
+            self.user, estimated_time_per_session=32,
+            personalization_factors={'adaptation': {'raised_at_week': 0, 'base_minutes': 40}},
+        )
+        PlanProgress.objects.create(plan=plan, date=date(2030, 2, 1), week_number=4, energy_level=9)
+        stdout = StringIO()
+        call_command('adapt_plans', stdout=stdout)
+        self.assertIn('1 adapted', stdout.getvalue())
+        self.assertEqual(WellnessPlan.objects.get(pk=plan.pk).estimated_time_per_session, 40)
+
+
+class BulkCompletionTests(TestCase):
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='member', email='member@example.com', password='password')
+        self.plans = [create_plan(self.user, duration_weeks=2, sessions_per_week=2) for _ in range(2)]
+        for plan in self.plans:
+            PlanScheduleService.generate(plan)
+        self.sessions = list(PlanSession.objects.order_by('plan_id', 'week_number', 'session_number'))
+        self.now = datetime(2030, 1, 20, 12, tzinfo=dt_timezone.utc)
+
+    def completions(self):
+        return [
+            {'session_id': self.sessions[0].pk, 'idempotency_key': 'a', 'rating': 4, 'notes': 'Good',
+             'completed_at': '2030-01-07T10:00:00Z'},
+            {'session_id': self.sessions[2].pk, 'idempotency_key': 'b', 'completed_at': '2030-01-14T10:00:00Z'},
+            {'session_id': self.sessions[5].pk, 'idempotency_key': 'c', 'completed_at': '2031-01-01T00:00:00Z'},
+        ]
+
+    def test_batch_and_replay(self):
+        with self.assertNumQueries(6):
+            # savepoint, ownership query, bulk update, one update per plan, release
+            result = PlanProgressService.complete_many(self.user, self.completions(), now=self.now)
+        self.assertEqual([row['status'] for row in result['results']], ['completed'] * 3)
+
+        first, second = (WellnessPlan.objects.get(pk=plan.pk) for plan in self.plans)
+        self.assertEqual((first.completed_sessions, first.current_week, first.progress_percentage), (2, 2, Decimal('50.00')))
+        self.assertEqual(first.last_activity_date, datetime(2030, 1, 14, 10, tzinfo=dt_timezone.utc))
+        self.assertEqual(second.completed_sessions, 1)
+        # Future device timestamps are clamped to the server time
+        self.assertEqual(PlanSession.objects.get(pk=self.sessions[5].pk).completed_at, self.now)
+        self.assertEqual(PlanSession.objects.get(pk=self.sessions[0].pk).user_rating, 4)
+
+        with self.assertNumQueries(3):
+            replay = PlanProgressService.complete_many(self.user, self.completions(), now=self.now)
+        self.assertEqual([row['status'] for row in replay['results']], ['duplicate'] * 3)
+        self.assertEqual(WellnessPlan.objects.get(pk=self.plans[0].pk).completed_sessions, 2)
+
+    def test_endpoint_reports_per_item_status(self):
+        other = CustomUser.objects.create_user(username='other', email='other@example.com', password='password')
+        foreign = create_plan(other)
+        PlanScheduleService.generate(foreign)
+        self.client.force_login(self.user)
+        payload = {'completions': [
+            {'session_id': self.sessions[1].pk, 'idempotency_key': 'x'},
+            {'session_id': self.sessions[1].pk, 'idempotency_key': 'y'},
+            {'session_id': PlanSession.objects.filter(plan=foreign).first().pk, 'idempotency_key': 'z'},
+            {'session_id': self.sessions[3].pk, 'idempotency_key': 'w', 'rating': 9},
+        ]}
+        response = self.client.post(
+            '/api/wellness-plans/sessions/complete/', payload, content_type='application/json', HTTP_HOST='localhost',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [row['status'] for row in response.json()['results']],
+            ['completed', 'already_closed', 'not_found', 'invalid'],
+        )
+        empty = self.client.post(
+            '/api/wellness-plans/sessions/complete/', {'completions': []}, content_type='application/json',
+            HTTP_HOST='localhost',
+        )
+        self.assertEqual(empty.json()['error_code'], 'INVALID_BATCH')
+
+
+class PlanPauseTests(TestCase):
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='member', email='member@example.com', password='password')
+        self.plan = create_plan(self.user, duration_weeks=40, sessions_per_week=14)
+        PlanScheduleService.generate(self.plan)
+
+    def test_resume_shifts_remaining_sessions_in_one_statement(self):
+        paused_at = datetime(2030, 1, 10, 12, tzinfo=dt_timezone.utc)
+        before = dict(PlanSession.objects.values_list('pk', 'scheduled_date'))
+        self.assertEqual(PlanPauseService.pause(self.user, self.plan.pk, now=paused_at)['success'], True)
+        self.assertEqual(PlanPauseService.pause(self.user, self.plan.pk)['error_code'], 'INVALID_STATUS')
+
+        with CaptureQueriesContext(connection) as queries:
+            result = PlanPauseService.resume(self.user, self.plan.pk, now=paused_at + timedelta(days=5, hours=3))
+        self.assertEqual(result['paused_days'], 5)
+        self.assertEqual(len([query for query in queries.captured_queries if query['sql'].startswith('UPDATE')]), 2)
+
+        plan = WellnessPlan.objects.get(pk=self.plan.pk)
+        self.assertEqual((plan.status, plan.paused_at, plan.end_date), ('active', None, date(2030, 2, 8)))
+        after = dict(PlanSession.objects.values_list('pk', 'scheduled_date'))
+        moved = [pk for pk in before if after[pk] != before[pk]]
+        self.assertEqual(result['rescheduled_sessions'], len(moved))
+        # Two sessions a day at 09:00 from Jan 7; the eight up to Jan 10 stay put
+        self.assertEqual(len(moved), 560 - 8)
+        self.assertTrue(all(after[pk] - before[pk] == timedelta(days=5) for pk in moved))
+        self.assertTrue(all(before[pk] >= paused_at for pk in moved))
+
+    def test_endpoints_scope_to_owner(self):
+        other = CustomUser.objects.create_user(username='other', email='other@example.com', password='password')
+        self.client.force_login(other)
+        self.assertEqual(self.client.post(f'/api/wellness-plans/{self.plan.pk}/pause/', HTTP_HOST='localhost').status_code, 404)
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.post(f'/api/wellness-plans/{self.plan.pk}/resume/', HTTP_HOST='localhost').status_code, 409)
+        self.assertEqual(self.client.post(f'/api/wellness-plans/{self.plan.pk}/pause/', HTTP_HOST='localhost').status_code, 200)
+        self.assertEqual(self.client.post(f'/api/wellness-plans/{self.plan.pk}/resume/', HTTP_HOST='localhost').json()['paused_days'], 0)
+
+
+class PlanTemplateTests(TestCase):
+
+    def setUp(self):
+        self.coach = CustomUser.objects.create_user(username='coach', email='coach@example.com', password='password')
+        self.specialist = Specialist.objects.create(
+            user=self.coach, title='Coach', professional_summary='', years_experience=1, certifications='',
+            education='', specializations='', hourly_rate=100, consultation_rate=50,
+        )
+        source = create_plan(self.coach, duration_weeks=3, sessions_per_week=2)
+        PlanModule.objects.filter(plan=source, title='Strength').update(exercises=[{'name': 'Squat', 'sets': 5}])
+        self.template = PlanTemplateService.from_plan(source, specialist=self.specialist)
+        self.clients = [
+            CustomUser.objects.create_user(username=f'client{index}', email=f'client{index}@example.com', password='password')
+            for index in range(3)
+        ]
+
+    def test_clone_uses_fixed_number_of_inserts(self):
+        for users in (self.clients[:1], self.clients):
+            with CaptureQueriesContext(connection) as queries:
+                plans = PlanTemplateService.clone(self.template, users, date(2030, 1, 7), specialists=[self.specialist])
+            inserts = [query for query in queries.captured_queries if query['sql'].startswith('INSERT')]
+            self.assertEqual(len(inserts), 4)
+
+        plan = WellnessPlan.objects.get(pk=plans[-1].pk)
+        self.assertEqual((plan.user, plan.template, plan.total_sessions, plan.end_date), (self.clients[2], self.template, 6, date(2030, 1, 27)))
+        self.assertEqual(list(plan.specialists.all()), [self.specialist])
+        sessions = list(PlanSession.objects.filter(plan=plan).select_related('module'))
+        self.assertEqual(len(sessions), 6)
+        self.assertEqual({session.module.plan_id for session in sessions}, {plan.pk})
+        self.assertEqual(sessions[0].exercises, [{'name': 'Squat', 'sets': 5}])
+
+    def test_clone_endpoint_limits_client_cloning_to_author(self):
+        client_plan = create_plan(self.clients[0])
+        client_plan.specialists.add(self.specialist)
+        url = f'/api/wellness-plans/templates/{self.template.pk}/clone/'
+
+        self.client.force_login(self.clients[1])
+        self.assertEqual(self.client.post(url, HTTP_HOST='localhost').status_code, 404)
+        self.template.is_public = True
+        self.template.save()
+        response = self.client.post(url, {'start_date': '2030-01-07'}, content_type='application/json', HTTP_HOST='localhost')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(WellnessPlan.objects.get(pk=response.json()['plan_ids'][0]).user, self.clients[1])
+        for start_date in ('2030-02-30', 'next monday'):
+            response = self.client.post(url, {'start_date': start_date}, content_type='application/json', HTTP_HOST='localhost')
+            self.assertEqual((response.status_code, response.json()['message']), (400, 'start_date must be YYYY-MM-DD'))
+        self.assertEqual(self.client.post(url, {'user_ids': [self.clients[0].pk]}, content_type='application/json', HTTP_HOST='localhost').status_code, 403)
+
+        self.client.force_login(self.coach)
+        payload = {'user_ids': [self.clients[0].pk, self.clients[1].pk]}
+        self.assertEqual(self.client.post(url, payload, content_type='application/json', HTTP_HOST='localhost').status_code, 403)
+        payload = {'user_ids': [self.clients[0].pk]}
+        self.assertEqual(self.client.post(url, payload, content_type='application/json', HTTP_HOST='localhost').status_code, 201)
+        self.assertEqual(len(self.client.get('/api/wellness-plans/templates/', HTTP_HOST='localhost').json()['results']), 1)
+
+
+class PlanMetricsTests(TestCase):
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='member', email='member@example.com', password='password')
+        self.strong = create_plan(self.user, primary_goals=['strength', 'mobility'], target_metrics={'weight': 80})
+        self.light = create_plan(self.user, primary_goals=['strength'])
+        self.other = create_plan(self.user, primary_goals=['weight_loss'])
+        with self.captureOnCommitCallbacks(execute=True):
+            for plan, squat in ((self.strong, 140), (self.light, 90), (self.other, 150)):
+                PlanProgress.objects.create(
+                    plan=plan, date=date(2030, 1, 7), week_number=1, achievements=['first_pr'],
+                    strength_metrics={'Squat': squat, 'notes': 'felt good'}, endurance_metrics={'5k_minutes': 25.5},
+                )
+            entry = PlanProgress.objects.create(plan=self.light, date=date(2030, 1, 14), week_number=2)
+            entry.strength_metrics = {'squat': 120}
+            entry.save()
+
+    def ids(self, **conditions):
+        return set(PlanMetricsService.plans(**conditions).values_list('pk', flat=True))
+
+    def test_conditions_combine(self):
+        self.assertEqual(PlanMetricValue.objects.count(), 7)
+        self.assertEqual(self.ids(goals=['strength']), {self.strong.pk, self.light.pk})
+        self.assertEqual(self.ids(goals=['strength', 'mobility']), {self.strong.pk})
+        self.assertEqual(self.ids(targets={'weight': 80}), {self.strong.pk})
+        # Compared against any recorded value, so the later 120 counts
+        self.assertEqual(self.ids(goals=['strength'], metrics=[('strength.squat', 'gt', 100)]), {self.strong.pk, self.light.pk})
+        self.assertEqual(self.ids(metrics=[('strength.squat', 'gte', 140), ('endurance.5k_minutes', 'lt', 30)]), {self.strong.pk, self.other.pk})
+        self.assertEqual(self.ids(achievements=['first_pr'], goals=['weight_loss']), {self.other.pk})
+        # Stored keys are lower-cased, and so are the queried names
+        self.assertEqual(self.ids(metrics=[('Strength.Squat', 'gte', 150)]), {self.other.pk})
+
+        PlanMetricValue.objects.all().delete()
+        call_command('rebuild_plan_metrics', stdout=StringIO())
+        self.assertEqual(PlanMetricValue.objects.count(), 7)
+
+    def test_refresh_upserts_and_drops_removed_keys(self):
+        entry = PlanProgress.objects.get(plan=self.strong)
+        self.assertEqual(PlanMetricsService.refresh([entry.pk]), 2)
+        self.assertEqual(PlanMetricsService.refresh([entry.pk]), 2)
+        PlanProgress.objects.filter(pk=entry.pk).update(strength_metrics={'squat': 145, 'Deadlift': 180})
+        PlanMetricsService.refresh([entry.pk])
+        self.assertEqual(
+            dict(PlanMetricValue.objects.filter(progress=entry).values_list('metric', 'value')),
+            {'strength.squat': 145, 'strength.deadlift': 180, 'endurance.5k_minutes': 25.5},
+        )
+        PlanProgress.objects.filter(pk=entry.pk).update(strength_metrics={}, endurance_metrics={})
+        PlanMetricsService.refresh([entry.pk])
+        self.assertFalse(PlanMetricValue.objects.filter(progress=entry).exists())
+        self.assertEqual(PlanMetricValue.objects.count(), 5)
+
+    def test_endpoint_scopes_and_validates(self):
+        coach = CustomUser.objects.create_user(username='coach', email='coach@example.com', password='password')
+        specialist = Specialist.objects.create(
+            user=coach, title='Coach', professional_summary='', years_experience=1, certifications='',
+            education='', specializations='', hourly_rate=100, consultation_rate=50,
+        )
+        self.light.specialists.add(specialist)
+        self.client.force_login(coach)
+        response = self.client.get('/api/wellness-plans/search/', {'goal': 'strength', 'metric': 'strength.Squat:gt:100'}, HTTP_HOST='localhost')
+        self.assertEqual([row['id'] for row in response.json()['results']], [self.light.pk])
+        self.assertEqual(self.client.get('/api/wellness-plans/search/', {'metric': 'squat>100'}, HTTP_HOST='localhost').status_code, 400)
+
+    @skipUnless(connection.vendor == 'postgresql', 'GIN containment indexes exist on Postgres only')
+    def test_containment_uses_gin_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        plan = PlanMetricsService.plans(goals=['strength']).values('pk').explain()
+        self.assertIn('plan_goals_gin_idx', plan)
+        plan = PlanMetricsService.plans(metrics=[('strength.squat', 'gt', 100)]).values('pk').explain()
+        self.assertIn('plan_metric_value_idx', plan)
+
+
+class CohortAnalyticsTests(TestCase):
+
+    def setUp(self):
+        # The module-level board outlives each test's rolled back version rows
+        leaderboard.version = None
+        self.user = CustomUser.objects.create_user(username='member', email='member@example.com', password='password')
+        self.plans = [
+            create_plan(self.user, total_sessions=10, completed_sessions=completed, difficulty_level=difficulty)
+            for completed, difficulty in ((8, 'beginner'), (5, 'beginner'), (9, 'advanced'))
+        ]
+        for plan, loss in zip(self.plans, (1.0, 0.5, 2.0)):
+            PlanProgress.objects.bulk_create([
+                PlanProgress(plan=plan, date=date(2030, 1, 7) + timedelta(weeks=week), week_number=week + 1, weight=90 - loss * week)
+                for week in range(3)
+            ])
+
+    def test_aggregates_refresh_incrementally(self):
+        self.assertEqual(CohortAnalyticsService.refresh(), 3)
+        series = CohortAnalyticsService.cohort_series('fitness')
+        self.assertEqual([row['average_weight_change'] for row in series['fitness/beginner']], [0.0, -0.75, -1.5])
+        self.assertEqual(series['fitness/advanced'][2], {'week': 3, 'plan_count': 1, 'average_weight_change': -4.0})
+
+        # Only sources touched after the watermark (minus its slack) are reprojected
+        old = timezone.now() - timedelta(hours=1)
+        WellnessPlan.objects.update(updated_at=old)
+        PlanProgress.objects.update(updated_at=old)
+        ProjectionWatermark.objects.update(value=old + timedelta(minutes=30))
+        PlanProgress.objects.create(plan=self.plans[1], date=date(2030, 1, 28), week_number=4, weight=86.5)
+        self.assertEqual(CohortAnalyticsService.refresh(), 1)
+        series = CohortAnalyticsService.cohort_series('fitness', 'beginner')
+        self.assertEqual(series['fitness/beginner'][3], {'week': 4, 'plan_count': 1, 'average_weight_change': -3.5})
+
+    def test_leaderboard_tracks_changes(self):
+        CohortAnalyticsService.refresh()
+        staff = CustomUser.objects.create_user(username='staff', email='staff@example.com', password='password', is_staff=True)
+        self.client.force_login(staff)
+        url = '/api/wellness-plans/analytics/leaderboard/fitness/'
+        rows = self.client.get(url, HTTP_HOST='localhost').json()['results']
+        self.assertEqual([row['plan_id'] for row in rows], [self.plans[2].pk, self.plans[0].pk, self.plans[1].pk])
+
+        WellnessPlan.objects.filter(pk=self.plans[1].pk).update(completed_sessions=10, progress_percentage=100)
+        CohortAnalyticsService.refresh()
+        with self.assertNumQueries(4):
+            # session, user, version, members computed since the board's watermark
+            rows = self.client.get(url, {'limit': 2}, HTTP_HOST='localhost').json()['results']
+        self.assertEqual([row['plan_id'] for row in rows], [self.plans[1].pk, self.plans[2].pk])
+        with self.assertNumQueries(3):
+            self.client.get(url, HTTP_HOST='localhost')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.plans[1].delete()
+        rows = self.client.get(url, HTTP_HOST='localhost').json()['results']
+        self.assertEqual([row['plan_id'] for row in rows], [self.plans[2].pk, self.plans[0].pk])
+        self.assertEqual(len(CohortAnalyticsService.cohort_series('fitness', 'beginner')['fitness/beginner']), 3)
+
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(url, HTTP_HOST='localhost').status_code, 403)
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}})
+    def test_leaderboard_sees_bumps_from_other_processes(self):
+        CohortAnalyticsService.refresh()
+        board = PlanLeaderboard()
+        self.assertEqual([row['plan_id'] for row in board.top('fitness')], [self.plans[2].pk, self.plans[0].pk, self.plans[1].pk])
+
+        # The cron process refreshes; this worker shares only the database with it
+        WellnessPlan.objects.filter(pk=self.plans[1].pk).update(completed_sessions=10, progress_percentage=100)
+        CohortAnalyticsService.refresh()
+        self.assertEqual([row['plan_id'] for row in board.top('fitness', 1)], [self.plans[1].pk])
+
+        # A deletion elsewhere bumps the epoch, forcing a full reload
+        PlanCohortMember.objects.filter(plan=self.plans[1]).delete()
+        CohortAnalyticsService.bump_version(removed=True)
+        self.assertEqual([row['plan_id'] for row in board.top('fitness')], [self.plans[2].pk, self.plans[0].pk])
+        with self.assertNumQueries(1):
+            board.top('fitness')
+
+    def test_top_n_keeps_exact_prefix(self):
+        board = TopN(3, [(1, 0.9, 9, 10), (2, 0.8, 8, 10), (3, 0.7, 7, 10)])
+        board.update(4, 0.5, 5, 10, ranked=True)
+        self.assertEqual([row['plan_id'] for row in board.top(3)], [1, 2, 3])
+        board.update(1, 0.1, 1, 10, ranked=True)
+        self.assertEqual([row['plan_id'] for row in board.top(3)], [2, 3])
+        self.assertTrue(board.needs_reload(3))
+        board.update(5, 0.95, 9, 10, ranked=True)
+        self.assertEqual([row['plan_id'] for row in board.top(3)], [5, 2, 3])
@@ -6,8 +6,20 @@ app_name = 'wellness_plans'
 urlpatterns = [
     path('', views.plan_list, name='list'),
     path('create/', views.create_plan, name='create'),
+    path('analytics/cohorts/', views.cohort_analytics, name='cohort_analytics'),
+    path('analytics/leaderboard/<str:plan_type>/', views.plan_leaderboard, name='leaderboard'),
+    path('search/', views.search_plans, name='search'),
+    path('templates/', views.plan_templates, name='templates'),
+    path('templates/<int:template_id>/clone/', views.clone_template, name='clone_template'),
     path('<int:pk>/', views.plan_detail, name='detail'),
+    path('<int:pk>/overview/', views.plan_overview, name='overview'),
+    path('<int:pk>/pause/', views.pause_plan, name='pause'),
+    path('<int:pk>/resume/', views.resume_plan, name='resume'),
     path('<int:pk>/progress/', views.plan_progress, name='progress'),
+    path('<int:pk>/progress/series/', views.plan_progress_series, name='progress_series'),
     path('<int:pk>/sessions/', views.plan_sessions, name='sessions'),
+    path('sessions/complete/', views.complete_sessions, name='complete_sessions'),
     path('session/<int:session_id>/complete/', views.complete_session, name='complete_session'),
+    path('session/<int:session_id>/skip/', views.skip_session, name='skip_session'),
+    path('session/<int:session_id>/cancel/', views.cancel_session, name='cancel_session'),
 ]
\ No newline at end of file
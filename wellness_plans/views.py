@@ -1,8 +1,19 @@
+import json
+
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.db.models import Count, Q
 from django.http import JsonResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.views.decorators.http import require_POST
+from authentication.models import CustomUser
 from .models import WellnessPlan, PlanSession, PlanProgress
+from .cohorts import COHORT_WEEKS, CohortAnalyticsService, leaderboard
+from .metrics import PlanMetricsService, parse_metric_condition
+from .analytics import BUCKETS, DEFAULT_WINDOW, SERIES_METRICS, progress_series
+from .services import PlanOverviewLoader, PlanPauseService, PlanProgressService, PlanTemplateService, WellnessPlanService
 
 
 @login_required
@@ -21,8 +32,29 @@ def plan_list(request):
 def create_plan(request):
     """Create a new wellness plan"""
     if request.method == 'POST':
-        # Handle plan creation logic here
-        messages.success(request, 'Your wellness plan has been created!')
+        if request.content_type == 'application/json':
+            try:
+                data = json.loads(request.body or b'{}')
+            except ValueError:
+                data = None
+            if not isinstance(data, dict):
+                return JsonResponse({'success': False, 'message': 'Invalid JSON body'}, status=400)
+        else:
+            data = request.POST.dict()
+        result = WellnessPlanService.create_plan(request.user, data)
+        if not result['success']:
+            if request.content_type == 'application/json':
+                return JsonResponse({'success': False, 'message': result['message']}, status=400)
+            messages.error(request, result['message'])
+            return render(request, 'wellness_plans/create.html', {'title': 'Create Wellness Plan', 'form_data': data})
+        if request.content_type == 'application/json':
+            return JsonResponse({
+                'success': True,
+                'message': result['message'],
+                'plan_id': result['plan'].pk,
+                'session_count': result['session_count'],
+            }, status=201)
+        messages.success(request, result['message'])
         return redirect('wellness_plans:list')
     
     context = {
@@ -43,6 +75,21 @@ def plan_detail(request, pk):
     return render(request, 'wellness_plans/detail.html', context)
 
 
+@login_required
+def plan_overview(request, pk):
+    """Plan, modules, current sessions, recent progress and specialists in one payload"""
+    week = request.GET.get('week')
+    if week is not None:
+        try:
+            week = max(int(week), 1)
+        except ValueError:
+            return JsonResponse({'success': False, 'message': 'week must be an integer'}, status=400)
+    plan = PlanOverviewLoader.load(request.user, pk, week=week)
+    if plan is None:
+        return JsonResponse({'success': False, 'message': 'Plan not found'}, status=404)
+    return JsonResponse({'success': True, 'plan': plan})
+
+
 @login_required
 def plan_progress(request, pk):
     """Plan progress tracking"""
@@ -57,6 +104,38 @@ def plan_progress(request, pk):
     return render(request, 'wellness_plans/progress.html', context)
 
 
+@login_required
+def plan_progress_series(request, pk):
+    """Downsampled progress metrics with moving averages and trends, for charts"""
+    if not WellnessPlan.objects.filter(pk=pk, user=request.user).exists():
+        return JsonResponse({'success': False, 'message': 'Plan not found'}, status=404)
+
+    metrics = [metric for metric in request.GET.get('metrics', '').split(',') if metric] or SERIES_METRICS
+    bucket = request.GET.get('bucket', 'auto')
+    try:
+        if any(metric not in SERIES_METRICS for metric in metrics):
+            raise ValueError(f'metrics must be among: {", ".join(SERIES_METRICS)}')
+        if bucket not in ['auto', *BUCKETS]:
+            raise ValueError(f'bucket must be one of: auto, {", ".join(BUCKETS)}')
+        window = request.GET.get('window', DEFAULT_WINDOW)
+        if not str(window).isdigit() or not 1 <= int(window) <= 52:
+            raise ValueError('window must be between 1 and 52')
+        dates = {}
+        for key in ('start', 'end'):
+            try:
+                dates[key] = parse_date(request.GET[key]) if request.GET.get(key) else None
+            except ValueError:
+                dates[key] = None
+            if request.GET.get(key) and dates[key] is None:
+                raise ValueError(f'{key} must be YYYY-MM-DD')
+        start_date, end_date = dates['start'], dates['end']
+    except ValueError as e:
+        return JsonResponse({'success': False, 'message': str(e)}, status=400)
+
+    series = progress_series(pk, metrics, bucket=bucket, window=int(window), start_date=start_date, end_date=end_date)
+    return JsonResponse({'success': True, **series})
+
+
 @login_required
 def plan_sessions(request, pk):
     """Plan sessions view"""
@@ -71,19 +150,197 @@ def plan_sessions(request, pk):
     return render(request, 'wellness_plans/sessions.html', context)
 
 
+SESSION_ERROR_STATUS = {
+    'NOT_FOUND': 404,
+    'ALREADY_CLOSED': 409,
+}
+
+
+def _close_session(request, session_id, new_status):
+    rating = request.POST.get('user_rating')
+    if rating not in (None, ''):
+        try:
+            rating = int(rating)
+        except ValueError:
+            rating = 0
+        if not 1 <= rating <= 5:
+            return JsonResponse({'success': False, 'message': 'user_rating must be between 1 and 5'}, status=400)
+    else:
+        rating = None
+    result = PlanProgressService.transition(
+        request.user, session_id, new_status, notes=request.POST.get('completion_notes'), rating=rating,
+    )
+    status_code = 200 if result['success'] else SESSION_ERROR_STATUS.get(result['error_code'], 400)
+    return JsonResponse(result, status=status_code)
+
+
 @login_required
 def complete_session(request, session_id):
     """Complete a session"""
     session = get_object_or_404(PlanSession, id=session_id, plan__user=request.user)
     
     if request.method == 'POST':
-        session.status = 'completed'
-        session.save()
-        messages.success(request, f'Session "{session.title}" marked as completed!')
-        return JsonResponse({'success': True, 'message': 'Session completed'})
+        response = _close_session(request, session_id, 'completed')
+        if response.status_code == 200:
+            messages.success(request, f'Session "{session.title}" marked as completed!')
+        return response
     
     context = {
         'session': session,
         'title': f'Complete Session: {session.title}',
     }
     return render(request, 'wellness_plans/complete_session.html', context)
+
+
+@login_required
+@require_POST
+def pause_plan(request, pk):
+    """Pause an active plan"""
+    get_object_or_404(WellnessPlan.objects.only('pk'), pk=pk, user=request.user)
+    result = PlanPauseService.pause(request.user, pk)
+    return JsonResponse(result, status=200 if result['success'] else 409)
+
+
+@login_required
+@require_POST
+def resume_plan(request, pk):
+    """Resume a paused plan, moving its remaining sessions by the paused days"""
+    get_object_or_404(WellnessPlan.objects.only('pk'), pk=pk, user=request.user)
+    result = PlanPauseService.resume(request.user, pk)
+    return JsonResponse(result, status=200 if result['success'] else 409)
+
+
+@login_required
+@require_POST
+def complete_sessions(request):
+    """Complete a batch of sessions recorded offline; replays with the same idempotency keys are no-ops"""
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        data = None
+    if not isinstance(data, dict):
+        return JsonResponse({'success': False, 'message': 'Invalid JSON body'}, status=400)
+    result = PlanProgressService.complete_many(request.user, data.get('completions'))
+    return JsonResponse(result, status=200 if result['success'] else 400)
+
+
+@login_required
+@require_POST
+def skip_session(request, session_id):
+    """Skip a session"""
+    return _close_session(request, session_id, 'skipped')
+
+
+@login_required
+@require_POST
+def cancel_session(request, session_id):
+    """Cancel a session; cancelled sessions no longer count towards progress"""
+    return _close_session(request, session_id, 'cancelled')
+
+
+@login_required
+def plan_templates(request):
+    """Templates visible to the user: public ones and their own"""
+    templates = PlanTemplateService.visible_to(request.user).annotate(module_count=Count('modules')).values(
+        'id', 'title', 'description', 'plan_type', 'difficulty_level', 'duration_weeks', 'sessions_per_week',
+        'estimated_time_per_session', 'is_public', 'specialist_id', 'module_count',
+    )
+    return JsonResponse({'success': True, 'results': list(templates)})
+
+
+@login_required
+@require_POST
+def clone_template(request, template_id):
+    """
+    Start a plan from a template. The template's author may pass user_ids to
+    clone it for several of their existing clients at once.
+    """
+    template = get_object_or_404(PlanTemplateService.visible_to(request.user), pk=template_id)
+    try:
+        data = json.loads(request.body or b'{}') if request.content_type == 'application/json' else request.POST.dict()
+    except ValueError:
+        data = None
+    if not isinstance(data, dict):
+        return JsonResponse({'success': False, 'message': 'Invalid JSON body'}, status=400)
+    try:
+        start_date = parse_date(str(data.get('start_date') or '')) if data.get('start_date') else timezone.localdate()
+    except ValueError:
+        start_date = None
+    if start_date is None:
+        return JsonResponse({'success': False, 'message': 'start_date must be YYYY-MM-DD'}, status=400)
+
+    user_ids = data.get('user_ids')
+    specialists = []
+    if user_ids is None:
+        users = [request.user]
+    else:
+        specialist = getattr(request.user, 'specialist_profile', None)
+        if specialist is None or template.specialist_id != specialist.pk:
+            return JsonResponse({'success': False, 'message': 'Only the template author can clone for clients'}, status=403)
+        if (
+            not isinstance(user_ids, list)
+            or not 0 < len(user_ids) <= PlanTemplateService.MAX_CLONE_USERS
+            or not all(isinstance(user_id, int) and not isinstance(user_id, bool) for user_id in user_ids)
+        ):
+            return JsonResponse({
+                'success': False,
+                'message': f'user_ids must be a list of 1 to {PlanTemplateService.MAX_CLONE_USERS} ids',
+            }, status=400)
+        users = list(CustomUser.objects.filter(pk__in=user_ids, wellness_plans__specialists=specialist).distinct())
+        if len(users) != len(set(user_ids)):
+            return JsonResponse({'success': False, 'message': 'Some users are not your clients'}, status=403)
+        specialists = [specialist]
+
+    plans = PlanTemplateService.clone(template, users, start_date, specialists=specialists)
+    return JsonResponse({'success': True, 'plan_ids': [plan.pk for plan in plans]}, status=201)
+
+
+@login_required
+def search_plans(request):
+    """
+    Plans the user owns or is assigned to as a specialist, filtered by goals
+    (?goal=), achievements (?achievement=) and metric values
+    (?metric=strength.squat:gt:100); every condition must match
+    """
+    try:
+        metrics = [parse_metric_condition(text) for text in request.GET.getlist('metric')]
+    except ValueError as e:
+        return JsonResponse({'success': False, 'message': str(e)}, status=400)
+    visible = WellnessPlan.objects.filter(
+        Q(user=request.user) | Q(pk__in=WellnessPlan.specialists.through.objects.filter(
+            specialist__user=request.user,
+        ).values('wellnessplan_id'))
+    )
+    plans = PlanMetricsService.plans(
+        visible, goals=request.GET.getlist('goal'), achievements=request.GET.getlist('achievement'), metrics=metrics,
+    ).order_by('-created_at').values('id', 'title', 'user_id', 'status', 'primary_goals', 'progress_percentage')
+    return JsonResponse({'success': True, 'results': list(plans[:100])})
+
+
+@login_required
+def cohort_analytics(request):
+    """Average weekly weight change per plan_type/difficulty_level cohort (staff only)"""
+    if not request.user.is_staff:
+        return JsonResponse({'success': False, 'message': 'Staff only'}, status=403)
+    try:
+        weeks = min(max(int(request.GET.get('weeks', COHORT_WEEKS)), 1), COHORT_WEEKS)
+    except ValueError:
+        return JsonResponse({'success': False, 'message': 'weeks must be an integer'}, status=400)
+    series = CohortAnalyticsService.cohort_series(
+        request.GET.get('plan_type'), request.GET.get('difficulty_level'), weeks=weeks,
+    )
+    return JsonResponse({'success': True, 'weeks': weeks, 'cohorts': series})
+
+
+@login_required
+def plan_leaderboard(request, plan_type):
+    """Plans of one type ranked by session completion (staff only)"""
+    if not request.user.is_staff:
+        return JsonResponse({'success': False, 'message': 'Staff only'}, status=403)
+    if plan_type not in dict(WellnessPlan.PLAN_TYPES):
+        return JsonResponse({'success': False, 'message': 'Unknown plan type'}, status=404)
+    try:
+        limit = int(request.GET.get('limit', 10))
+    except ValueError:
+        return JsonResponse({'success': False, 'message': 'limit must be an integer'}, status=400)
+    return JsonResponse({'success': True, 'plan_type': plan_type, 'results': leaderboard.top(plan_type, max(limit, 1))})